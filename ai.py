@@ -0,0 +1,214 @@
+"""
+对手 AI
+
+对手和玩家遵守同样的规则：每次拿到一组两个方块，选择列和旋转方向后落下，
+然后结算连锁。落点由束搜索选出：每层对当前所有候选棋盘展开下一组方块的
+全部落点，只保留估值最高的 width 个，向前看 depth 组方块（迭代加深，
+时间预算用完时采用已完成的最深一层的结果，第一层总会完成）。
+
+搜索在 BitBoard 副本上进行。落下方块后、结算之前的棋盘由父棋盘的 Zobrist
+哈希异或新方块得到，以此为键的置换表缓存结算结果和估值：不同顺序得到的
+相同局面只计算一次，上一步搜索过的局面在下一步里也能直接复用。
+"""
+import random
+import time
+
+from bitboard import BitBoard, FULL_MASK, NOT_RIGHT_COLUMN, bit_index, CELL_COUNT
+from board import GAME_AREA_WIDTH, GAME_AREA_HEIGHT, COLOR_IDS, COLOR_NAMES, clear_chain
+from placement import placements
+
+# 难度 -> (向前看的方块组数, 每层保留的局面数, 每步时间预算（毫秒）, 对手每次落子间隔（步）)
+DIFFICULTY_LEVELS = {
+    "简单": (1, 4, 2, 90),
+    "普通": (2, 4, 4, 60),
+    "困难": (3, 6, 8, 40),
+}
+DEFAULT_DIFFICULTY = "普通"
+
+# 置换表最多保存的局面数，超过后清空
+TABLE_SIZE = 20000
+
+# 估值权重
+HEIGHT_WEIGHT = 1.0  # 每格堆叠高度
+DANGER_HEIGHT = GAME_AREA_HEIGHT - 4  # 超过该高度的列额外扣分
+DANGER_WEIGHT = 40.0
+HOLE_WEIGHT = 6.0  # 方块下面的每个空格
+STONE_WEIGHT = 3.0  # 每块石头
+LINK_WEIGHT = 4.0  # 每对相邻的同色方块
+
+# Zobrist 随机数，每种颜色（按颜色编号）和石头在每格各一个（固定种子，结果可重现）
+_zobrist_rng = random.Random(20250101)
+ZOBRIST = [[_zobrist_rng.getrandbits(64) for _ in range(CELL_COUNT)] for _ in COLOR_NAMES]
+STONE_ZOBRIST = [_zobrist_rng.getrandbits(64) for _ in range(CELL_COUNT)]
+
+# 置换表中表示“落下后顶到最上面一行”的局面
+LOSS = object()
+
+
+def to_bitboard(board):
+    """把任意实现的棋盘复制为 BitBoard"""
+    if board.backend == "bit":
+        return board.copy()
+    bitboard = BitBoard()
+    for y in range(GAME_AREA_HEIGHT):
+        for x in range(GAME_AREA_WIDTH):
+            color = board.color_at(x, y)
+            if color is not None:
+                bitboard.set_color(x, y, color)
+            if board.stone_at(x, y):
+                bitboard.set_stone(x, y)
+    return bitboard
+
+
+def zobrist_key(board):
+    """BitBoard 的 Zobrist 哈希"""
+    key = 0
+    masks = [(ZOBRIST[COLOR_IDS[color]], bits) for color, bits in board.colors.items()]
+    masks.append((STONE_ZOBRIST, board.stones))
+    for table, bits in masks:
+        while bits:
+            low = bits & -bits
+            key ^= table[low.bit_length() - 1]
+            bits ^= low
+    return key
+
+
+def chain_points(rounds):
+    """连锁得分：第 n 层连锁按玩家连击的加成计分"""
+    return sum(int(cleared * 10 * (1 + i * 0.5)) for i, cleared in enumerate(rounds))
+
+
+def evaluate(board):
+    """局面估值：越高越好"""
+    colored = board.colored_mask()
+    occupied = colored | board.stones
+
+    value = 0.0
+    for x in range(GAME_AREA_WIDTH):
+        height = GAME_AREA_HEIGHT - board.column_top(x, occupied)
+        value -= HEIGHT_WEIGHT * height
+        if height > DANGER_HEIGHT:
+            value -= DANGER_WEIGHT * (height - DANGER_HEIGHT)
+
+    # 有方块的格子以下全部标记，其中的空格就是被盖住的空洞
+    below = occupied
+    shift = GAME_AREA_WIDTH
+    while shift < CELL_COUNT:
+        below |= (below << shift) & FULL_MASK
+        shift *= 2
+    value -= HOLE_WEIGHT * (below & ~occupied).bit_count()
+    value -= STONE_WEIGHT * board.stones.bit_count()
+
+    # 相邻的同色方块越多，越容易凑成可消除的连通块
+    links = 0
+    for bits in board.colors.values():
+        links += (bits & (bits >> 1) & NOT_RIGHT_COLUMN).bit_count()
+        links += (bits & (bits >> GAME_AREA_WIDTH)).bit_count()
+    value += LINK_WEIGHT * links
+    return value
+
+
+class OpponentAI:
+    """束搜索 + 迭代加深的对手
+
+    time_budget 为每步的时间预算（秒），默认取难度对应的预算；为 0 时不限时间、
+    总是搜索到最大深度（结果只取决于局面，可重现）。
+    """
+
+    def __init__(self, difficulty=DEFAULT_DIFFICULTY, time_budget=None):
+        self.difficulty = difficulty
+        self.depth, self.width, budget_ms, self.move_ticks = DIFFICULTY_LEVELS[difficulty]
+        self.time_budget = budget_ms / 1000 if time_budget is None else time_budget
+        self.table = {}
+        # 统计：展开的局面数、置换表命中数、最近一次完成的搜索深度
+        self.nodes = 0
+        self.hits = 0
+        self.last_depth = 0
+
+    def choose(self, board, pairs):
+        """为 pairs[0] 选择落点 (x, rotation)，pairs 是接下来的各组方块的颜色编号
+
+        没有能放入的落点时返回 None。
+        """
+        plan = self.plan(board, pairs)
+        return plan[0] if plan else None
+
+    def plan(self, board, pairs, deadline=None, cancelled=None):
+        """为 pairs 中的各组方块依次规划落点，返回 [(x, rotation), ...]
+
+        deadline（time.perf_counter 的时刻）与时间预算取较早者。
+        列表可能短于 pairs（后面的方块组无论怎么放都会顶出），为空表示没有落点。
+        cancelled 是一个无参函数，返回 True 时搜索立即停止（包括第一层），
+        返回目前为止的结果，调用方应当丢弃它。
+        """
+        root = to_bitboard(board)
+        root_key = zobrist_key(root)
+        if len(self.table) > TABLE_SIZE:
+            self.table.clear()
+
+        if self.time_budget:
+            budget_deadline = time.perf_counter() + self.time_budget
+            deadline = budget_deadline if deadline is None else min(deadline, budget_deadline)
+
+        best = []
+        for depth in range(1, min(self.depth, len(pairs)) + 1):
+            # 第一层不限时间，保证总有结果
+            result = self.search(root, root_key, pairs[:depth], deadline if depth > 1 else None, cancelled)
+            if result is None:
+                break
+            best = result
+            self.last_depth = depth
+        return best
+
+    def search(self, root, root_key, pairs, deadline, cancelled=None):
+        """向前看 len(pairs) 组方块的束搜索，返回最佳的落点序列，超时或被取消时返回 None"""
+        # 束中的每项: (估值, 累计得分, 棋盘, 哈希, 落点序列)
+        beam = [(0.0, 0, root, root_key, ())]
+        for colors in pairs:
+            children = {}
+            for _, points, board, key, path in beam:
+                for move, piece in placements(board, colors):
+                    if deadline is not None and time.perf_counter() > deadline:
+                        return None
+                    if cancelled is not None and cancelled():
+                        return None
+                    entry = self.expand(board, key, piece)
+                    if entry is LOSS:
+                        continue
+                    child, gained, child_key, value = entry
+                    total = points + gained
+                    estimate = total + value
+                    old = children.get(child_key)
+                    if old is None or estimate > old[0]:
+                        children[child_key] = (estimate, total, child, child_key, path + (move,))
+            if not children:
+                # 再往后都会顶出，按已有的结果选择
+                break
+            beam = sorted(children.values(), key=lambda item: item[0], reverse=True)[:self.width]
+        return list(beam[0][4])
+
+    def expand(self, board, key, piece):
+        """在 board 上放入已落好的 piece 并结算，返回 (棋盘, 得分, 哈希, 估值) 或 LOSS"""
+        blocks = piece.blocks()
+        for x, y, color in blocks:
+            if y < 0:
+                return LOSS
+            key ^= ZOBRIST[color][bit_index(x, y)]
+
+        entry = self.table.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        self.nodes += 1
+        child = board.copy()
+        for x, y, color in blocks:
+            child.set_color(x, y, COLOR_NAMES[color])
+        rounds = clear_chain(child)
+        child.drop_floating_blocks()
+        if child.has_top_block():
+            entry = LOSS
+        else:
+            entry = (child, chain_points(rounds), zobrist_key(child), evaluate(child))
+        self.table[key] = entry
+        return entry
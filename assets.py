@@ -0,0 +1,234 @@
+"""
+资源加载与缓存
+
+图片在第一次使用时加载、缩放，并转换为显示器的像素格式（convert/convert_alpha），
+之后每次 blit 都不必再逐像素转换格式。同一图片的不同尺寸分别缓存。
+启动时的加载失败不会逐条打印，而是汇总到 failures 中，由 report() 统一报告；
+report() 之后才加载（延迟加载）的资源失败时立即打印警告。
+
+打包版本把全部图片、字体和音频放在一个资源包（assets.pak）里，由
+build_assets.py 生成。资源包放在可执行文件旁边（见 game.spec），不打进单文件
+可执行文件，因此启动时不需要解压任何资源；资源包用 mmap 映射到内存，资源以
+文件对象的形式直接交给 pygame 读取。资源包不存在时按原来的方式读取单独的文件。
+
+资源包格式: 文件头 (PACK_HEADER) + UTF-8 JSON 索引 {路径: [偏移, 长度]} + 数据
+"""
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+
+import pygame
+
+
+# 资源路径处理函数
+def resource_path(relative_path):
+    """ 获取打包后资源的绝对路径 """
+    if getattr(sys, 'frozen', False):  # 判断是否在打包后的环境中
+        base_path = sys._MEIPASS
+    else:
+        base_path = os.path.abspath(".")
+    return os.path.join(base_path, relative_path)
+
+
+PACK_FILE = "assets.pak"
+PACK_MAGIC = b"YSPK"
+PACK_VERSION = 1
+PACK_HEADER = "<4sII"  # 标识, 版本, 索引长度
+
+
+def locate_pack(name=PACK_FILE):
+    """资源包的路径：打包版本优先使用可执行文件旁边的资源包，其次是打包进去的"""
+    if getattr(sys, 'frozen', False):
+        path = os.path.join(os.path.dirname(sys.executable), name)
+        if os.path.exists(path):
+            return path
+    return resource_path(name)
+
+
+def pack_name(relative_path):
+    """资源包中的路径统一使用 / 分隔"""
+    return relative_path.replace(os.sep, "/")
+
+
+def write_pack(path, files):
+    """把 files {包内路径: 磁盘路径} 写成资源包，返回写入的字节数"""
+    contents = {}
+    for name in sorted(files):
+        with open(files[name], "rb") as f:
+            contents[pack_name(name)] = f.read()
+
+    # 偏移量依赖索引长度，索引长度又依赖偏移量的位数，迭代到稳定为止
+    index_size = 0
+    while True:
+        offset = struct.calcsize(PACK_HEADER) + index_size
+        index = {}
+        for name, data in contents.items():
+            index[name] = [offset, len(data)]
+            offset += len(data)
+        encoded = json.dumps(index, ensure_ascii=False).encode("utf-8")
+        if len(encoded) == index_size:
+            break
+        index_size = len(encoded)
+
+    with open(path, "wb") as f:
+        f.write(struct.pack(PACK_HEADER, PACK_MAGIC, PACK_VERSION, len(encoded)))
+        f.write(encoded)
+        for data in contents.values():
+            f.write(data)
+    return offset
+
+
+class PackedFile(io.RawIOBase):
+    """资源包中一个资源的只读文件对象，直接从映射的内存读取"""
+
+    def __init__(self, view):
+        self.view = view
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        start = self.position
+        count = max(0, min(len(buffer), len(self.view) - start))
+        buffer[:count] = self.view[start:start + count]
+        self.position = start + count
+        return count
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += len(self.view)
+        if offset < 0:
+            raise ValueError("负的文件位置")
+        self.position = offset
+        return offset
+
+    def tell(self):
+        return self.position
+
+
+class AssetPack:
+    """内存映射的资源包"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, index_size = struct.unpack_from(PACK_HEADER, self.data)
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            raise ValueError(f"资源包格式不正确: {path}")
+        start = struct.calcsize(PACK_HEADER)
+        self.index = json.loads(self.data[start:start + index_size].decode("utf-8"))
+        self.view = memoryview(self.data)
+
+    def __contains__(self, relative_path):
+        return pack_name(relative_path) in self.index
+
+    def open(self, relative_path):
+        """以文件对象的形式打开资源（不复制数据）"""
+        offset, size = self.index[pack_name(relative_path)]
+        return PackedFile(self.view[offset:offset + size])
+
+
+class AssetManager:
+    """图片和字体的加载与缓存（需要在 pygame.display.set_mode 之后使用）"""
+
+    def __init__(self, pack_path=PACK_FILE):
+        self.images = {}  # (相对路径, 尺寸) -> Surface
+        self.fonts = {}  # (相对路径, 字号) -> Font
+        self.failures = []  # [(相对路径, 错误信息), ...]
+        self.reported = False  # report() 之后的失败立即打印
+        self.loaded = 0
+        self.load_time = 0.0
+
+        start = time.perf_counter()
+        self.pack = None
+        path = locate_pack(pack_path)
+        if os.path.exists(path):
+            self.pack = AssetPack(path)
+        self.load_time += time.perf_counter() - start
+
+    def source(self, relative_path):
+        """返回可交给 pygame 加载的对象：资源包中的文件对象，或磁盘上的路径"""
+        if self.pack is not None and relative_path in self.pack:
+            return self.pack.open(relative_path)
+        return resource_path(relative_path)
+
+    def _convert(self, surface):
+        """转换为显示器像素格式，带透明通道的图片保留透明度"""
+        if surface.get_flags() & pygame.SRCALPHA or surface.get_colorkey() is not None:
+            return surface.convert_alpha()
+        return surface.convert()
+
+    def image(self, relative_path, size=None):
+        """加载图片并缩放到 size，失败时抛出异常"""
+        key = (relative_path, size)
+        surface = self.images.get(key)
+        if surface is not None:
+            return surface
+
+        start = time.perf_counter()
+        original = self.images.get((relative_path, None))
+        if original is None:
+            original = pygame.image.load(self.source(relative_path), os.path.basename(relative_path))
+            original = self._convert(original)
+            self.images[(relative_path, None)] = original
+            self.loaded += 1
+        surface = original
+        if size is not None:
+            surface = self._convert(pygame.transform.scale(original, size))
+            self.images[key] = surface
+        self.load_time += time.perf_counter() - start
+        return surface
+
+    def try_image(self, relative_path, size=None):
+        """加载图片，失败时记录原因并返回 None"""
+        try:
+            return self.image(relative_path, size)
+        except (pygame.error, OSError) as e:
+            self.fail(relative_path, e)
+            return None
+
+    def font(self, relative_path, size):
+        """加载字体，失败时记录原因并使用系统默认字体"""
+        key = (relative_path, size)
+        font = self.fonts.get(key)
+        if font is None:
+            start = time.perf_counter()
+            try:
+                font = pygame.font.Font(self.source(relative_path), size)
+            except (pygame.error, OSError) as e:
+                if not any(path == relative_path for path, _ in self.failures):
+                    self.fail(relative_path, e)
+                font = pygame.font.SysFont(None, size)
+            self.fonts[key] = font
+            self.load_time += time.perf_counter() - start
+        return font
+
+    def fail(self, relative_path, error):
+        """记录加载失败，启动报告之后的失败立即打印"""
+        self.failures.append((relative_path, str(error)))
+        if self.reported:
+            print(f"警告: 无法加载 {relative_path}: {error}")
+
+    def report(self):
+        """打印启动时的加载汇总，之后的失败改为立即打印"""
+        print(self.summary())
+        self.reported = True
+
+    def summary(self):
+        """返回加载情况的汇总文本"""
+        origin = PACK_FILE if self.pack is not None else "文件"
+        lines = [f"资源加载 ({origin}): {self.loaded} 个图片, {len(self.fonts)} 个字体, "
+                 f"耗时 {self.load_time * 1000:.1f} ms"]
+        for path, error in self.failures:
+            lines.append(f"警告: 无法加载 {path}: {error}")
+        return "\n".join(lines)
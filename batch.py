@@ -0,0 +1,494 @@
+"""
+NumPy 批量模拟器
+
+用于角色平衡性测试：N 块棋盘叠成 N×15×6 的 uint8 数组（colors 保存颜色编号，
+0 表示空，见 board.COLOR_IDS；stones 保存石头），放置、同色连通块消除、
+孤立石头清除和重力都对整批棋盘同时做向量化运算，规则与 ListBoard 的
+check_clear/drop_floating_blocks 以及 clear_chain 一致。
+
+每一回合每块棋盘落下一组方块（与对手一样直接选择列和旋转方向），
+回合之间按 turn_ticks 推进时间，用于计算石头生成、技能冷却。
+技能在能量已满且冷却结束时的回合开始立即使用，效果与 GameState.use_skill 相同
+（没有技能效果的角色只消耗能量并进入冷却）；对对手的冻结只计数。
+
+性能：向量化只去掉了逐局的 Python 循环，每回合仍有固定的 NumPy 调用开销，
+单个进程比逐局用 ListBoard 模拟快约 6 倍（见 benchmarks/bench_batch.py），
+不能指望单核达到数量级更高的加速。run_parallel 把各局分到多个进程中各自
+批量模拟，吞吐量随核数大致线性增长，例如 16 核约为逐局模拟的百倍；
+单核机器上它与直接使用 BatchSimulator 相同。
+
+需要 numpy，游戏本身不依赖本模块。
+"""
+import multiprocessing
+import os
+
+import numpy as np
+
+from board import GAME_AREA_WIDTH, GAME_AREA_HEIGHT, BLOCK_COLORS, MAX_CHAIN_ROUNDS
+from engine import STONE_TICKS, TICK_RATE, characters, skill_max_energy
+from placement import ROTATION_OFFSETS
+
+CELL_COUNT = GAME_AREA_WIDTH * GAME_AREA_HEIGHT
+
+# 全部在棋盘范围内的落点 (x, rotation)，顺序与 placement.placements 相同
+MOVES = [(x, rotation) for rotation, (dx, _) in enumerate(ROTATION_OFFSETS)
+         for x in range(GAME_AREA_WIDTH) if 0 <= x + dx < GAME_AREA_WIDTH]
+MOVE_X = np.array([x for x, _ in MOVES])
+MOVE_DX = np.array([ROTATION_OFFSETS[rotation][0] for _, rotation in MOVES])
+MOVE_DY = np.array([ROTATION_OFFSETS[rotation][1] for _, rotation in MOVES])
+
+# 每个方块组消耗的时间（步），默认一秒落一组
+TURN_TICKS = TICK_RATE
+
+# 角色编号 -> 角色名、技能冷却（秒）
+CHARACTER_NAMES = list(characters)
+COOLDOWNS = np.array([characters[name]["cooldown"] for name in CHARACTER_NAMES])
+
+# 贪心策略中每格堆叠高度的扣分（与连锁得分相比）
+GREEDY_HEIGHT_WEIGHT = 1
+
+
+def column_tops(colors, stones):
+    """各块棋盘各列最上面一个有方块或石头的行（空列为 GAME_AREA_HEIGHT），形状 (N, W)"""
+    occupied = (colors > 0) | (stones > 0)
+    return np.where(occupied.any(axis=1), occupied.argmax(axis=1), GAME_AREA_HEIGHT)
+
+
+# 以下函数把整批棋盘展平成一维数组处理：第 i 格下方的邻格是 i + W，右方的邻格是 i + 1。
+# 这样每次运算都是整段连续内存上的一次循环，而不是 N×15 次长度为 6 的小循环。
+# 同一块棋盘内才算相邻，由 _edges 给出的掩码排除跨行、跨棋盘的“邻格”。
+_EDGES = {"down": np.zeros(0, dtype=bool), "right": np.zeros(0, dtype=bool)}
+
+
+def _edges(length):
+    """展平后长度为 length 的批量中，每格是否有下方邻格、右方邻格"""
+    if len(_EDGES["down"]) < length:
+        count = -(-length // CELL_COUNT)
+        cell = np.arange(CELL_COUNT)
+        _EDGES["down"] = np.tile(cell < CELL_COUNT - GAME_AREA_WIDTH, count)
+        _EDGES["right"] = np.tile(cell % GAME_AREA_WIDTH < GAME_AREA_WIDTH - 1, count)
+    return _EDGES["down"][:length], _EDGES["right"][:length]
+
+
+def _links(flat):
+    """同色相邻的格子对：down[i] 表示 i 与 i + W 同色，right[i] 表示 i 与 i + 1 同色"""
+    width = GAME_AREA_WIDTH
+    has_down, has_right = _edges(len(flat))
+    down = (flat[:-width] > 0) & (flat[:-width] == flat[width:]) & has_down[:-width]
+    right = (flat[:-1] > 0) & (flat[:-1] == flat[1:]) & has_right[:-1]
+    return down, right
+
+
+def _spread(mask, down, right):
+    """每格是否有沿 down/right 相连、且在 mask 中的邻格"""
+    width = GAME_AREA_WIDTH
+    result = np.zeros(len(mask), dtype=bool)
+    result[:-width] |= mask[width:] & down
+    result[width:] |= mask[:-width] & down
+    result[:-1] |= mask[1:] & right
+    result[1:] |= mask[:-1] & right
+    return result
+
+
+def full_groups(colors):
+    """属于达到消除阈值的同色连通块的格子，形状与 colors 相同
+
+    一对相邻的同色方块，如果两者的同色邻格数之和不小于 4，它们所在的连通块
+    至少有 4 个方块（网格中相邻两格没有公共邻格）；反过来，至少 4 个方块的
+    连通块里总有这样一对方块。因此从这些方块出发，沿同色相邻的格子扩展到
+    不再变化，就得到全部需要消除的格子，不必为每个连通块计数。
+    这一判据依赖消除阈值 CLEAR_THRESHOLD 为 4。
+    """
+    width = GAME_AREA_WIDTH
+    down, right = _links(colors.reshape(-1))
+    degree = np.zeros(colors.size, dtype=np.uint8)
+    degree[:-width] += down
+    degree[width:] += down
+    degree[:-1] += right
+    degree[1:] += right
+    seed_down = down & (degree[:-width] + degree[width:] >= 4)
+    seed_right = right & (degree[:-1] + degree[1:] >= 4)
+
+    marked = np.zeros(colors.size, dtype=bool)
+    marked[:-width] |= seed_down
+    marked[width:] |= seed_down
+    marked[:-1] |= seed_right
+    marked[1:] |= seed_right
+    if marked.any():
+        while True:
+            grown = marked | _spread(marked, down, right)
+            if np.array_equal(grown, marked):
+                break
+            marked = grown
+    return marked.reshape(colors.shape)
+
+
+def clear_groups(colors, stones):
+    """消除所有达到阈值的同色连通块（原地修改），返回每块棋盘的消除数量
+
+    有消除的棋盘上，没有相邻彩色方块的石头一起清除（与 ListBoard.check_clear 相同）。
+    """
+    full = full_groups(colors)
+    cleared = full.reshape(len(colors), CELL_COUNT).sum(axis=1)
+    if not cleared.any():
+        return cleared
+    flat = colors.reshape(-1)
+    flat[full.reshape(-1)] = 0
+
+    has_down, has_right = _edges(flat.size)
+    adjacent = _spread(flat > 0, has_down[:-GAME_AREA_WIDTH], has_right[:-1])
+    isolated = (stones.reshape(-1) > 0) & ~adjacent & np.repeat(cleared > 0, CELL_COUNT)
+    stones.reshape(-1)[isolated] = 0
+    return cleared
+
+
+def apply_gravity(colors, stones, boards, unsettled):
+    """boards 中的棋盘下落悬空的方块（原地修改），返回每块棋盘是否有彩色方块移动
+
+    与 ListBoard.drop_floating_blocks 相同：先落彩色方块（石头不动），再落石头
+    （彩色方块不动）。每轮所有下方为空的格子同时下落一格，直到没有可下落的格子；
+    只有第一轮就有格子可下落的棋盘参与后面的各轮。
+    石头落下后压在上面的彩色方块可能又悬空了，这样的棋盘在 unsettled 中记为 True，
+    留给下一次下落处理（对应 ListBoard 中保持为脏的列）。
+    """
+    width = GAME_AREA_WIDTH
+    moved = np.zeros(colors.shape[0], dtype=bool)
+    if not len(boards):
+        return moved
+    unsettled[boards] = False
+    sub_colors = colors[boards].reshape(-1)
+    sub_stones = stones[boards].reshape(-1)
+    has_down = _edges(sub_colors.size)[0][:-width]
+    free = (sub_colors[width:] == 0) & (sub_stones[width:] == 0) & has_down
+    floating = (((sub_colors[:-width] > 0) | (sub_stones[:-width] > 0)) & free)
+    floating = np.append(floating, np.zeros(width, dtype=bool)).reshape(len(boards), CELL_COUNT).any(axis=1)
+    if not floating.any():
+        return moved
+
+    sub_colors = sub_colors.reshape(len(boards), CELL_COUNT)[floating].reshape(-1)
+    sub_stones = sub_stones.reshape(len(boards), CELL_COUNT)[floating].reshape(-1)
+    floating = boards[floating]
+    has_down = has_down[:sub_colors.size - width]
+    for layer in (sub_colors, sub_stones):
+        first = True
+        while True:
+            free = (sub_colors[width:] == 0) & (sub_stones[width:] == 0) & has_down
+            falling = layer[:-width] * free
+            if first:
+                # 第一轮有格子下落的棋盘就是有方块移动的棋盘
+                fell = np.append(falling, np.zeros(width, dtype=np.uint8)).reshape(len(floating), CELL_COUNT)
+                fell = fell.any(axis=1)
+                if layer is sub_colors:
+                    moved[floating] = fell
+                else:
+                    unsettled[floating] = fell
+                first = False
+            elif not falling.any():
+                break
+            # 下落的格子和接收的格子互不重叠，可以直接加减
+            layer[width:] += falling
+            layer[:-width] -= falling
+    colors[floating] = sub_colors.reshape(-1, GAME_AREA_HEIGHT, GAME_AREA_WIDTH)
+    stones[floating] = sub_stones.reshape(-1, GAME_AREA_HEIGHT, GAME_AREA_WIDTH)
+    return moved
+
+
+def resolve_chain(colors, stones, unsettled):
+    """对整批棋盘做连锁结算（消除 → 下落 → 再消除），返回每轮消除数量，形状 (N, MAX_CHAIN_ROUNDS)
+
+    与 board.clear_chain 相同：没有消除、或者下落时没有彩色方块移动就停止。
+    """
+    rounds = np.zeros((colors.shape[0], MAX_CHAIN_ROUNDS), dtype=np.int64)
+    active = np.arange(colors.shape[0])
+    for index in range(MAX_CHAIN_ROUNDS):
+        if not len(active):
+            break
+        sub_colors = colors[active]
+        sub_stones = stones[active]
+        sub_unsettled = unsettled[active]
+        cleared = clear_groups(sub_colors, sub_stones)
+        rounds[active, index] = cleared
+        # 只有有消除的棋盘才下落
+        moved = apply_gravity(sub_colors, sub_stones, np.flatnonzero(cleared), sub_unsettled)
+        colors[active] = sub_colors
+        stones[active] = sub_stones
+        unsettled[active] = sub_unsettled
+        active = active[moved]
+    return rounds
+
+
+def chain_points(rounds):
+    """连锁得分（与 ai.chain_points 相同），rounds 形状 (N, MAX_CHAIN_ROUNDS)"""
+    weights = 10 + 5 * np.arange(rounds.shape[1])
+    return rounds @ weights
+
+
+def place_pairs(colors, stones, unsettled, moves, pairs):
+    """在每块棋盘上按 MOVES[moves] 从顶部落下颜色为 pairs 的方块组（原地修改）
+
+    返回 (每块棋盘是否放不下, 每轮消除数量)。放不下的棋盘不修改。
+    unsettled 见 apply_gravity。
+    与 GameState.update_opponent 相同：放入后结算连锁，再下落一次悬空的方块。
+    """
+    count = colors.shape[0]
+    tops = column_tops(colors, stones)
+    rows = np.arange(count)
+    x1 = MOVE_X[moves]
+    x2 = x1 + MOVE_DX[moves]
+    y2 = -1 + MOVE_DY[moves]
+    # 第二个方块在第 0 行时要检查是否已被占据（drop_pair 的碰撞检测）
+    blocked = (y2 >= 0) & (tops[rows, x2] <= y2)
+    distance = np.minimum(tops[rows, x1], tops[rows, x2] - y2 - 1)
+    y1 = -1 + distance
+    y2 = y2 + distance
+    lost = blocked | (y1 < 0) | (y2 < 0)
+
+    placed = np.flatnonzero(~lost)
+    x1, y1, x2, y2 = x1[placed], y1[placed], x2[placed], y2[placed]
+    colors[placed, y1, x1] = pairs[placed, 0]
+    colors[placed, y2, x2] = pairs[placed, 1]
+    rounds = np.zeros((count, MAX_CHAIN_ROUNDS), dtype=np.int64)
+    if len(placed):
+        # 横放在高低不平的两列上时，有一个方块悬空
+        below1 = np.minimum(y1 + 1, GAME_AREA_HEIGHT - 1)
+        below2 = np.minimum(y2 + 1, GAME_AREA_HEIGHT - 1)
+        floating = (y1 + 1 < GAME_AREA_HEIGHT) & (colors[placed, below1, x1] == 0) & (stones[placed, below1, x1] == 0)
+        floating |= (y2 + 1 < GAME_AREA_HEIGHT) & (colors[placed, below2, x2] == 0) & (stones[placed, below2, x2] == 0)
+
+        sub_colors = colors[placed]
+        sub_stones = stones[placed]
+        sub_unsettled = unsettled[placed]
+        sub_rounds = resolve_chain(sub_colors, sub_stones, sub_unsettled)
+        rounds[placed] = sub_rounds
+        # 其余棋盘上没有悬空的方块，下落不会改变它们
+        changed = floating | (sub_rounds[:, 0] > 0) | sub_unsettled
+        apply_gravity(sub_colors, sub_stones, np.flatnonzero(changed), sub_unsettled)
+        colors[placed] = sub_colors
+        stones[placed] = sub_stones
+        unsettled[placed] = sub_unsettled
+    return lost, rounds
+
+
+def greedy_moves(colors, stones, unsettled, pairs):
+    """为每块棋盘选择一步落点：连锁得分减去堆叠高度最高的落点（放不下的落点不选）"""
+    count = colors.shape[0]
+    width = len(MOVES)
+    trial_colors = np.repeat(colors, width, axis=0)
+    trial_stones = np.repeat(stones, width, axis=0)
+    moves = np.tile(np.arange(width), count)
+    trial_unsettled = np.repeat(unsettled, width)
+    lost, rounds = place_pairs(trial_colors, trial_stones, trial_unsettled, moves, np.repeat(pairs, width, axis=0))
+    heights = (GAME_AREA_HEIGHT - column_tops(trial_colors, trial_stones)).sum(axis=1)
+    value = chain_points(rounds) - GREEDY_HEIGHT_WEIGHT * heights
+    lost |= trial_colors[:, 0].any(axis=1)
+    value = np.where(lost, np.iinfo(np.int64).min, value)
+    return value.reshape(count, width).argmax(axis=1)
+
+
+class BatchSimulator:
+    """同时进行 count 局单人游戏的批量模拟器
+
+    roles 为角色名或每局的角色名列表，默认所有角色轮流分配；
+    policy 为 "random"（随机落点）或 "greedy"（见 greedy_moves）；
+    use_skills 为 False 时不使用技能。
+    """
+
+    def __init__(self, count, roles=None, policy="random", use_skills=True, seed=None,
+                 turn_ticks=TURN_TICKS):
+        self.count = count
+        if roles is None:
+            roles = [CHARACTER_NAMES[i % len(CHARACTER_NAMES)] for i in range(count)]
+        elif isinstance(roles, str):
+            roles = [roles] * count
+        self.characters = np.array([CHARACTER_NAMES.index(name) for name in roles])
+        self.cooldowns = COOLDOWNS[self.characters]
+        self.policy = policy
+        self.use_skills = use_skills
+        self.turn_ticks = turn_ticks
+        self.rng = np.random.default_rng(seed)
+
+        self.colors = np.zeros((count, GAME_AREA_HEIGHT, GAME_AREA_WIDTH), dtype=np.uint8)
+        self.stones = np.zeros((count, GAME_AREA_HEIGHT, GAME_AREA_WIDTH), dtype=np.uint8)
+        self.alive = np.ones(count, dtype=bool)
+        self.unsettled = np.zeros(count, dtype=bool)
+        self.tick = 0
+        self.turns = np.zeros(count, dtype=np.int64)
+        self.score = np.zeros(count, dtype=np.int64)
+        self.max_chain = np.zeros(count, dtype=np.int64)
+        self.energy = np.zeros(count, dtype=np.int64)
+        self.skill_ready_tick = np.zeros(count, dtype=np.int64)
+        self.skills_used = np.zeros(count, dtype=np.int64)
+        self.freezes = np.zeros(count, dtype=np.int64)
+
+        # 本回合的输入，供对照实现重放
+        self.pairs = None
+        self.moves = None
+        self.stone_columns = None
+        # 本回合每局每轮的消除数量，形状 (count, MAX_CHAIN_ROUNDS)
+        self.rounds = None
+
+    def draw_pairs(self):
+        """为每局随机一组方块的两个颜色编号，形状 (count, 2)"""
+        return self.rng.integers(1, len(BLOCK_COLORS) + 1, size=(self.count, 2), dtype=np.uint8)
+
+    def step(self, moves=None, skills=None, pairs=None):
+        """进行一回合：技能 → 落下方块组 → 结算 → 生成石头
+
+        moves 为 None 时由策略选择落点；skills 为每局是否尝试使用技能的布尔数组，
+        为 None 时按 use_skills 在技能可用时自动使用；pairs 为 None 时随机本回合的方块组。
+        """
+        alive = np.flatnonzero(self.alive)
+        self.pairs = self.draw_pairs() if pairs is None else pairs
+        if skills is not None:
+            self._use_skills(alive[skills[alive]])
+        elif self.use_skills:
+            self._use_skills(alive)
+
+        if moves is None:
+            if self.policy == "greedy":
+                moves = np.zeros(self.count, dtype=np.int64)
+                moves[alive] = greedy_moves(self.colors[alive], self.stones[alive], self.unsettled[alive],
+                                            self.pairs[alive])
+            else:
+                moves = self.rng.integers(0, len(MOVES), size=self.count)
+        self.moves = moves
+
+        colors = self.colors[alive]
+        stones = self.stones[alive]
+        unsettled = self.unsettled[alive]
+        lost, rounds = place_pairs(colors, stones, unsettled, moves[alive], self.pairs[alive])
+        lost |= colors[:, 0].any(axis=1)
+
+        self.rounds = np.zeros((self.count, MAX_CHAIN_ROUNDS), dtype=np.int64)
+        self.rounds[alive] = rounds
+        cleared = rounds.sum(axis=1)
+        self.score[alive] += chain_points(rounds)
+        self.max_chain[alive] = np.maximum(self.max_chain[alive], (rounds > 0).sum(axis=1))
+        self.energy[alive] = np.minimum(skill_max_energy, self.energy[alive] + cleared * 5)
+        self.turns[alive] += 1
+        self.alive[alive[lost]] = False
+
+        # 石头按时间生成在顶部的随机列（该格为空时）
+        self.tick += self.turn_ticks
+        spawns = self.tick // STONE_TICKS - (self.tick - self.turn_ticks) // STONE_TICKS
+        self.stone_columns = self.rng.integers(0, GAME_AREA_WIDTH, size=(spawns, self.count))
+        for columns in self.stone_columns:
+            free = (colors[np.arange(len(alive)), 0, columns[alive]] == 0) & \
+                   (stones[np.arange(len(alive)), 0, columns[alive]] == 0) & ~lost
+            stones[np.flatnonzero(free), 0, columns[alive][free]] = 1
+            apply_gravity(colors, stones, np.flatnonzero(free | unsettled), unsettled)
+
+        self.colors[alive] = colors
+        self.stones[alive] = stones
+        self.unsettled[alive] = unsettled
+
+    def reset_games(self, games):
+        """把 games 中的各局重置为新的一局（清空棋盘和统计，其余局不受影响）"""
+        self.colors[games] = 0
+        self.stones[games] = 0
+        self.alive[games] = True
+        self.unsettled[games] = False
+        for stats in (self.turns, self.score, self.max_chain, self.energy, self.skills_used, self.freezes):
+            stats[games] = 0
+        self.skill_ready_tick[games] = self.tick
+
+    def _use_skills(self, alive):
+        """alive 中能量已满且冷却结束的局使用技能"""
+        ready = alive[(self.energy[alive] >= skill_max_energy) & (self.skill_ready_tick[alive] <= self.tick)]
+        if not len(ready):
+            return
+        self.energy[ready] = 0
+        self.skill_ready_tick[ready] = self.tick + self.cooldowns[ready] * TICK_RATE
+        self.skills_used[ready] += 1
+
+        names = self.characters[ready]
+        colors = self.colors[ready]
+        for index, name in enumerate(CHARACTER_NAMES):
+            boards = names == index
+            if not boards.any():
+                continue
+            sub = colors[boards]
+            if name == "刻晴":
+                self.freezes[ready[boards]] += 1
+            elif name == "胡桃":
+                # 全部方块变为当前方块组第一个方块的颜色
+                target = self.pairs[ready[boards], 0].reshape(-1, 1, 1)
+                sub = np.where(sub > 0, target, 0).astype(np.uint8)
+            colors[boards] = sub
+        self.colors[ready] = colors
+
+    def run(self, max_turns=1000):
+        """推进到所有局结束或达到 max_turns 回合"""
+        for _ in range(max_turns):
+            if not self.alive.any():
+                break
+            self.step()
+
+    def totals(self):
+        """按角色合计：{角色名: {局数, 总得分, 总回合数, 最大连锁之和, 技能次数之和}}，可以跨批量相加"""
+        result = {}
+        for index, name in enumerate(CHARACTER_NAMES):
+            games = self.characters == index
+            if not games.any():
+                continue
+            result[name] = {
+                "games": int(games.sum()),
+                "score": int(self.score[games].sum()),
+                "turns": int(self.turns[games].sum()),
+                "max_chain": int(self.max_chain[games].sum()),
+                "skills": int(self.skills_used[games].sum()),
+            }
+        return result
+
+    def summary(self):
+        """按角色汇总：{角色名: {局数, 平均分, 平均回合数, 平均最大连锁, 平均技能次数}}"""
+        return summarize([self.totals()])
+
+
+def summarize(totals):
+    """把若干份 BatchSimulator.totals() 合并为按角色的平均值（格式同 BatchSimulator.summary）"""
+    merged = {}
+    for part in totals:
+        for name, values in part.items():
+            target = merged.setdefault(name, dict.fromkeys(values, 0))
+            for key, value in values.items():
+                target[key] += value
+    result = {}
+    for name in CHARACTER_NAMES:
+        if name not in merged:
+            continue
+        values = merged[name]
+        games = values["games"]
+        result[name] = {"games": games}
+        result[name].update((key, value / games) for key, value in values.items() if key != "games")
+    return result
+
+
+def _run_shard(options):
+    """在子进程中批量模拟一份局，返回 totals()"""
+    count, roles, policy, use_skills, seed, turn_ticks, max_turns = options
+    simulator = BatchSimulator(count, roles, policy, use_skills, seed, turn_ticks)
+    simulator.run(max_turns)
+    return simulator.totals()
+
+
+def run_parallel(count, workers=None, roles=None, policy="random", use_skills=True, seed=None,
+                 turn_ticks=TURN_TICKS, max_turns=1000):
+    """把 count 局平分到 workers 个进程（默认 CPU 核数）中各自批量模拟到结束，返回按角色的汇总
+
+    参数与 BatchSimulator 相同，角色分配与一次创建 count 局时相同；
+    各进程的随机数流由 seed 派生，同样的 seed 和 workers 得到同样的结果。
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, count))
+    if roles is None:
+        roles = [CHARACTER_NAMES[i % len(CHARACTER_NAMES)] for i in range(count)]
+    elif isinstance(roles, str):
+        roles = [roles] * count
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    bounds = [count * i // workers for i in range(workers + 1)]
+    shards = [(bounds[i + 1] - bounds[i], roles[bounds[i]:bounds[i + 1]], policy, use_skills, seeds[i],
+               turn_ticks, max_turns) for i in range(workers)]
+    if workers == 1:
+        return summarize([_run_shard(shards[0])])
+    with multiprocessing.Pool(workers) as pool:
+        return summarize(pool.map(_run_shard, shards))
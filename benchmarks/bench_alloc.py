@@ -0,0 +1,156 @@
+"""
+方块组操作的内存分配对比
+
+比较两种方块组表示在玩家操作（左右移动、旋转、加速下落）和自动下落上的开销：
+before 是原来的字典列表表示（每次操作都新建 [{"color", "x", "y"}, ...] 再检查碰撞），
+after 是 placement.Piece（__slots__ 对象，操作直接修改字段）。方块组落地后
+（棋盘保持不变）回到顶部重新生成，与游戏中一样每组方块新建一次。
+两者在同样的随机棋盘上执行同样的随机操作序列，先确认结果一致，再测量
+每秒操作数，并用 tracemalloc 统计每次操作新分配的字节数（操作结束前达到的
+内存峰值减去操作前的占用），两者相乘得到每秒分配的字节数。
+
+用法: python benchmarks/bench_alloc.py [--boards N] [--ops N] [--seed S]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_board import random_layout, build_board  # noqa: E402
+from board import GAME_AREA_WIDTH, BLOCK_COLORS, COLOR_IDS  # noqa: E402
+from placement import Piece, piece_fits  # noqa: E402
+
+OPERATIONS = ("left", "right", "rotate", "fall", "fall")
+
+
+def legacy_collision(board, blocks):
+    """原来的碰撞检测：逐个读取方块字典"""
+    for block in blocks:
+        if board.blocked(block["x"], block["y"]):
+            return True
+    return False
+
+
+def legacy_spawn(colors):
+    """原来的方块组生成"""
+    x = GAME_AREA_WIDTH // 2 - 1
+    return [{"color": colors[0], "x": x, "y": -1}, {"color": colors[1], "x": x, "y": 0}]
+
+
+def legacy_step(board, blocks, op):
+    """原来的字典列表表示执行一次操作，返回操作后的方块组（落地时为新生成的方块组）"""
+    if op == "left" or op == "right":
+        dx = -1 if op == "left" else 1
+        new_blocks = [{"color": block["color"], "x": block["x"] + dx, "y": block["y"]} for block in blocks]
+    elif op == "rotate":
+        center_x, center_y = blocks[0]["x"], blocks[0]["y"]
+        rel_x = blocks[1]["x"] - center_x
+        rel_y = blocks[1]["y"] - center_y
+        new_blocks = [
+            {"color": blocks[0]["color"], "x": center_x, "y": center_y},
+            {"color": blocks[1]["color"], "x": center_x - rel_y, "y": center_y + rel_x}
+        ]
+    else:
+        new_blocks = [{"color": block["color"], "x": block["x"], "y": block["y"] + 1} for block in blocks]
+    if legacy_collision(board, new_blocks):
+        if op == "fall":
+            return legacy_spawn((blocks[0]["color"], blocks[1]["color"]))
+        return blocks
+    return new_blocks
+
+
+def piece_step(board, piece, op):
+    """Piece 表示执行一次操作（原地修改），返回操作后的方块组（落地时为新生成的方块组）"""
+    if op == "left" or op == "right":
+        x = piece.x + (-1 if op == "left" else 1)
+        if piece_fits(board, x, piece.y, piece.rotation):
+            piece.x = x
+    elif op == "rotate":
+        rotation = (piece.rotation + 1) % 4
+        if piece_fits(board, piece.x, piece.y, rotation):
+            piece.rotation = rotation
+    elif piece_fits(board, piece.x, piece.y + 1, piece.rotation):
+        piece.y += 1
+    else:
+        return Piece(GAME_AREA_WIDTH // 2 - 1, -1, 0, piece.color1, piece.color2)
+    return piece
+
+
+def piece_spawn(colors):
+    """Piece 表示的方块组生成"""
+    return Piece(GAME_AREA_WIDTH // 2 - 1, -1, 0, COLOR_IDS[colors[0]], COLOR_IDS[colors[1]])
+
+
+def legacy_cells(blocks):
+    """方块组的位置，用于比较两种表示的结果"""
+    return tuple((block["x"], block["y"]) for block in blocks)
+
+
+def run(step, boards, pieces, ops):
+    """在每个棋盘上依次执行 ops，返回耗时（秒）"""
+    start = time.perf_counter()
+    for board, piece in zip(boards, pieces):
+        for op in ops:
+            piece = step(board, piece, op)
+    return time.perf_counter() - start
+
+
+def allocated_per_op(step, board, piece, ops):
+    """每次操作平均新分配的字节数"""
+    total = 0
+    tracemalloc.start()
+    for op in ops:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        piece = step(board, piece, op)
+        total += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return total / len(ops)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="方块组操作的内存分配对比")
+    parser.add_argument("--boards", type=int, default=200, help="随机棋盘数量")
+    parser.add_argument("--ops", type=int, default=2000, help="每个棋盘上的操作数")
+    parser.add_argument("--seed", type=int, default=1234, help="随机种子")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    layouts = [random_layout(rng) for _ in range(args.boards)]
+    colors = [(rng.choice(BLOCK_COLORS), rng.choice(BLOCK_COLORS)) for _ in layouts]
+    ops = [rng.choice(OPERATIONS) for _ in range(args.ops)]
+
+    variants = {
+        "before (dict)": (legacy_step, legacy_spawn, legacy_cells),
+        "after (Piece)": (piece_step, piece_spawn, Piece.cells),
+    }
+
+    # 确认两种表示走出的位置完全一致
+    boards = [build_board("list", layout) for layout in layouts[:20]]
+    paths = []
+    for step, spawn, cells in variants.values():
+        path = []
+        for board, pair in zip(boards, colors):
+            piece = spawn(pair)
+            for op in ops:
+                piece = step(board, piece, op)
+                path.append(cells(piece))
+        paths.append(path)
+    assert all(path == paths[0] for path in paths), "两种表示的结果不一致"
+    print("结果一致性检查通过")
+
+    boards = [build_board("list", layout) for layout in layouts]
+    print(f"{'representation':<16}{'ops/s':>14}{'bytes/op':>12}{'bytes/s':>16}")
+    for name, (step, spawn, _) in variants.items():
+        elapsed = run(step, boards, [spawn(pair) for pair in colors], ops)
+        rate = len(boards) * len(ops) / elapsed
+        per_op = allocated_per_op(step, boards[0], spawn(colors[0]), ops)
+        print(f"{name:<16}{rate:>14,.0f}{per_op:>12,.1f}{rate * per_op:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+资源加载冷启动对比
+
+模拟单文件打包版本的启动过程，再用 AssetManager 加载游戏启动时需要的全部图片和字体。
+比较三种方式：
+
+- files      启动时把每个资源文件解压（复制）到临时目录 sys._MEIPASS，再逐个读取
+- extracted  资源包打进可执行文件，启动时把这一个文件解压到临时目录再映射
+- beside     资源包放在可执行文件旁边（game.spec 现在的做法），不解压，直接映射
+
+用法: python benchmarks/bench_assets.py [--repeat N]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame  # noqa: E402
+
+from assets import PACK_FILE, AssetManager  # noqa: E402
+from build_assets import build_pack, collect_assets  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_all(files):
+    """像 game.py 启动时一样加载全部图片和字体"""
+    assets = AssetManager()
+    for name in files:
+        if name.endswith(".ttf"):
+            for size in (24, 36, 48):
+                assets.font(name, size)
+        elif not name.startswith("sounds"):
+            assets.try_image(name, (40, 40))
+    return assets
+
+
+def cold_start(files, mode, pack):
+    """按 mode（见模块说明）模拟一次打包版本的启动，返回 (解压耗时, 总耗时)（秒）
+
+    pack 为事先生成的资源包，表示随可执行文件一起发布的那一份。
+    """
+    saved = {name: getattr(sys, name, None) for name in ("frozen", "executable", "_MEIPASS")}
+    with tempfile.TemporaryDirectory() as meipass:
+        start = time.perf_counter()
+        if mode == "files":
+            for name, path in files.items():
+                target = os.path.join(meipass, name)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copyfile(path, target)
+        elif mode == "extracted":
+            shutil.copyfile(pack, os.path.join(meipass, PACK_FILE))
+        extract = time.perf_counter() - start
+        # 可执行文件在资源包所在的目录中
+        sys.frozen, sys.executable, sys._MEIPASS = True, os.path.join(os.path.dirname(pack), "game"), meipass
+        try:
+            assets = load_all(files)
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    delattr(sys, name)
+                else:
+                    setattr(sys, name, value)
+        elapsed = time.perf_counter() - start
+        if (assets.pack is None) != (mode == "files") or assets.failures:
+            raise AssertionError("资源来源不正确")
+        return extract, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="资源加载冷启动对比")
+    parser.add_argument("--repeat", type=int, default=20, help="重复次数")
+    args = parser.parse_args()
+
+    pygame.init()
+    pygame.display.set_mode((1280, 720))
+    files = collect_assets(ROOT)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as dist:
+        # 发布目录：files 方式下这里没有资源包
+        pack = os.path.join(dist, PACK_FILE)
+        build_pack(ROOT, pack)
+        for mode in ("files", "extracted", "beside"):
+            if mode == "files":
+                os.rename(pack, pack + ".off")
+            times = [cold_start(files, mode, pack) for _ in range(args.repeat)]
+            if mode == "files":
+                os.rename(pack + ".off", pack)
+            results[mode] = [statistics.median(column) for column in zip(*times)]
+
+    print(f"资源数量: {len(files)}")
+    print(f"{'':<12}{'extract ms':>12}{'total ms':>12}{'speedup':>10}")
+    for name, (extract, total) in results.items():
+        print(f"{name:<12}{extract * 1000:>12.2f}{total * 1000:>12.2f}{results['files'][1] / total:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
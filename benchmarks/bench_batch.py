@@ -0,0 +1,142 @@
+"""
+批量模拟器性能对比
+
+先用同样的随机输入（方块组颜色、落点、石头列）在 ListBoard 上逐局重放
+batch.BatchSimulator 的回合，确认每一回合后的棋盘、得分和胜负都一致；
+再分别测量逐局 Python 模拟（ListBoard + clear_chain）、单进程批量模拟和
+batch.run_parallel 多进程批量模拟每秒能进行的回合数。
+一致性检查不使用技能（技能的随机选择无法逐局重放）。
+
+用法: python benchmarks/bench_batch.py [--games N] [--turns N] [--seed S] [--policy random|greedy] [--workers N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai import chain_points  # noqa: E402
+from batch import MOVES, BatchSimulator, run_parallel  # noqa: E402
+from board import GAME_AREA_WIDTH, GAME_AREA_HEIGHT, COLOR_NAMES, clear_chain, make_board  # noqa: E402
+from placement import drop_pair  # noqa: E402
+
+
+class ReferenceGame:
+    """用 ListBoard 逐局重放批量模拟器的一局"""
+
+    def __init__(self):
+        self.board = make_board("list")
+        self.score = 0
+        self.alive = True
+
+    def play(self, pair, move, stone_columns):
+        """落下一组方块并生成石头，与 BatchSimulator.step 的顺序相同"""
+        board = self.board
+        piece = drop_pair(board, pair, *MOVES[move])
+        if piece is None or any(y < 0 for _, y in piece.cells()):
+            self.alive = False
+        else:
+            for x, y, color in piece.blocks():
+                board.set_color(x, y, COLOR_NAMES[color])
+            self.score += chain_points(clear_chain(board))
+            board.drop_floating_blocks()
+            if board.has_top_block():
+                self.alive = False
+        for x in stone_columns:
+            if self.alive and not board.blocked(x, 0):
+                board.set_stone(x, 0)
+            board.drop_floating_blocks()
+
+    def snapshot(self):
+        board = self.board
+        return [(board.color_at(x, y), board.stone_at(x, y))
+                for y in range(GAME_AREA_HEIGHT) for x in range(GAME_AREA_WIDTH)]
+
+
+def batch_snapshot(simulator, index):
+    colors = simulator.colors[index]
+    stones = simulator.stones[index]
+    return [(COLOR_NAMES[colors[y, x]], bool(stones[y, x]))
+            for y in range(GAME_AREA_HEIGHT) for x in range(GAME_AREA_WIDTH)]
+
+
+def verify(games, turns, seed, policy):
+    """逐回合对比批量模拟器与 ListBoard 的结果"""
+    simulator = BatchSimulator(games, policy=policy, use_skills=False, seed=seed)
+    references = [ReferenceGame() for _ in range(games)]
+    for _ in range(turns):
+        alive = simulator.alive.copy()
+        if not alive.any():
+            break
+        simulator.step()
+        for index, game in enumerate(references):
+            if not alive[index]:
+                continue
+            pair = tuple(int(color) for color in simulator.pairs[index])
+            game.play(pair, int(simulator.moves[index]), [int(x) for x in simulator.stone_columns[:, index]])
+            assert game.alive == simulator.alive[index], f"第 {index} 局胜负不一致"
+            assert game.score == simulator.score[index], f"第 {index} 局得分不一致"
+            if game.alive:
+                assert game.snapshot() == batch_snapshot(simulator, index), f"第 {index} 局棋盘不一致"
+
+
+def reference_rate(games, turns, seed):
+    """逐局 Python 模拟每秒的回合数（输入取自批量模拟器，不计入耗时）"""
+    simulator = BatchSimulator(games, use_skills=False, seed=seed)
+    inputs = []
+    for _ in range(turns):
+        simulator.step()
+        inputs.append((simulator.pairs.tolist(), simulator.moves.tolist(), simulator.stone_columns.T.tolist()))
+
+    references = [ReferenceGame() for _ in range(games)]
+    played = 0
+    start = time.perf_counter()
+    for pairs, moves, stone_columns in inputs:
+        for index, game in enumerate(references):
+            if game.alive:
+                game.play(pairs[index], moves[index], stone_columns[index])
+                played += 1
+    return played / (time.perf_counter() - start)
+
+
+def batch_rate(games, turns, seed, policy):
+    """批量模拟每秒的回合数"""
+    simulator = BatchSimulator(games, policy=policy, seed=seed)
+    start = time.perf_counter()
+    for _ in range(turns):
+        simulator.step()
+    return simulator.turns.sum() / (time.perf_counter() - start)
+
+
+def parallel_rate(games, turns, seed, policy, workers):
+    """多进程批量模拟每秒的回合数（含进程启动和汇总）"""
+    start = time.perf_counter()
+    summary = run_parallel(games, workers, policy=policy, seed=seed, max_turns=turns)
+    played = sum(values["games"] * values["turns"] for values in summary.values())
+    return played / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量模拟器性能对比")
+    parser.add_argument("--games", type=int, default=20000, help="批量模拟的局数")
+    parser.add_argument("--turns", type=int, default=30, help="测量的回合数")
+    parser.add_argument("--seed", type=int, default=1234, help="随机种子")
+    parser.add_argument("--policy", choices=("random", "greedy"), default="random", help="落点策略")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="多进程批量模拟的进程数（默认 CPU 核数）")
+    args = parser.parse_args()
+
+    verify(200, 200, args.seed, args.policy)
+    print("结果一致性检查通过")
+
+    single = reference_rate(min(args.games, 1000), args.turns, args.seed)
+    batched = batch_rate(args.games, args.turns, args.seed, args.policy)
+    parallel = parallel_rate(args.games, args.turns, args.seed, args.policy, args.workers)
+    print(f"{'simulator':<28}{'turns/s':>14}{'speedup':>10}")
+    print(f"{'ListBoard (per game)':<28}{single:>14,.0f}{1:>9.1f}x")
+    print(f"{'BatchSimulator':<28}{batched:>14,.0f}{batched / single:>9.1f}x")
+    print(f"{f'run_parallel ({args.workers} proc)':<28}{parallel:>14,.0f}{parallel / single:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
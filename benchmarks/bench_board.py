@@ -0,0 +1,136 @@
+"""
+棋盘实现性能对比
+
+先在随机棋盘上确认 ListBoard 和 BitBoard 的结果完全一致，再分别测量
+check_collision、check_clear、clear_isolated_stones、drop_floating_blocks
+每秒可执行的次数。drop_floating_blocks (settled) 测量已经落稳的棋盘上
+再次调用重力的开销（主循环每次下落都会调用）。
+
+用法: python benchmarks/bench_board.py [--boards N] [--seed S]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from board import GAME_AREA_WIDTH, GAME_AREA_HEIGHT, BLOCK_COLORS, BOARD_BACKENDS, make_board  # noqa: E402
+
+
+def random_layout(rng):
+    """生成一个随机棋盘布局 [(x, y, color, stone), ...]
+
+    每列堆到随机高度，其中夹杂少量空洞（用于测试重力）和石头。
+    """
+    cells = []
+    for x in range(GAME_AREA_WIDTH):
+        height = rng.randint(0, GAME_AREA_HEIGHT - 2)
+        for y in range(GAME_AREA_HEIGHT - height, GAME_AREA_HEIGHT):
+            roll = rng.random()
+            if roll < 0.08:
+                continue  # 空洞
+            if roll < 0.2:
+                cells.append((x, y, None, True))
+            else:
+                cells.append((x, y, rng.choice(BLOCK_COLORS), False))
+    return cells
+
+
+def build_board(backend, layout):
+    """按布局创建指定实现的棋盘"""
+    board = make_board(backend)
+    for x, y, color, stone in layout:
+        if stone:
+            board.set_stone(x, y)
+        else:
+            board.set_color(x, y, color)
+    return board
+
+
+def snapshot(board):
+    """把棋盘转换为可比较的元组"""
+    return tuple((board.color_at(x, y), board.stone_at(x, y))
+                 for y in range(GAME_AREA_HEIGHT) for x in range(GAME_AREA_WIDTH))
+
+
+def random_pair(rng):
+    """随机位置的方块组，用于碰撞检测"""
+    x = rng.randint(-1, GAME_AREA_WIDTH)
+    y = rng.randint(-1, GAME_AREA_HEIGHT)
+    return [(x, y), (x, y + 1)]
+
+
+def verify(layouts, pairs):
+    """确认各实现的所有原语结果一致"""
+    for layout in layouts:
+        results = []
+        for backend in BOARD_BACKENDS:
+            board = build_board(backend, layout)
+            outcome = [[board.check_collision(pair) for pair in pairs]]
+            outcome.append(board.check_clear())
+            outcome.append(snapshot(board))
+            board.drop_floating_blocks()
+            outcome.append(snapshot(board))
+            board = build_board(backend, layout)
+            board.clear_isolated_stones()
+            outcome.append(snapshot(board))
+            outcome.append(board.colored_cells())
+            results.append(outcome)
+        for other in results[1:]:
+            if other != results[0]:
+                raise AssertionError("棋盘实现结果不一致")
+
+
+def ops_per_second(func, boards):
+    """对每个棋盘副本执行一次 func，返回每秒次数"""
+    start = time.perf_counter()
+    for board in boards:
+        func(board)
+    return len(boards) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="棋盘实现性能对比")
+    parser.add_argument("--boards", type=int, default=2000, help="随机棋盘数量")
+    parser.add_argument("--seed", type=int, default=1234, help="随机种子")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    layouts = [random_layout(rng) for _ in range(args.boards)]
+    pairs = [random_pair(rng) for _ in range(32)]
+
+    verify(layouts[:200], pairs)
+    print("结果一致性检查通过")
+
+    def settle(board):
+        board.drop_floating_blocks()
+        board.drop_floating_blocks()
+
+    # 名称 -> (准备函数, 被测函数)
+    primitives = {
+        "check_collision": (None, lambda board: [board.check_collision(pair) for pair in pairs]),
+        "check_clear": (None, lambda board: board.check_clear()),
+        "clear_isolated_stones": (None, lambda board: board.clear_isolated_stones()),
+        "drop_floating_blocks": (None, lambda board: board.drop_floating_blocks()),
+        "drop_floating_blocks (settled)": (settle, lambda board: board.drop_floating_blocks()),
+    }
+
+    print(f"{'primitive':<32}" + "".join(f"{backend:>14}" for backend in BOARD_BACKENDS) + f"{'speedup':>10}")
+    for name, (prepare, func) in primitives.items():
+        rates = []
+        for backend in BOARD_BACKENDS:
+            boards = [build_board(backend, layout) for layout in layouts]
+            if prepare is not None:
+                for board in boards:
+                    prepare(board)
+            rate = ops_per_second(func, boards)
+            if name == "check_collision":
+                rate *= len(pairs)
+            rates.append(rate)
+        print(f"{name:<32}" + "".join(f"{rate:>14,.0f}" for rate in rates) + f"{rates[-1] / rates[0]:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+强化学习环境每秒步数
+
+用随机动作分别推进 env.GameEnv（完整的一局，含对手 AI）和 env.VectorEnv
+（批量单人游戏），统计每秒的环境步数（VectorEnv 的一步按局数计）。
+作为对照，界面循环每秒最多只能落 TICK_RATE 组方块。
+
+用法: python benchmarks/bench_env.py [--steps N] [--count N] [--difficulty 简单|普通|困难] [--seed S]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai import DEFAULT_DIFFICULTY, DIFFICULTY_LEVELS  # noqa: E402
+from board import GAME_AREA_WIDTH  # noqa: E402
+from engine import TICK_RATE  # noqa: E402
+from env import GameEnv, VectorEnv  # noqa: E402
+from placement import ROTATION_OFFSETS  # noqa: E402
+
+
+def game_env_rate(steps, difficulty, seed):
+    """GameEnv 每秒步数，一局结束后重新开始"""
+    rng = random.Random(seed)
+    env = GameEnv(difficulty=difficulty)
+    episodes = 0
+    env.reset(seed=seed)
+    start = time.perf_counter()
+    for _ in range(steps):
+        action = (rng.randrange(GAME_AREA_WIDTH), rng.randrange(len(ROTATION_OFFSETS)), rng.random() < 0.1)
+        _, _, terminated, truncated, _ = env.step(action)
+        if terminated or truncated:
+            episodes += 1
+            env.reset(seed=seed + episodes)
+    return steps / (time.perf_counter() - start)
+
+
+def vector_env_rate(steps, count, seed):
+    """VectorEnv 每秒步数（所有局的步数之和）"""
+    rng = np.random.default_rng(seed)
+    env = VectorEnv(count, seed=seed)
+    env.reset()
+    actions = np.zeros((count, 3), dtype=np.int64)
+    start = time.perf_counter()
+    for _ in range(steps):
+        actions[:, 0] = rng.integers(0, GAME_AREA_WIDTH, count)
+        actions[:, 1] = rng.integers(0, len(ROTATION_OFFSETS), count)
+        actions[:, 2] = rng.random(count) < 0.1
+        env.step(actions)
+    return steps * count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="强化学习环境每秒步数")
+    parser.add_argument("--steps", type=int, default=500, help="每种环境推进的步数")
+    parser.add_argument("--count", type=int, default=4096, help="VectorEnv 的局数")
+    parser.add_argument("--difficulty", choices=list(DIFFICULTY_LEVELS), default=DEFAULT_DIFFICULTY,
+                        help="GameEnv 对手难度")
+    parser.add_argument("--seed", type=int, default=1234, help="随机种子")
+    args = parser.parse_args()
+
+    print(f"{'environment':<24}{'steps/s':>14}")
+    print(f"{'game loop (limit)':<24}{TICK_RATE:>14,}")
+    print(f"{'GameEnv':<24}{game_env_rate(args.steps, args.difficulty, args.seed):>14,.0f}")
+    print(f"{'VectorEnv':<24}{vector_env_rate(args.steps, args.count, args.seed):>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
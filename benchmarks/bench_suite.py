@@ -0,0 +1,281 @@
+"""
+规则原语、完整逻辑步和绘制的基准套件
+
+在几种由种子确定、可以重现的棋盘上测量：
+check_collision、check_clear、drop_floating_blocks、clear_isolated_stones、
+rotate_blocks、每个角色的技能（use_skill）、完整的逻辑步（GameState.step，
+对手落子在步内同步搜索）以及在 SDL dummy 驱动下绘制到离屏 Surface 的 draw_game。
+
+棋盘场景：
+- empty      空棋盘
+- half       堆到一半高度，少量石头
+- stones     石头占一半的棋盘
+- near_over  堆到接近顶部（第 0 行仍为空），即将结束
+
+会改变棋盘的操作每次都在新建的局面上执行（建局面不计时）。每项测量重复
+--repeat 轮，每轮执行 --number 次，记录每次操作耗时的中位数和最小值（微秒）。
+结果写成 JSON；指定 --compare 时与之前保存的结果对比，中位数变慢超过
+--threshold 的项目列为回归，并以非零状态退出。
+
+用法: python benchmarks/bench_suite.py [--backend list|bit] [--seed S] [--number N] [--repeat N]
+                                      [--output FILE] [--compare FILE] [--threshold R]
+                                      [--filter TEXT] [--no-render]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_board import build_board, random_pair  # noqa: E402
+from board import BLOCK_COLORS, BOARD_BACKENDS, GAME_AREA_HEIGHT, GAME_AREA_WIDTH  # noqa: E402
+from engine import GameState, character_options, skill_max_energy  # noqa: E402
+from placement import Piece  # noqa: E402
+
+# 结果文件的格式版本
+RESULT_VERSION = 1
+
+# 默认的结果文件
+RESULT_FILE = "bench_suite.json"
+
+# 场景：名称 -> (每列高度范围, 石头比例)，每列从底部堆到随机高度，夹杂少量空洞
+SCENARIOS = {
+    "empty": ((0, 0), 0.0),
+    "half": ((GAME_AREA_HEIGHT // 2 - 2, GAME_AREA_HEIGHT // 2 + 2), 0.1),
+    "stones": ((GAME_AREA_HEIGHT // 3, 2 * GAME_AREA_HEIGHT // 3), 0.5),
+    "near_over": ((GAME_AREA_HEIGHT - 3, GAME_AREA_HEIGHT - 1), 0.15),
+}
+
+# 空洞的比例（用于测试重力）
+HOLE_RATE = 0.08
+
+# 碰撞检测使用的随机方块组数量
+COLLISION_PIECES = 32
+
+# 完整逻辑步的测量每次推进的步数（含一次生成石头和若干次对手落子）
+TICK_RUN = 300
+
+# 完整逻辑步每轮的局数为 --number 除以该数
+TICK_DIVISOR = 20
+
+
+def scenario_layout(name, seed):
+    """场景 name 的棋盘布局 [(x, y, color, stone), ...]，由 seed 和场景名确定"""
+    (low, high), stone_rate = SCENARIOS[name]
+    rng = random.Random(f"{seed}/{name}")
+    cells = []
+    for x in range(GAME_AREA_WIDTH):
+        height = rng.randint(low, high)
+        for y in range(GAME_AREA_HEIGHT - height, GAME_AREA_HEIGHT):
+            roll = rng.random()
+            if roll < HOLE_RATE:
+                continue
+            if roll < HOLE_RATE + stone_rate:
+                cells.append((x, y, None, True))
+            else:
+                cells.append((x, y, rng.choice(BLOCK_COLORS), False))
+    return cells
+
+
+def make_state(backend, layout, seed, character="胡桃"):
+    """在布局 layout 上开局的 GameState（双方棋盘相同）"""
+    state = GameState(character, backend=backend, seed=seed)
+    state.board = build_board(backend, layout)
+    state.opponent_board = build_board(backend, layout)
+    return state
+
+
+def collision_pieces(seed):
+    """碰撞检测使用的随机方块组（各种位置和旋转）"""
+    rng = random.Random(f"{seed}/collision")
+    pieces = []
+    for _ in range(COLLISION_PIECES):
+        (x, y), _ = random_pair(rng)
+        pieces.append(Piece(x, y, rng.randrange(4), 1, 2))
+    return pieces
+
+
+def timeit(prepare, func, operations, number, repeat):
+    """每轮用 prepare() 准备 number 个对象（不计时），再对每个对象执行 func，
+    返回每轮中每次操作的秒数列表
+
+    func 返回本次执行的操作数，返回 None 时为 operations。
+    """
+    rounds = []
+    for _ in range(repeat):
+        subjects = [prepare() for _ in range(number)]
+        count = 0
+        start = time.perf_counter()
+        for subject in subjects:
+            done = func(subject)
+            count += operations if done is None else done
+        rounds.append((time.perf_counter() - start) / max(1, count))
+    return rounds
+
+
+def load_renderer():
+    """导入 game（在仓库根目录下加载资源），把它的屏幕换成离屏 Surface"""
+    os.chdir(ROOT)
+    import pygame
+    import game
+    game.screen = pygame.Surface((game.SCREEN_WIDTH, game.SCREEN_HEIGHT))
+    return game
+
+
+def build_cases(backend, seed, render):
+    """全部测量项：[(名称, 准备函数, 被测函数, 每次执行包含的操作数, 每轮执行次数的缩减倍数), ...]"""
+    game = load_renderer() if render else None
+    pieces = collision_pieces(seed)
+    cases = []
+    for scenario in SCENARIOS:
+        layout = scenario_layout(scenario, seed)
+        shared = make_state(backend, layout, seed)
+
+        def fresh(character="胡桃", layout=layout):
+            return make_state(backend, layout, seed, character)
+
+        def fresh_board(layout=layout):
+            return build_board(backend, layout)
+
+        def collisions(state):
+            for piece in pieces:
+                state.check_collision(piece)
+
+        def rotate(state):
+            state.rotate_blocks()
+            state.events.clear()
+
+        cases += [
+            (f"{scenario}/check_collision", lambda shared=shared: shared, collisions, len(pieces), 1),
+            (f"{scenario}/check_clear", fresh_board, lambda board: board.check_clear(), 1, 1),
+            (f"{scenario}/drop_floating_blocks", fresh_board, lambda board: board.drop_floating_blocks(), 1, 1),
+            (f"{scenario}/clear_isolated_stones", fresh_board, lambda board: board.clear_isolated_stones(), 1, 1),
+            (f"{scenario}/rotate_blocks", lambda shared=shared: shared, rotate, 1, 1),
+        ]
+
+        for character in character_options:
+            def charged(character=character, fresh=fresh):
+                state = fresh(character)
+                state.skill_energy = skill_max_energy
+                return state
+            cases.append((f"{scenario}/use_skill/{character}", charged, lambda state: state.use_skill(), 1, 1))
+
+        cases.append((f"{scenario}/tick", fresh, run_ticks, TICK_RUN, TICK_DIVISOR))
+
+        if game is not None:
+            def full_frame(state):
+                game.invalidate_screen()
+                draw(state)
+
+            def draw(state):
+                game.state = state
+                game.draw_game()
+                game.dirty_rects.clear()
+
+            def drawn(fresh=fresh):
+                state = fresh()
+                full_frame(state)
+                return state
+
+            cases.append((f"{scenario}/draw_game/full", fresh, full_frame, 1, 1))
+            cases.append((f"{scenario}/draw_game/idle", drawn, draw, 1, 1))
+    return cases
+
+
+def run_ticks(state):
+    """推进 TICK_RUN 步或到本局结束，返回推进的步数"""
+    while state.tick < TICK_RUN and not state.step():
+        pass
+    return state.tick
+
+
+def git_commit():
+    """当前提交的短哈希（不在 git 仓库中时为 None）"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """与基准结果对比，打印变化并返回回归的项目列表"""
+    regressions = []
+    print(f"\n{'benchmark':<40}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        ratio = result["median_us"] / old["median_us"] - 1 if old["median_us"] else 0.0
+        flag = ""
+        if ratio > threshold:
+            regressions.append(name)
+            flag = "  回归"
+        print(f"{name:<40}{old['median_us']:>12.2f}{result['median_us']:>12.2f}{ratio:>+9.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="规则原语、完整逻辑步和绘制的基准套件")
+    parser.add_argument("--backend", choices=BOARD_BACKENDS, default="list", help="棋盘实现")
+    parser.add_argument("--seed", type=int, default=1234, help="生成场景棋盘的种子")
+    parser.add_argument("--number", type=int, default=200, help="每轮执行次数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复轮数")
+    parser.add_argument("--output", default=RESULT_FILE, help="写入 JSON 结果的文件")
+    parser.add_argument("--compare", metavar="FILE", help="与之前保存的 JSON 结果对比")
+    parser.add_argument("--threshold", type=float, default=0.2, help="中位数变慢超过该比例时视为回归")
+    parser.add_argument("--no-render", action="store_true", help="不导入 pygame，跳过 draw_game")
+    parser.add_argument("--filter", default="", help="只运行名称中包含该字符串的项目")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    baseline_path = args.compare and os.path.abspath(args.compare)
+    cases = [case for case in build_cases(args.backend, args.seed, not args.no_render) if args.filter in case[0]]
+    results = {}
+    print(f"{'benchmark':<40}{'median us':>12}{'min us':>12}")
+    for name, prepare, func, operations, divisor in cases:
+        number = max(1, args.number // divisor)
+        rounds = [seconds * 1e6 for seconds in timeit(prepare, func, operations, number, args.repeat)]
+        results[name] = {"median_us": statistics.median(rounds), "min_us": min(rounds), "number": number,
+                         "repeat": args.repeat}
+        print(f"{name:<40}{results[name]['median_us']:>12.2f}{results[name]['min_us']:>12.2f}")
+
+    document = {
+        "version": RESULT_VERSION,
+        "meta": {
+            "commit": git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": args.backend,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {output}")
+
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("version") != RESULT_VERSION:
+            sys.exit(f"{args.compare} 的格式版本不同，无法对比")
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print(f"{len(regressions)} 项回归超过 {args.threshold:.0%}:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("没有超过阈值的回归")
+
+
+if __name__ == "__main__":
+    main()
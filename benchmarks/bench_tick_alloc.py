@@ -0,0 +1,211 @@
+"""
+逐步、逐帧内存分配预算检查
+
+用固定种子和脚本化的随机操作进行一局（对手由不限时的 AI 落子）并录成录像，
+再在 tracemalloc 下回放这一局。回放时对手的落点取自录像，相当于界面中由
+后台规划器提前算好的落点，搜索本身不在主循环里。统计以下几项：
+
+- 每一逻辑步内新分配的峰值字节数，即步结束前的峰值减去步开始时的占用。
+  按这一步发生的事（空闲、自动下落、对手落子等）分类。
+- 每一帧的绘制：在 SDL dummy 驱动下执行 game.draw_game 和 present，统计方法同上。
+- 测量期间保留下来的内存增长（不计本脚本自己记录的样本），以及触发的垃圾回收次数。
+  界面的文字缓存等有上限的缓存在测量期间还会继续填充，保留增长的预算为它们留了余量。
+
+预热阶段之后才开始统计，避免把缓存的首次填充算进去。
+任何一项超出预算都以非零状态退出。tests/test_alloc.py 用较短的一局检查同样的预算，
+随测试一起运行；本脚本用于查看各类的详细分布。
+
+用法: python benchmarks/bench_tick_alloc.py [--seed S] [--ticks N] [--warmup N] [--no-render]
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from engine import INPUTS, GameState, character_options  # noqa: E402
+from replay import ReplayPlayer, ReplayRecorder  # noqa: E402
+
+# 预算（字节）：空闲的一步只允许步数、时间这类数值对象的分配，不能创建容器
+IDLE_TICK_BUDGET = 128
+# 自动下落（方块组没有落地）的一步
+DROP_TICK_BUDGET = 256
+# 任意一步（含放置、连锁、对手落子）
+TICK_BUDGET = 8 * 1024
+# 棋盘和状态栏都没有变化的一帧（只允许遍历棋盘时的迭代器和数值这类临时对象）
+IDLE_FRAME_BUDGET = 256
+# 任意一帧（含需要重新渲染文字的帧）
+FRAME_BUDGET = 16 * 1024
+# 测量期间保留下来的内存增长（含文字缓存填满 TEXT_CACHE_SIZE 项）
+RETAINED_BUDGET = 64 * 1024
+# 测量期间每 1000 步触发的垃圾回收次数
+GC_BUDGET = 2.0
+
+# 脚本化操作：每步以 INPUT_RATE 的概率执行一个随机操作（不含改变速度）
+INPUT_RATE = 0.05
+SCRIPT_INPUTS = tuple(code for code, name in enumerate(INPUTS) if not name.startswith("speed"))
+
+
+def record_game(seed, ticks):
+    """用脚本化操作进行一局，返回录像"""
+    rng = random.Random(seed)
+    state = GameState(rng.choice(character_options), seed=seed)
+    recorder = ReplayRecorder(state)
+    state.attach_recorder(recorder)
+    while not state.game_over and state.tick < ticks:
+        if rng.random() < INPUT_RATE:
+            state.apply_input(rng.choice(SCRIPT_INPUTS))
+        state.step()
+    return recorder.finish(state)
+
+
+def tick_kind(player):
+    """下一步将发生的事：到期的定时器种类和是否有玩家操作，例如 "drop+opponent"、"idle" """
+    state = player.state
+    timers = state.timers
+    tick = timers.tick + 1
+    kinds = sorted({timer.kind for timer in timers.slots[tick % timers.size] if timer.active and timer.due == tick})
+    inputs = player.replay.inputs
+    if player.input_index < len(inputs) and inputs[player.input_index][0] == state.tick:
+        kinds.append("input")
+    return "+".join(kinds) or "idle"
+
+
+def measure(call):
+    """调用 call()，返回期间新分配的峰值字节数"""
+    before = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    call()
+    return tracemalloc.get_traced_memory()[1] - before
+
+
+def traced_size():
+    """当前被跟踪的内存字节数，不计本脚本和 tracemalloc 自身的分配"""
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__)))
+    return sum(stat.size for stat in snapshot.statistics("filename"))
+
+
+def load_renderer(state):
+    """导入 game（在仓库根目录下加载资源）并让它绘制 state"""
+    os.chdir(ROOT)
+    import game
+    game.state = state
+    game.current_character = state.character
+    game.opponent_character = state.opponent_character
+    game.invalidate_screen()
+    return game
+
+
+def run(replay, warmup, render):
+    """回放 replay，返回 (每步 {种类: [字节, ...]}, 每帧 {种类: [字节, ...]}, 保留增长, 测量步数, 回收次数)"""
+    player = ReplayPlayer(replay)
+    game = load_renderer(player.state) if render else None
+    ticks = {}
+    frames = {}
+    collections = []
+    gc.callbacks.append(lambda phase, info: phase == "start" and collections.append(info["generation"]))
+
+    def draw():
+        game.draw_game()
+        game.present()
+
+    tracemalloc.start()
+    measured = 0
+    retained_start = None
+    while not player.finished:
+        if player.state.tick == warmup:
+            collections.clear()
+            retained_start = traced_size()
+        kind = tick_kind(player)
+        allocated = measure(player.step)
+        # 与界面一样，音效事件每帧取走
+        player.state.events.clear()
+        if player.state.tick <= warmup:
+            if game is not None:
+                draw()
+            continue
+        measured += 1
+        ticks.setdefault(kind, []).append(allocated)
+        if game is not None:
+            snapshot = player.state.board.snapshot(), player.state.opponent_board.snapshot()
+            hud = list(game.hud_values)
+            allocated = measure(draw)
+            changed = (snapshot != (player.state.board.snapshot(), player.state.opponent_board.snapshot())
+                       or hud != game.hud_values or kind != "idle")
+            frames.setdefault("changed" if changed else "idle", []).append(allocated)
+    retained = traced_size() - retained_start if retained_start is not None else 0
+    tracemalloc.stop()
+    gc.callbacks.pop()
+    return ticks, frames, retained, measured, len(collections)
+
+
+def tick_budget(kind):
+    """kind 这类逻辑步的预算（字节）"""
+    return {"idle": IDLE_TICK_BUDGET, "drop": DROP_TICK_BUDGET}.get(kind, TICK_BUDGET)
+
+
+def frame_budget(kind):
+    """kind 这类帧的预算（字节）"""
+    return IDLE_FRAME_BUDGET if kind == "idle" else FRAME_BUDGET
+
+
+def over_budget(title, samples, budgets):
+    """各类中最大值超出预算的说明列表"""
+    return [f"{title} {kind}: {max(values)} 字节 > {budgets(kind)}"
+            for kind, values in samples.items() if max(values) > budgets(kind)]
+
+
+def check(ticks, frames, retained, measured, collections):
+    """run() 的结果中超出预算的说明列表，全部在预算之内时为空"""
+    failures = over_budget("tick (bytes)", ticks, tick_budget) + over_budget("frame (bytes)", frames, frame_budget)
+    if retained > RETAINED_BUDGET:
+        failures.append(f"保留增长 {retained} 字节 > {RETAINED_BUDGET}")
+    if collections * 1000 / measured > GC_BUDGET:
+        failures.append(f"每千步垃圾回收 {collections * 1000 / measured:.2f} 次 > {GC_BUDGET}")
+    return failures
+
+
+def report(title, samples, budgets):
+    """打印各类的 p50 / p99 / max 和预算"""
+    print(f"{title:<28}{'count':>8}{'p50':>8}{'p99':>8}{'max':>8}{'budget':>8}")
+    for kind, values in sorted(samples.items(), key=lambda item: -len(item[1])):
+        values = sorted(values)
+        print(f"{kind:<28}{len(values):>8}{values[len(values) // 2]:>8}{values[int(len(values) * 0.99)]:>8}"
+              f"{values[-1]:>8}{budgets(kind):>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="逐步、逐帧内存分配预算检查")
+    parser.add_argument("--seed", type=int, default=1234, help="对局种子（也决定脚本化操作）")
+    parser.add_argument("--ticks", type=int, default=120 * 60, help="最多进行的逻辑步数")
+    parser.add_argument("--warmup", type=int, default=10 * 60, help="开始统计前的预热步数")
+    parser.add_argument("--no-render", action="store_true", help="只检查逻辑步，不导入 pygame 绘制")
+    args = parser.parse_args()
+
+    replay = record_game(args.seed, args.ticks)
+    ticks, frames, retained, measured, collections = run(replay, args.warmup, not args.no_render)
+    if not measured:
+        sys.exit(f"对局在预热的 {args.warmup} 步内就结束了，请换一个种子或减少 --warmup")
+
+    report("tick (bytes)", ticks, tick_budget)
+    if frames:
+        report("frame (bytes)", frames, frame_budget)
+    print(f"测量 {measured} 步: 保留增长 {retained:,} 字节（预算 {RETAINED_BUDGET:,}），"
+          f"垃圾回收 {collections} 次（每千步 {collections * 1000 / measured:.2f}，预算 {GC_BUDGET}）")
+    failures = check(ticks, frames, retained, measured, collections)
+
+    if failures:
+        print("超出预算:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("全部在预算之内")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+位棋盘实现
+
+6x15 的棋盘共 90 格，正好放进一个 Python 整数。第 (x, y) 格对应第
+y * GAME_AREA_WIDTH + x 位；每种颜色一个掩码，石头单独一个掩码。
+碰撞、连通块查找、石头清理和重力都用移位和与或运算完成，
+结果与 ListBoard 完全一致。
+"""
+from board import (GAME_AREA_WIDTH, GAME_AREA_HEIGHT, BLOCK_COLORS, CLEAR_THRESHOLD, COLOR_IDS, COLOR_NAMES,
+                   EMPTY_SNAPSHOT, STONE_BIT, BoardSnapshot, stepwise_drop_distance)
+
+CELL_COUNT = GAME_AREA_WIDTH * GAME_AREA_HEIGHT
+FULL_MASK = (1 << CELL_COUNT) - 1
+
+# 每一行的掩码
+ROW_MASK = (1 << GAME_AREA_WIDTH) - 1
+TOP_ROW = ROW_MASK
+
+# 最左列和最右列的掩码，用于横向移位时去掉跨行的位
+LEFT_COLUMN = sum(1 << (y * GAME_AREA_WIDTH) for y in range(GAME_AREA_HEIGHT))
+RIGHT_COLUMN = LEFT_COLUMN << (GAME_AREA_WIDTH - 1)
+NOT_LEFT_COLUMN = FULL_MASK & ~LEFT_COLUMN
+NOT_RIGHT_COLUMN = FULL_MASK & ~RIGHT_COLUMN
+
+
+def bit_index(x, y):
+    """(x, y) 对应的位序号"""
+    return y * GAME_AREA_WIDTH + x
+
+
+def neighbours(mask):
+    """返回 mask 中所有格子的上下左右相邻格（不含越界）"""
+    return (((mask << 1) & NOT_LEFT_COLUMN)
+            | ((mask >> 1) & NOT_RIGHT_COLUMN)
+            | ((mask << GAME_AREA_WIDTH) & FULL_MASK)
+            | (mask >> GAME_AREA_WIDTH))
+
+
+def flood(seed, region):
+    """从 seed 出发在 region 内做四连通扩张，返回整个连通块"""
+    group = seed
+    while True:
+        grown = group | (neighbours(group) & region)
+        if grown == group:
+            return group
+        group = grown
+
+
+class BitBoard:
+    """位掩码实现的棋盘
+
+    frontier 记录自上次 check_clear 以来新放入或移动过的彩色格子，
+    新的可消除连通块必然包含其中的格子，因此 check_clear 只检查这些格子所在的块。
+    last_snapshot 是最近一次取得或恢复的快照，snapshot_masks 是当时的
+    (各颜色掩码, 石头掩码)，取新快照时与之比较就知道哪些列变化了。
+    """
+
+    backend = "bit"
+
+    def __init__(self):
+        self.colors = {color: 0 for color in BLOCK_COLORS}
+        self.stones = 0
+        self.frontier = 0
+        self.last_snapshot = EMPTY_SNAPSHOT
+        self.snapshot_masks = ((0,) * len(BLOCK_COLORS), 0)
+
+    def copy(self):
+        """复制棋盘"""
+        board = BitBoard.__new__(BitBoard)
+        board.colors = dict(self.colors)
+        board.stones = self.stones
+        board.frontier = self.frontier
+        board.last_snapshot = self.last_snapshot
+        board.snapshot_masks = self.snapshot_masks
+        return board
+
+    def snapshot(self):
+        """当前内容的 BoardSnapshot，只重新编码上次快照以来变化过的列"""
+        masks = (tuple(self.colors.values()), self.stones)
+        old_colors, old_stones = self.snapshot_masks
+        changed = old_stones ^ masks[1]
+        for old, bits in zip(old_colors, masks[0]):
+            changed |= old ^ bits
+        if changed:
+            columns = list(self.last_snapshot.columns)
+            for x in range(GAME_AREA_WIDTH):
+                if changed & (LEFT_COLUMN << x):
+                    column = bytearray(GAME_AREA_HEIGHT)
+                    for y in range(GAME_AREA_HEIGHT):
+                        bit = 1 << bit_index(x, y)
+                        for color, bits in self.colors.items():
+                            if bits & bit:
+                                column[y] = COLOR_IDS[color]
+                                break
+                        if self.stones & bit:
+                            column[y] |= STONE_BIT
+                    columns[x] = bytes(column)
+            self.last_snapshot = BoardSnapshot(tuple(columns))
+        self.snapshot_masks = masks
+        return self.last_snapshot
+
+    def restore(self, snapshot):
+        """把棋盘内容恢复为 snapshot（所有彩色方块都计入 frontier）"""
+        colors = {color: 0 for color in BLOCK_COLORS}
+        stones = 0
+        for x, column in enumerate(snapshot.columns):
+            for y, cell in enumerate(column):
+                bit = 1 << bit_index(x, y)
+                if cell & ~STONE_BIT:
+                    colors[COLOR_NAMES[cell & ~STONE_BIT]] |= bit
+                if cell & STONE_BIT:
+                    stones |= bit
+        self.colors = colors
+        self.stones = stones
+        self.frontier = self.colored_mask()
+        self.last_snapshot = snapshot
+        self.snapshot_masks = (tuple(colors.values()), stones)
+
+    # ------------------------------------------------------------------
+    # 单元格读写
+    # ------------------------------------------------------------------
+
+    def colored_mask(self):
+        """所有彩色方块的掩码"""
+        mask = 0
+        for bits in self.colors.values():
+            mask |= bits
+        return mask
+
+    def color_at(self, x, y):
+        """返回 (x, y) 的颜色，没有方块时返回 None"""
+        bit = 1 << bit_index(x, y)
+        for color, bits in self.colors.items():
+            if bits & bit:
+                return color
+        return None
+
+    def stone_at(self, x, y):
+        """(x, y) 是否有石头"""
+        return bool(self.stones >> bit_index(x, y) & 1)
+
+    def blocked(self, x, y):
+        """(x, y) 是否在边界外或已被方块、石头占据（棋盘上方 y < 0 的格子为空）"""
+        if x < 0 or x >= GAME_AREA_WIDTH or y >= GAME_AREA_HEIGHT:
+            return True
+        if y < 0:
+            return False
+        return bool((self.colored_mask() | self.stones) >> bit_index(x, y) & 1)
+
+    def set_color(self, x, y, color):
+        """设置 (x, y) 的颜色，color 为 None 表示清空"""
+        bit = 1 << bit_index(x, y)
+        colors = self.colors
+        for name in colors:
+            colors[name] &= ~bit
+        if color is not None:
+            colors[color] |= bit
+            self.frontier |= bit
+
+    def set_stone(self, x, y, present=True):
+        """放置或移除 (x, y) 的石头"""
+        bit = 1 << bit_index(x, y)
+        if present:
+            self.stones |= bit
+        else:
+            self.stones &= ~bit
+
+    def colored_cells(self):
+        """按行优先顺序返回所有彩色方块的位置 [(x, y), ...]"""
+        mask = self.colored_mask()
+        cells = []
+        while mask:
+            low = mask & -mask
+            index = low.bit_length() - 1
+            cells.append((index % GAME_AREA_WIDTH, index // GAME_AREA_WIDTH))
+            mask ^= low
+        return cells
+
+    # ------------------------------------------------------------------
+    # 规则
+    # ------------------------------------------------------------------
+
+    def check_collision(self, positions):
+        """检查格子 [(x, y), ...] 是否与现有方块或边界碰撞"""
+        mask = 0
+        for x, y in positions:
+            # 检查边界
+            if x < 0 or x >= GAME_AREA_WIDTH or y >= GAME_AREA_HEIGHT:
+                return True
+            # 只检查在游戏区域内的方块
+            if y >= 0:
+                mask |= 1 << (y * GAME_AREA_WIDTH + x)
+        if not mask or mask & self.stones:
+            return bool(mask)
+        for bits in self.colors.values():
+            if mask & bits:
+                return True
+        return False
+
+    def column_top(self, x, occupied=None):
+        """第 x 列最上面一个有方块或石头的行，空列为 GAME_AREA_HEIGHT"""
+        if occupied is None:
+            occupied = self.colored_mask() | self.stones
+        column = occupied & (LEFT_COLUMN << x)
+        if not column:
+            return GAME_AREA_HEIGHT
+        return ((column & -column).bit_length() - 1) // GAME_AREA_WIDTH
+
+    def tops(self):
+        """各列最上面一个有方块或石头的行（空列为 GAME_AREA_HEIGHT）"""
+        occupied = self.colored_mask() | self.stones
+        return tuple(self.column_top(x, occupied) for x in range(GAME_AREA_WIDTH))
+
+    def landing_row(self, x):
+        """从上方落入第 x 列的方块停下的行"""
+        return self.column_top(x) - 1
+
+    def drop_distance(self, positions):
+        """方块组整体还能下落的行数（硬降）"""
+        occupied = self.colored_mask() | self.stones
+        distance = None
+        for x, y in positions:
+            top = self.column_top(x, occupied)
+            if y >= top:
+                return stepwise_drop_distance(self, positions)
+            if distance is None or top - 1 - y < distance:
+                distance = top - 1 - y
+        return distance
+
+    def check_clear(self):
+        """检查并消除连接的相同颜色方块，返回消除数量
+
+        只检查包含 frontier 格子的连通块，每个达到阈值的块都会被消除；
+        只要有消除，就清理一次孤立石头。孤立石头的判定只会随方块减少而变多，
+        因此与逐块清理的结果相同。
+        """
+        colors = self.colors
+        frontier = self.frontier
+        self.frontier = 0
+        total_cleared = 0
+        for color, bits in colors.items():
+            remaining = bits & frontier
+            cleared = 0
+            while remaining:
+                group = flood(remaining & -remaining, bits)
+                remaining &= ~group
+                size = group.bit_count()
+                if size >= CLEAR_THRESHOLD:
+                    cleared |= group
+                    total_cleared += size
+            if cleared:
+                colors[color] = bits & ~cleared
+
+        if total_cleared:
+            self.clear_isolated_stones()
+        return total_cleared
+
+    def clear_isolated_stones(self):
+        """清除没有相邻彩色方块的石头"""
+        self.stones &= neighbours(self.colored_mask())
+
+    def _settle(self, movers, obstacles):
+        """把 movers 中的各掩码沿列下落，直到每格下方都是障碍或底部
+
+        所有能下落的格子同时下落一格并重复，列内的先后顺序保持不变，
+        与逐格向下寻找落点的结果一致。
+        """
+        while True:
+            occupied = obstacles
+            for bits in movers:
+                occupied |= bits
+            free_below = (FULL_MASK & ~occupied) >> GAME_AREA_WIDTH
+            moved = False
+            for i, bits in enumerate(movers):
+                falling = bits & free_below
+                if falling:
+                    movers[i] = (bits & ~falling) | (falling << GAME_AREA_WIDTH)
+                    moved = True
+            if not moved:
+                return movers
+
+    def drop_floating_blocks(self):
+        """下落悬空的方块：先落彩色方块，再落石头
+
+        返回是否有彩色方块移动。
+        """
+        names = list(self.colors)
+        settled = self._settle([self.colors[name] for name in names], self.stones)
+        moved = 0
+        for name, bits in zip(names, settled):
+            moved |= bits & ~self.colors[name]
+            self.colors[name] = bits
+        self.frontier |= moved
+        self.stones = self._settle([self.stones], self.colored_mask())[0]
+        return bool(moved)
+
+    def has_top_block(self):
+        """最顶行是否有彩色方块"""
+        return bool(self.colored_mask() & TOP_ROW)
+
+    def clear_row(self, y):
+        """清空一整行的彩色方块"""
+        keep = ~(ROW_MASK << (y * GAME_AREA_WIDTH))
+        for name in self.colors:
+            self.colors[name] &= keep
+
+    def convert_all_to_color(self, target_color):
+        """将场上所有方块转换为目标颜色"""
+        merged = self.colored_mask()
+        for name in self.colors:
+            self.colors[name] = 0
+        self.colors[target_color] = merged
+        self.frontier |= merged
@@ -0,0 +1,486 @@
+"""
+棋盘存储
+
+ListBoard 用按格编号的字节数组保存颜色编号和石头；BitBoard（见 bitboard.py）
+用每种颜色一个位掩码加一个石头掩码表示同一块棋盘。两者接口一致、结果一致，
+通过 make_board(backend) 选择。
+
+两种棋盘都能取得 BoardSnapshot（不可变的棋盘快照）并从快照恢复，
+撤销、存档和录像关键帧都使用它。
+"""
+from groups import GroupTracker
+
+# 游戏区域尺寸
+GAME_AREA_WIDTH = 6  # 方块列数
+GAME_AREA_HEIGHT = 15  # 方块行数
+
+# 可操控方块的颜色
+BLOCK_COLORS = ["blue", "green", "purple", "yellow"]
+
+# 达到该数量的同色相连方块会被消除
+CLEAR_THRESHOLD = 4
+
+# 单次放置最多结算的连锁轮数。每轮至少消除4个方块，正常棋盘达不到这个上限；
+# 上限保证放置的耗时有固定上界，未结算完的连通块会在下次放置时继续消除
+MAX_CHAIN_ROUNDS = 16
+
+
+# 颜色编号：棋盘格子和方块组中保存的是编号而不是颜色字符串，0 表示空
+COLOR_IDS = {None: 0}
+COLOR_IDS.update((color, i + 1) for i, color in enumerate(BLOCK_COLORS))
+COLOR_NAMES = (None,) + tuple(BLOCK_COLORS)
+
+# 格子总数
+CELL_COUNT = GAME_AREA_WIDTH * GAME_AREA_HEIGHT
+
+# 快照中一格的字节：低三位为颜色编号，STONE_BIT 表示有石头
+STONE_BIT = 8
+
+# 按字节并行处理一整列时使用的掩码（每个字节分别为 7 和 1）
+_COLUMN_COLORS = int.from_bytes(b"\x07" * GAME_AREA_HEIGHT, "big")
+_COLUMN_ONES = int.from_bytes(b"\x01" * GAME_AREA_HEIGHT, "big")
+
+
+def _neighbour_indices(index):
+    """四个方向上在棋盘内的邻格序号"""
+    x, y = index % GAME_AREA_WIDTH, index // GAME_AREA_WIDTH
+    result = []
+    if x + 1 < GAME_AREA_WIDTH:
+        result.append(index + 1)
+    if x > 0:
+        result.append(index - 1)
+    if y + 1 < GAME_AREA_HEIGHT:
+        result.append(index + GAME_AREA_WIDTH)
+    if y > 0:
+        result.append(index - GAME_AREA_WIDTH)
+    return result
+
+
+# 每个格子（按 y * GAME_AREA_WIDTH + x 编号）的邻格序号
+NEIGHBOURS = [_neighbour_indices(i) for i in range(CELL_COUNT)]
+
+
+def clear_chain(board, max_rounds=MAX_CHAIN_ROUNDS):
+    """连锁结算：消除 → 下落 → 再消除，直到没有新的消除，返回每一轮的消除数量"""
+    rounds = []
+    while len(rounds) < max_rounds:
+        cleared = board.check_clear()
+        if cleared == 0:
+            break
+        rounds.append(cleared)
+        # 下落悬空的方块，没有方块移动就不会形成新的连通块
+        if not board.drop_floating_blocks():
+            break
+    return rounds
+
+
+def stepwise_drop_distance(board, positions):
+    """逐格试探格子 [(x, y), ...] 还能整体下落多少行"""
+    distance = 0
+    while not board.check_collision([(x, y + distance + 1) for x, y in positions]):
+        distance += 1
+    return distance
+
+
+class BoardSnapshot:
+    """棋盘内容的不可变快照
+
+    columns[x] 是第 x 列自上而下每格一个字节（低三位为颜色编号，STONE_BIT 表示石头）。
+    棋盘记下自上次快照以来变化过的列，新快照只重新编码这些列，其余列直接与
+    上一个快照共享，因此取快照的开销只与变化的列数有关。
+    """
+
+    __slots__ = ("columns",)
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def __eq__(self, other):
+        return isinstance(other, BoardSnapshot) and self.columns == other.columns
+
+    def __hash__(self):
+        return hash(self.columns)
+
+    def color_at(self, x, y):
+        """返回 (x, y) 的颜色，没有方块时返回 None"""
+        return COLOR_NAMES[self.columns[x][y] & ~STONE_BIT]
+
+    def stone_at(self, x, y):
+        """(x, y) 是否有石头"""
+        return bool(self.columns[x][y] & STONE_BIT)
+
+    def to_bytes(self):
+        """按列依次拼接的 CELL_COUNT 字节"""
+        return b"".join(self.columns)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """从 to_bytes 的结果解码"""
+        return cls(tuple(bytes(data[x * GAME_AREA_HEIGHT:(x + 1) * GAME_AREA_HEIGHT])
+                         for x in range(GAME_AREA_WIDTH)))
+
+
+# 空棋盘的快照
+EMPTY_SNAPSHOT = BoardSnapshot((bytes(GAME_AREA_HEIGHT),) * GAME_AREA_WIDTH)
+
+
+class ListBoard:
+    """数组实现的棋盘：cells 按 y * GAME_AREA_WIDTH + x 保存每格的颜色编号
+    （0 表示空，见 COLOR_IDS），stone_cells 保存每格是否有石头，两者都是 bytearray
+
+    同色连通块由 groups（GroupTracker）增量维护；adjacent_colors 记录每格相邻的
+    彩色方块数，没有相邻彩色方块的石头记在 isolated_stones 中；column_tops 记录
+    每列最上面一个有方块或石头的行（空列为 GAME_AREA_HEIGHT），内容变化过、
+    可能有悬空方块的列记在 dirty_columns 中。last_snapshot 是最近一次取得或恢复的
+    快照，此后内容变化过的列记在 changed_columns 中。
+    因此 cells 和 stone_cells 只能通过本类的方法修改。
+    """
+
+    backend = "list"
+
+    def __init__(self):
+        self.cells = bytearray(CELL_COUNT)
+        self.stone_cells = bytearray(CELL_COUNT)
+        self.groups = GroupTracker(self.cells, GAME_AREA_WIDTH, NEIGHBOURS, CLEAR_THRESHOLD)
+        self.adjacent_colors = [0] * CELL_COUNT
+        self.isolated_stones = set()
+        self.column_tops = [GAME_AREA_HEIGHT] * GAME_AREA_WIDTH
+        self.dirty_columns = set()
+        self.last_snapshot = EMPTY_SNAPSHOT
+        self.changed_columns = set()
+
+    def copy(self):
+        """复制棋盘"""
+        board = ListBoard.__new__(ListBoard)
+        board.cells = self.cells[:]
+        board.stone_cells = self.stone_cells[:]
+        board.groups = self.groups.copy(board.cells)
+        board.adjacent_colors = self.adjacent_colors[:]
+        board.isolated_stones = set(self.isolated_stones)
+        board.column_tops = self.column_tops[:]
+        board.dirty_columns = set(self.dirty_columns)
+        board.last_snapshot = self.last_snapshot
+        board.changed_columns = set(self.changed_columns)
+        return board
+
+    def snapshot(self):
+        """当前内容的 BoardSnapshot，只重新编码上次快照以来变化过的列"""
+        if self.changed_columns:
+            columns = list(self.last_snapshot.columns)
+            cells = self.cells
+            stone_cells = self.stone_cells
+            for x in self.changed_columns:
+                # 整列一次处理：颜色编号和石头标记各占字节中的不同位
+                colors = int.from_bytes(cells[x::GAME_AREA_WIDTH], "big")
+                stones = int.from_bytes(stone_cells[x::GAME_AREA_WIDTH], "big")
+                columns[x] = (colors | stones * STONE_BIT).to_bytes(GAME_AREA_HEIGHT, "big")
+            self.last_snapshot = BoardSnapshot(tuple(columns))
+            self.changed_columns = set()
+        return self.last_snapshot
+
+    def restore(self, snapshot):
+        """把棋盘内容恢复为 snapshot，并重建连通块、石头和列顶索引（所有列标记为脏）"""
+        cells = self.cells
+        stone_cells = self.stone_cells
+        for x, column in enumerate(snapshot.columns):
+            value = int.from_bytes(column, "big")
+            cells[x::GAME_AREA_WIDTH] = (value & _COLUMN_COLORS).to_bytes(GAME_AREA_HEIGHT, "big")
+            stone_cells[x::GAME_AREA_WIDTH] = (value >> 3 & _COLUMN_ONES).to_bytes(GAME_AREA_HEIGHT, "big")
+        self.groups.rebuild()
+        counts = [0] * CELL_COUNT
+        for index in range(CELL_COUNT):
+            if cells[index]:
+                for other in NEIGHBOURS[index]:
+                    counts[other] += 1
+        self.adjacent_colors = counts
+        self.isolated_stones = {index for index in range(CELL_COUNT) if stone_cells[index] and not counts[index]}
+        self.column_tops = [self._scan_top(x) for x in range(GAME_AREA_WIDTH)]
+        self.dirty_columns = set(range(GAME_AREA_WIDTH))
+        self.last_snapshot = snapshot
+        self.changed_columns = set()
+
+    # ------------------------------------------------------------------
+    # 石头相邻计数
+    # ------------------------------------------------------------------
+
+    def _color_added(self, index):
+        """index 处出现彩色方块，邻格计数加一"""
+        counts = self.adjacent_colors
+        for other in NEIGHBOURS[index]:
+            counts[other] += 1
+            if counts[other] == 1:
+                self.isolated_stones.discard(other)
+
+    def _color_removed(self, index):
+        """index 处的彩色方块消失，邻格计数减一，计数归零的石头记为孤立"""
+        counts = self.adjacent_colors
+        stone_cells = self.stone_cells
+        for other in NEIGHBOURS[index]:
+            counts[other] -= 1
+            if counts[other] == 0 and stone_cells[other]:
+                self.isolated_stones.add(other)
+
+    def _stone_placed(self, index):
+        """index 处放入石头"""
+        if self.adjacent_colors[index] == 0:
+            self.isolated_stones.add(index)
+
+    # ------------------------------------------------------------------
+    # 列高索引
+    # ------------------------------------------------------------------
+
+    def _scan_top(self, x):
+        """自上而下找到第 x 列最上面一个有方块或石头的行"""
+        cells = self.cells
+        stone_cells = self.stone_cells
+        for index in range(x, CELL_COUNT, GAME_AREA_WIDTH):
+            if cells[index] or stone_cells[index]:
+                return index // GAME_AREA_WIDTH
+        return GAME_AREA_HEIGHT
+
+    def _cell_changed(self, x, y):
+        """(x, y) 的内容变化后更新列顶并把该列标记为脏"""
+        self.dirty_columns.add(x)
+        self.changed_columns.add(x)
+        index = y * GAME_AREA_WIDTH + x
+        if self.cells[index] or self.stone_cells[index]:
+            if y < self.column_tops[x]:
+                self.column_tops[x] = y
+        elif y == self.column_tops[x]:
+            self.column_tops[x] = self._scan_top(x)
+
+    def _columns_changed(self, columns):
+        """若干列的内容变化后重新计算列顶并标记为脏"""
+        self.changed_columns.update(columns)
+        for x in columns:
+            self.dirty_columns.add(x)
+            self.column_tops[x] = self._scan_top(x)
+
+    def tops(self):
+        """各列最上面一个有方块或石头的行（空列为 GAME_AREA_HEIGHT）"""
+        return tuple(self.column_tops)
+
+    def landing_row(self, x):
+        """从上方落入第 x 列的方块停下的行"""
+        return self.column_tops[x] - 1
+
+    def drop_distance(self, positions):
+        """方块组整体还能下落的行数（硬降）
+
+        方块组都在各自列顶之上时，直接由列顶算出；否则（方块组卡在悬空方块
+        下面的空隙里）退回逐格试探。
+        """
+        tops = self.column_tops
+        distance = None
+        for x, y in positions:
+            top = tops[x]
+            if y >= top:
+                return stepwise_drop_distance(self, positions)
+            if distance is None or top - 1 - y < distance:
+                distance = top - 1 - y
+        return distance
+
+    # ------------------------------------------------------------------
+    # 单元格读写
+    # ------------------------------------------------------------------
+
+    def color_at(self, x, y):
+        """返回 (x, y) 的颜色，没有方块时返回 None"""
+        return COLOR_NAMES[self.cells[y * GAME_AREA_WIDTH + x]]
+
+    def stone_at(self, x, y):
+        """(x, y) 是否有石头"""
+        return bool(self.stone_cells[y * GAME_AREA_WIDTH + x])
+
+    def blocked(self, x, y):
+        """(x, y) 是否在边界外或已被方块、石头占据（棋盘上方 y < 0 的格子为空）"""
+        if x < 0 or x >= GAME_AREA_WIDTH or y >= GAME_AREA_HEIGHT:
+            return True
+        if y < 0:
+            return False
+        index = y * GAME_AREA_WIDTH + x
+        return bool(self.cells[index] or self.stone_cells[index])
+
+    def set_color(self, x, y, color):
+        """设置 (x, y) 的颜色，color 为 None 表示清空"""
+        color_id = COLOR_IDS[color]
+        index = y * GAME_AREA_WIDTH + x
+        cells = self.cells
+        if cells[index] == color_id:
+            return
+        if cells[index]:
+            affected = self.groups.detach((index,))
+            if not color_id:
+                self._color_removed(index)
+        else:
+            affected = [index]
+            self._color_added(index)
+        cells[index] = color_id
+        self.groups.attach(affected)
+        self._cell_changed(x, y)
+
+    def set_stone(self, x, y, present=True):
+        """放置或移除 (x, y) 的石头"""
+        index = y * GAME_AREA_WIDTH + x
+        self.stone_cells[index] = 1 if present else 0
+        if present:
+            self._stone_placed(index)
+        else:
+            self.isolated_stones.discard(index)
+        self._cell_changed(x, y)
+
+    def colored_cells(self):
+        """按行优先顺序返回所有彩色方块的位置 [(x, y), ...]"""
+        cells = self.cells
+        return [(index % GAME_AREA_WIDTH, index // GAME_AREA_WIDTH) for index in range(CELL_COUNT) if cells[index]]
+
+    # ------------------------------------------------------------------
+    # 规则
+    # ------------------------------------------------------------------
+
+    def check_collision(self, positions):
+        """检查格子 [(x, y), ...] 是否与现有方块或边界碰撞"""
+        cells = self.cells
+        stone_cells = self.stone_cells
+        tops = self.column_tops
+        for x, y in positions:
+            # 检查边界
+            if x < 0 or x >= GAME_AREA_WIDTH or y >= GAME_AREA_HEIGHT:
+                return True
+            # 列顶之上必然为空；否则检查与现有方块的碰撞
+            if y >= tops[x]:
+                index = y * GAME_AREA_WIDTH + x
+                if cells[index] or stone_cells[index]:
+                    return True
+        return False
+
+    def check_clear(self):
+        """消除所有达到阈值的同色连通块，返回消除数量
+
+        连通块由 groups 增量维护，这里只处理已经达到阈值的块，不扫描整个棋盘。
+        """
+        cells = self.cells
+        total_cleared = 0
+        columns = set()
+        for group in self.groups.pop_full_groups():
+            for index in group:
+                cells[index] = 0
+                self._color_removed(index)
+                columns.add(index % GAME_AREA_WIDTH)
+            total_cleared += len(group)
+
+        # 周围没有彩色方块的石头随本次消除一起清除
+        if total_cleared:
+            self._columns_changed(columns)
+            self.clear_isolated_stones()
+
+        return total_cleared
+
+    def clear_isolated_stones(self):
+        """清除没有相邻彩色方块的石头"""
+        stone_cells = self.stone_cells
+        for index in self.isolated_stones:
+            stone_cells[index] = 0
+        self._columns_changed({index % GAME_AREA_WIDTH for index in self.isolated_stones})
+        self.isolated_stones.clear()
+
+    def _moved(self, sources, targets):
+        """cells 中的方块从 sources 移到了 targets 后，更新连通块和石头相邻计数"""
+        if sources:
+            for index in sources:
+                self._color_removed(index)
+            for index in targets:
+                self._color_added(index)
+            affected = self.groups.detach(sources)
+            affected.extend(targets)
+            self.groups.attach(affected)
+
+    def drop_floating_blocks(self):
+        """下落悬空的方块，返回是否有彩色方块移动
+
+        只处理脏列，每列自下而上一次线性压实：先落彩色方块（石头不动），
+        再落石头（彩色方块不动）。石头落下后，压在它上面的方块可能又悬空了，
+        这样的列保持为脏，留给下一次处理。
+        """
+        if not self.dirty_columns:
+            return False
+        cells = self.cells
+        stone_cells = self.stone_cells
+        columns = self.dirty_columns
+        self.dirty_columns = set()
+        self.changed_columns.update(columns)
+
+        # 彩色方块落到下方第一个方块或石头上
+        sources = []
+        targets = []
+        for x in columns:
+            land = CELL_COUNT - GAME_AREA_WIDTH + x
+            for index in range(land, -1, -GAME_AREA_WIDTH):
+                color = cells[index]
+                if color:
+                    if index != land:
+                        cells[land] = color
+                        cells[index] = 0
+                        sources.append(index)
+                        targets.append(land)
+                    land -= GAME_AREA_WIDTH
+                if stone_cells[index]:
+                    land = index - GAME_AREA_WIDTH
+        self._moved(sources, targets)
+
+        # 同样处理石头方块的下落
+        for x in columns:
+            land = CELL_COUNT - GAME_AREA_WIDTH + x
+            for index in range(land, -1, -GAME_AREA_WIDTH):
+                if stone_cells[index]:
+                    if index != land:
+                        stone_cells[land] = 1
+                        stone_cells[index] = 0
+                        self.isolated_stones.discard(index)
+                        self._stone_placed(land)
+                        self.dirty_columns.add(x)
+                    land -= GAME_AREA_WIDTH
+                if cells[index]:
+                    land = index - GAME_AREA_WIDTH
+            self.column_tops[x] = self._scan_top(x)
+
+        return bool(sources)
+
+    def has_top_block(self):
+        """最顶行是否有彩色方块"""
+        return self.cells.count(0, 0, GAME_AREA_WIDTH) < GAME_AREA_WIDTH
+
+    def clear_row(self, y):
+        """清空一整行的彩色方块"""
+        cells = self.cells
+        start = y * GAME_AREA_WIDTH
+        row = [index for index in range(start, start + GAME_AREA_WIDTH) if cells[index]]
+        affected = self.groups.detach(row)
+        for index in row:
+            cells[index] = 0
+            self._color_removed(index)
+        self.groups.attach(affected)
+        self._columns_changed({index % GAME_AREA_WIDTH for index in row})
+
+    def convert_all_to_color(self, target_color):
+        """将场上所有方块转换为目标颜色"""
+        color_id = COLOR_IDS[target_color]
+        cells = self.cells
+        for index in range(CELL_COUNT):
+            if cells[index]:
+                cells[index] = color_id
+                self.changed_columns.add(index % GAME_AREA_WIDTH)
+        self.groups.rebuild()
+
+
+BOARD_BACKENDS = ("list", "bit")
+
+
+def make_board(backend="list"):
+    """按名称创建棋盘（"list" 或 "bit"）"""
+    if backend == "list":
+        return ListBoard()
+    if backend == "bit":
+        from bitboard import BitBoard
+        return BitBoard()
+    raise ValueError(f"未知的棋盘实现: {backend}")
@@ -0,0 +1,48 @@
+"""
+生成资源包
+
+把 images、fonts、sounds 目录下的全部文件打包成 assets.pak，供打包版本
+（game.spec）使用。game.spec 在分析前会自动调用 build_pack()，也可以单独运行:
+
+用法: python build_assets.py [--output assets.pak]
+"""
+import argparse
+import os
+
+from assets import PACK_FILE, write_pack
+
+# 需要打包的资源目录
+ASSET_DIRS = ("images", "fonts", "sounds")
+
+
+def collect_assets(root):
+    """收集 root 下各资源目录中的文件，返回 {包内路径: 磁盘路径}"""
+    files = {}
+    for directory in ASSET_DIRS:
+        base = os.path.join(root, directory)
+        for dirpath, _, filenames in os.walk(base):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                files[os.path.relpath(path, root)] = path
+    return files
+
+
+def build_pack(root=None, output=None):
+    """生成资源包，返回 (资源数量, 字节数)"""
+    root = root or os.path.dirname(os.path.abspath(__file__))
+    output = output or os.path.join(root, PACK_FILE)
+    files = collect_assets(root)
+    size = write_pack(output, files)
+    return len(files), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成资源包")
+    parser.add_argument("--output", default=None, help=f"输出路径（默认 {PACK_FILE}）")
+    args = parser.parse_args()
+    count, size = build_pack(output=args.output)
+    print(f"已打包 {count} 个资源, {size / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,624 @@
+"""
+八奇乱斗核心规则引擎
+
+不依赖 pygame 和显示设备，可以被直接导入并在无界面环境下推进，
+用于平衡性模拟和自动化测试。界面部分（game.py）只负责输入、绘制和音效。
+
+逻辑以固定步长推进：每一步（tick）代表 1 / TICK_RATE 秒，所有计时都按步数计算，
+与界面的帧率无关。定时发生的事情（下落、石头、连击过期、技能冷却和持续效果）
+都登记在定时器轮（scheduler.TimerWheel）上，每步只处理到期的定时器。界面用 FixedStepClock 把实际经过的时间换算成步数；
+无界面时可以直接调用 advance() 以任意速度模拟。
+"""
+from ai import DEFAULT_DIFFICULTY, DIFFICULTY_LEVELS, OpponentAI, chain_points
+from board import GAME_AREA_WIDTH, GAME_AREA_HEIGHT, BLOCK_COLORS, COLOR_NAMES, clear_chain, make_board
+from placement import Piece, drop_pair, landing_piece, piece_fits, reachable_placements
+from rng import PieceQueue, make_streams, new_seed
+from scheduler import TimerWheel
+
+# 逻辑帧率（每秒步数）
+TICK_RATE = 60
+
+# 一帧最多追赶的步数，窗口被拖动等长时间卡顿后不会一次推进太多
+MAX_CATCH_UP_TICKS = 15
+
+# 连击时间窗口（秒）
+COMBO_TIME = 2.0
+COMBO_TICKS = int(COMBO_TIME * TICK_RATE)
+
+# 石头生成间隔（秒）
+STONE_INTERVAL = 5
+STONE_TICKS = STONE_INTERVAL * TICK_RATE
+
+# 对手预先知道的方块组数量（足够最高难度向前看）
+OPPONENT_PREVIEW = max(level[0] for level in DIFFICULTY_LEVELS.values())
+
+# 刻晴技能冻结对手场地的时间（秒）
+FREEZE_TIME = 3
+FREEZE_TICKS = FREEZE_TIME * TICK_RATE
+
+# 游戏速度
+speed_levels = [1, 2, 3, 4, 5]
+
+# 玩家操作编号（见 GameState.apply_input，录像中按编号记录）
+INPUTS = ("left", "right", "rotate", "soft_drop", "hard_drop", "speed_up", "speed_down", "skill")
+(INPUT_LEFT, INPUT_RIGHT, INPUT_ROTATE, INPUT_SOFT_DROP, INPUT_HARD_DROP,
+ INPUT_SPEED_UP, INPUT_SPEED_DOWN, INPUT_SKILL) = range(len(INPUTS))
+
+# 技能能量上限
+skill_max_energy = 100
+
+# 角色选择
+character_options = ["胡桃", "蓝砚", "魈", "刻晴", "藤人"]
+
+# 角色技能定义
+characters = {
+    "胡桃": {
+        "skill_name": "蝶引来生",
+        "skill_description": "将场上所有同色方块变为当前方块颜色",
+        "cooldown": 15
+    },
+    "蓝砚": {
+        "skill_name": "水月",
+        "skill_description": "将当前方块立即下落并消除下方一行方块",
+        "cooldown": 8
+    },
+    "魈": {
+        "skill_name": "靖妖傩舞",
+        "skill_description": "消除场上随机3个方块，并对对手施加2个干扰方块",
+        "cooldown": 10
+    },
+    "刻晴": {
+        "skill_name": "星斗归位",
+        "skill_description": "冻结对手场地3秒",
+        "cooldown": 12
+    },
+    "藤人": {
+        "skill_name": "草原核绽放",
+        "skill_description": "消除场上所有相邻的方块，并对对手施加3个干扰方块",
+        "cooldown": 12
+    }
+}
+
+
+class FixedStepClock:
+    """固定步长累加器：把单调时钟经过的时间换算成应执行的逻辑步数"""
+
+    def __init__(self, tick_rate=TICK_RATE, max_ticks=MAX_CATCH_UP_TICKS):
+        self.tick_rate = tick_rate
+        self.max_ticks = max_ticks
+        self.accumulator = 0.0
+        self.last_time = None
+
+    def reset(self, now):
+        """从时间 now 重新开始计时，丢弃未执行的时间"""
+        self.accumulator = 0.0
+        self.last_time = now
+
+    def advance(self, now):
+        """返回从上次调用到 now 之间应执行的步数"""
+        if self.last_time is None:
+            self.last_time = now
+        self.accumulator += (now - self.last_time) * self.tick_rate
+        self.last_time = now
+        ticks = int(self.accumulator)
+        if ticks > self.max_ticks:
+            # 卡顿太久，放弃追赶
+            ticks = self.max_ticks
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= ticks
+        return ticks
+
+
+class GameState:
+    """一局游戏的全部状态及规则
+
+    状态只通过 step()/advance() 按固定步长推进，引擎自身不读取时钟，
+    同样的输入序列在任何帧率下、以任何速度模拟都得到同样的结果。
+    发生的音效事件（"clear"、"rotate"）追加到 events 列表，由界面层取走播放。
+    backend 选择棋盘实现（"list" 或 "bit"，见 board.make_board）。
+    所有随机性都来自由 seed 确定的随机数流（见 rng），seed 相同、操作相同的两局完全一样；
+    seed 为 None 时随机一个种子，保存在 self.seed 中。
+    """
+
+    def __init__(self, character="胡桃", opponent_character="蓝砚", backend="list", difficulty=DEFAULT_DIFFICULTY,
+                 seed=None):
+        self.character = character
+        self.opponent_character = opponent_character
+        self.backend = backend
+        self.difficulty = difficulty
+        # 同步搜索不限时间，结果只取决于局面，保证同一种子得到同样的一局
+        # （界面中由 BackgroundPlanner 在后台按截止时间规划）
+        self.opponent_ai = OpponentAI(difficulty, time_budget=0)
+        # 后台规划器（见 planner.BackgroundPlanner），为 None 时在 update_opponent 中同步搜索
+        self.opponent_planner = None
+        # 录像记录器（见 replay.ReplayRecorder），为 None 时不记录
+        self.recorder = None
+        self.events = []
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        """重置为新的一局，seed 为 None 时随机一个种子"""
+        self.seed = new_seed() if seed is None else seed
+        streams = make_streams(self.seed)
+        self.pieces = PieceQueue(streams["pieces"])
+        self.opponent_pieces = PieceQueue(streams["opponent"])
+        self.stone_rng = streams["stones"]
+        self.skill_rng = streams["skills"]
+
+        self.board = make_board(self.backend)
+        self.opponent_board = make_board(self.backend)
+
+        # 创建初始方块组
+        self.piece = self.create_block_group()
+
+        # 分数和时间
+        self.score = 0
+        self.opponent_score = 0
+        self.tick = 0
+        self.game_time = 0
+
+        # 技能相关
+        self.skill_energy = 0
+
+        # 连击相关
+        self.combo_count = 0
+
+        # 连锁相关：最近一次放置的连锁层数和本局最大连锁
+        self.last_chain = 0
+        self.max_chain = 0
+
+        # 游戏速度
+        self.current_speed_level = 1
+        self.game_speed = speed_levels[self.current_speed_level - 1]
+
+        # 干扰方块队列
+        self.interference_queue = []
+
+        # 对手接下来的方块组（颜色对）
+        self.opponent_pairs = [self.opponent_pieces.pop() for _ in range(OPPONENT_PREVIEW)]
+
+        # 定时器：下落和石头从开局开始计时，其余在需要时登记
+        self.timers = TimerWheel()
+        self.last_drop_tick = 0
+        self.drop_timer = self.timers.schedule(self.drop_interval(), "drop")
+        self.timers.schedule(STONE_TICKS, "stone", STONE_TICKS)
+        move_ticks = self.opponent_ai.move_ticks
+        self.timers.schedule(move_ticks, "opponent", move_ticks)
+        self.combo_timer = None
+        self.skill_timer = None
+        self.freeze_timer = None
+
+        # 落点缓存（见 landing_piece、placements）：缓存时的方块组副本、棋盘快照和结果
+        self.landing_source = None
+        self.landing_board = None
+        self.landing = None
+        self.placements_source = None
+        self.placements_board = None
+        self.placement_map = {}
+
+        # 胜者："player" 或 "opponent"，未结束时为 None
+        self.winner = None
+        self.game_over = False
+        self.events.clear()
+
+    @property
+    def skill_cooldown(self):
+        """技能冷却剩余步数"""
+        return self.timers.remaining(self.skill_timer)
+
+    @property
+    def opponent_frozen(self):
+        """对手场地是否处于冻结中"""
+        return self.freeze_timer is not None
+
+    def drop_interval(self):
+        """当前速度下自动下落的间隔步数"""
+        return TICK_RATE // self.game_speed
+
+    # ------------------------------------------------------------------
+    # 方块生成
+    # ------------------------------------------------------------------
+
+    def create_block_group(self):
+        """创建新的方块组（颜色按顺序取自 pieces）"""
+        color1, color2 = self.pieces.pop()
+        x = GAME_AREA_WIDTH // 2 - 1
+        y = -1  # 从-1开始，这样方块组最初只有一部分可见
+        return Piece(x, y, 0, color1, color2)
+
+    def create_stones(self, count):
+        """创建石头方块，返回位置列表 [(x, y), ...]"""
+        return [(self.stone_rng.randint(0, GAME_AREA_WIDTH - 1), 0) for _ in range(count)]
+
+    def spawn_stones(self, count=1):
+        """在顶部生成石头"""
+        for x, y in self.create_stones(count):
+            if not self.board.blocked(x, y):
+                self.board.set_stone(x, y)
+
+    # ------------------------------------------------------------------
+    # 棋盘规则
+    # ------------------------------------------------------------------
+
+    def check_collision(self, piece):
+        """检查方块组是否与现有方块或边界碰撞"""
+        return not piece_fits(self.board, piece.x, piece.y, piece.rotation)
+
+    def place_blocks(self, piece):
+        """将方块组放置到网格中"""
+        for x, y, color in piece.blocks():
+            if 0 <= y < GAME_AREA_HEIGHT and 0 <= x < GAME_AREA_WIDTH:
+                self.board.set_color(x, y, COLOR_NAMES[color])
+
+        # 检查并消除连接的方块
+        if self.resolve_chain() > 0:
+            self.events.append("clear")
+
+    def resolve_chain(self):
+        """连锁结算：消除 → 下落 → 再消除，直到没有新的消除，返回连锁层数
+
+        每一轮只检查刚放入或刚下落的方块所在的连通块（由棋盘增量维护），
+        每一层连锁都计为一次连击，沿用原有的连击加分。
+        """
+        rounds = clear_chain(self.board)
+        for cleared in rounds:
+            # 更新分数
+            base_score = cleared * 10
+            self.combo_count += 1
+            self.timers.cancel(self.combo_timer)
+            self.combo_timer = self.timers.schedule(COMBO_TICKS + 1, "combo")
+            combo_bonus = self.combo_count - 1
+            total_score = base_score * (1 + combo_bonus * 0.5)
+            self.score += int(total_score)
+
+            # 增加技能能量
+            self.skill_energy = min(skill_max_energy, self.skill_energy + cleared * 5)
+
+        chain = len(rounds)
+        self.last_chain = chain
+        self.max_chain = max(self.max_chain, chain)
+        return chain
+
+    def drop_floating_blocks(self):
+        """下落悬空的方块，返回是否有彩色方块移动"""
+        return self.board.drop_floating_blocks()
+
+    def check_clear(self):
+        """检查并消除连接的相同颜色方块"""
+        return self.board.check_clear()
+
+    def check_game_over(self):
+        """检查游戏是否结束"""
+        # 检查是否有方块到达顶部
+        return self.board.has_top_block()
+
+    # ------------------------------------------------------------------
+    # 玩家操作
+    # ------------------------------------------------------------------
+
+    def move_blocks(self, dx):
+        """移动方块组"""
+        piece = self.piece
+        if piece_fits(self.board, piece.x + dx, piece.y, piece.rotation):
+            piece.x += dx
+
+    def rotate_blocks(self):
+        """旋转方块组（绕第一个方块顺时针旋转90度）"""
+        piece = self.piece
+        rotation = (piece.rotation + 1) % 4
+        # 检查旋转后是否会碰撞
+        if piece_fits(self.board, piece.x, piece.y, rotation):
+            piece.rotation = rotation
+            self.events.append("rotate")
+
+    def soft_drop(self):
+        """加速下落一格"""
+        piece = self.piece
+        if piece_fits(self.board, piece.x, piece.y + 1, piece.rotation):
+            piece.y += 1
+
+    def drop_blocks(self):
+        """立即下落到底"""
+        self.piece.y = self.landing_piece().y
+
+    def _cache_valid(self, source, board):
+        """缓存时的方块组副本 source 和棋盘快照 board 是否仍与当前相同
+
+        棋盘没有变化时 snapshot() 返回同一个对象，比较不需要创建新对象（每帧都会调用）。
+        """
+        piece = self.piece
+        return (source is not None and board is self.board.snapshot()
+                and piece.x == source.x and piece.y == source.y and piece.rotation == source.rotation
+                and piece.color1 == source.color1 and piece.color2 == source.color2)
+
+    def landing_piece(self):
+        """当前方块组硬降后停下的位置（幽灵方块预览），方块组和棋盘不变时直接取缓存"""
+        if not self._cache_valid(self.landing_source, self.landing_board):
+            self.landing = landing_piece(self.board, self.piece)
+            self.landing_source = self.piece.copy()
+            self.landing_board = self.board.snapshot()
+        return self.landing
+
+    def placements(self):
+        """当前方块组能到达的全部落点 {(x, rotation): 落下后的方块组}，同样带缓存"""
+        if not self._cache_valid(self.placements_source, self.placements_board):
+            self.placement_map = reachable_placements(self.board, self.piece)
+            self.placements_source = self.piece.copy()
+            self.placements_board = self.board.snapshot()
+        return self.placement_map
+
+    def piece_rotation(self):
+        """当前方块组的旋转方向（placements 的键中的 rotation）"""
+        return self.piece.rotation
+
+    def change_speed(self, delta):
+        """调整速度等级"""
+        self.current_speed_level = max(1, min(self.current_speed_level + delta, len(speed_levels)))
+        self.game_speed = speed_levels[self.current_speed_level - 1]
+
+        # 按新的间隔重新登记下一次下落（从上次下落算起）
+        self.timers.cancel(self.drop_timer)
+        delay = max(1, self.last_drop_tick + self.drop_interval() - self.tick)
+        self.drop_timer = self.timers.schedule(delay, "drop")
+
+    # ------------------------------------------------------------------
+    # 技能
+    # ------------------------------------------------------------------
+
+    def use_skill(self):
+        """使用角色技能"""
+        if self.skill_energy < skill_max_energy or self.skill_cooldown > 0:
+            return
+
+        # 重置技能能量和设置冷却
+        self.skill_energy = 0
+        self.skill_timer = self.timers.schedule(characters[self.character]["cooldown"] * TICK_RATE, "skill_ready")
+
+        # 根据不同角色执行不同技能
+        if self.character == "雷电将军":
+            # 消除场上随机3个方块，并对对手施加2个干扰方块
+            self.clear_random_blocks(3)
+            self.create_interference_blocks(2)
+        elif self.character == "钟离":
+            # 将当前方块立即下落并消除下方一行方块
+            self.drop_blocks()
+            self.clear_bottom_row()
+        elif self.character == "刻晴":
+            # 冻结对手场地3秒
+            self.timers.cancel(self.freeze_timer)
+            self.freeze_timer = self.timers.schedule(FREEZE_TICKS, "thaw")
+        elif self.character == "胡桃":
+            # 将场上所有同色方块变为当前方块颜色
+            self.convert_all_to_color(COLOR_NAMES[self.piece.color1])
+
+    def clear_random_blocks(self, count):
+        """消除场上随机的方块"""
+        # 收集所有非空方块的位置
+        non_empty = self.board.colored_cells()
+
+        # 随机选择并消除
+        if non_empty:
+            to_clear = self.skill_rng.sample(non_empty, min(count, len(non_empty)))
+            for x, y in to_clear:
+                self.board.set_color(x, y, None)
+
+    def clear_bottom_row(self):
+        """消除最底部的一行方块"""
+        self.board.clear_row(GAME_AREA_HEIGHT - 1)
+
+    def convert_all_to_color(self, target_color):
+        """将场上所有方块转换为目标颜色"""
+        self.board.convert_all_to_color(target_color)
+
+    # ------------------------------------------------------------------
+    # 干扰方块与对手
+    # ------------------------------------------------------------------
+
+    def create_interference_blocks(self, count):
+        """创建干扰方块"""
+        for _ in range(count):
+            self.interference_queue.append({"color": self.skill_rng.choice(BLOCK_COLORS)})
+
+    def apply_interference_blocks(self):
+        """应用干扰方块"""
+        if not self.interference_queue:
+            return
+
+        # 找到可以放置干扰方块的位置
+        opponent_board = self.opponent_board
+        for x in range(GAME_AREA_WIDTH):
+            if opponent_board.color_at(x, 0) is None and not opponent_board.stone_at(x, 0):
+                # 放置干扰方块
+                if self.interference_queue:
+                    block = self.interference_queue.pop(0)
+                    opponent_board.set_color(x, 0, block["color"])
+
+        # 干扰方块落到对手场地的方块上
+        opponent_board.drop_floating_blocks()
+
+    def update_opponent(self):
+        """对手落下一组方块（由 AI 选择落点），冻结期间跳过"""
+        if self.opponent_frozen:
+            return
+
+        opponent_board = self.opponent_board
+        colors = self.opponent_pairs[0]
+        piece = None
+        planner = self.opponent_planner
+        if planner is not None:
+            # 只取用后台已经算好的落点；干扰方块可能让旧计划失效
+            move = planner.next_move()
+            if move is not None:
+                piece = drop_pair(opponent_board, colors, *move)
+            if piece is None:
+                # 没有可用的计划，只看当前这一组方块快速选择
+                move = self.opponent_ai.choose(opponent_board, self.opponent_pairs[:1])
+        else:
+            move = self.opponent_ai.choose(opponent_board, self.opponent_pairs)
+        if piece is None and move is not None:
+            piece = drop_pair(opponent_board, colors, *move)
+        if self.recorder is not None:
+            self.recorder.record_opponent(move)
+        if piece is None or any(y < 0 for _, y in piece.cells()):
+            # 放不下了，对手输掉
+            self.end_game("player")
+            return
+
+        for x, y, color in piece.blocks():
+            opponent_board.set_color(x, y, COLOR_NAMES[color])
+        self.opponent_score += chain_points(clear_chain(opponent_board))
+        opponent_board.drop_floating_blocks()
+
+        self.opponent_pairs.pop(0)
+        self.opponent_pairs.append(self.opponent_pieces.pop())
+        self.request_opponent_plan()
+
+    def attach_planner(self, planner):
+        """改由后台规划器为对手选择落点，并开始规划第一步"""
+        self.opponent_planner = planner
+        self.request_opponent_plan()
+
+    def request_opponent_plan(self):
+        """把对手当前的局面交给后台规划器，要求在下一次落子前完成"""
+        if self.opponent_planner is not None:
+            seconds = self.opponent_ai.move_ticks / TICK_RATE
+            self.opponent_planner.submit(self.opponent_board, self.opponent_pairs, seconds)
+
+    # ------------------------------------------------------------------
+    # 推进
+    # ------------------------------------------------------------------
+
+    def step_fall(self):
+        """方块组下落一格，落地则放置并生成新方块组"""
+        piece = self.piece
+        if piece_fits(self.board, piece.x, piece.y + 1, piece.rotation):
+            piece.y += 1
+        else:
+            self.place_blocks(piece)
+            self.piece = self.create_block_group()
+            # 只有当新方块完全进入游戏区域后才检查碰撞
+            all_blocks_visible = all(y >= 0 for _, y in self.piece.cells())
+            if all_blocks_visible and self.check_collision(self.piece):
+                self.end_game("opponent")
+
+        # 处理石头方块的下落
+        self.drop_floating_blocks()
+
+    def on_drop(self):
+        """定时器：方块组自动下落一格"""
+        self.step_fall()
+        self.last_drop_tick = self.tick
+        # 刚触发的定时器对象直接复用
+        self.drop_timer = self.timers.restart(self.drop_timer, self.drop_interval())
+
+    def on_stone(self):
+        """定时器：在顶部生成石头"""
+        self.spawn_stones(1)
+
+    def on_combo(self):
+        """定时器：连击时间窗口结束"""
+        self.combo_count = 0
+        self.combo_timer = None
+
+    def on_skill_ready(self):
+        """定时器：技能冷却结束"""
+        self.skill_timer = None
+
+    def on_thaw(self):
+        """定时器：对手场地解除冻结"""
+        self.freeze_timer = None
+
+    # 定时器种类 -> 处理方法
+    timer_handlers = {
+        "drop": on_drop,
+        "stone": on_stone,
+        "combo": on_combo,
+        "skill_ready": on_skill_ready,
+        "thaw": on_thaw,
+        "opponent": update_opponent,
+    }
+
+    # 玩家操作编号 -> (处理方法, 参数)
+    input_actions = {
+        INPUT_LEFT: (move_blocks, (-1,)),
+        INPUT_RIGHT: (move_blocks, (1,)),
+        INPUT_ROTATE: (rotate_blocks, ()),
+        INPUT_SOFT_DROP: (soft_drop, ()),
+        INPUT_HARD_DROP: (drop_blocks, ()),
+        INPUT_SPEED_UP: (change_speed, (1,)),
+        INPUT_SPEED_DOWN: (change_speed, (-1,)),
+        INPUT_SKILL: (use_skill, ()),
+    }
+
+    def apply_input(self, code):
+        """执行一个玩家操作（INPUT_* 编号），有录像记录器时一并记下"""
+        if self.game_over:
+            return
+        if self.recorder is not None:
+            self.recorder.record_input(self.tick, code)
+        method, args = self.input_actions[code]
+        method(self, *args)
+
+    def attach_recorder(self, recorder):
+        """开始把玩家操作和对手落点记录到 recorder"""
+        self.recorder = recorder
+
+    def step(self):
+        """推进一步（1 / TICK_RATE 秒），返回游戏是否结束"""
+        if self.game_over:
+            return True
+
+        # 更新游戏时间
+        self.tick += 1
+        self.game_time = self.tick / TICK_RATE
+        due = self.timers.advance()
+
+        # 处理到期的定时器
+        handlers = self.timer_handlers
+        for kind in due:
+            handlers[kind](self)
+
+        # 应用干扰方块（冻结期间对手场地不变）
+        if not self.opponent_frozen:
+            self.apply_interference_blocks()
+
+        # 检查游戏是否结束
+        if self.check_game_over():
+            self.end_game("opponent")
+        elif self.opponent_board.has_top_block():
+            self.end_game("player")
+
+        if self.recorder is not None:
+            self.recorder.tick_done(self)
+        return self.game_over
+
+    def skip_idle(self, tick):
+        """不逐步推进，直接跳到第 tick 步或下一个定时器到期的前一步（取较早者），返回到达的步数
+
+        调用方保证这期间玩家没有操作。没有定时器到期、干扰方块队列为空时，
+        每一步只有步数变化，结果与逐步调用 step() 相同。用于快速回放。
+        """
+        if self.game_over or self.interference_queue or self.recorder is not None:
+            return self.tick
+        due = self.timers.next_due()
+        if due is not None:
+            tick = min(tick, due - 1)
+        if tick > self.tick:
+            self.timers.skip(tick - self.tick)
+            self.tick = tick
+            self.game_time = tick / TICK_RATE
+        return self.tick
+
+    def end_game(self, winner):
+        """结束本局，winner 为 "player" 或 "opponent"（先结束的一方为准）"""
+        if not self.game_over:
+            self.game_over = True
+            self.winner = winner
+
+    def advance(self, ticks):
+        """推进 ticks 步（游戏结束时提前停止），返回游戏是否结束"""
+        for _ in range(ticks):
+            if self.step():
+                break
+        return self.game_over
@@ -0,0 +1,201 @@
+"""
+强化学习环境接口
+
+仿照 Gym 的 reset()/step(action) 接口，供训练落子策略使用：
+
+- GameEnv 包装一局完整的 GameState（含对手 AI、石头、技能和连击），
+  每一步由智能体为当前方块组选择落点，然后推进时间直到方块组落地、
+  下一组方块出现；
+- VectorEnv 基于 batch.BatchSimulator 同时推进多局单人游戏（没有对手），
+  每一步所有局一起落下一组方块。
+
+动作为 (column, rotation, use_skill)：第一个方块所在的列、旋转方向
+（见 placement.ROTATION_OFFSETS）和是否先使用技能。奖励是这一步的得分增量，
+计分与 GameState.resolve_chain 相同（每层连锁计一次连击，有连击加分）。
+
+观测直接是棋盘缓冲区上的 NumPy 视图（颜色编号见 board.COLOR_IDS），不复制：
+之后的 step 会原地改变它们的内容，需要保存某一步的观测时请自行 copy()。
+
+需要 numpy，游戏本身不依赖本模块。
+"""
+import numpy as np
+
+from ai import DEFAULT_DIFFICULTY
+from batch import MOVES, BatchSimulator
+from board import GAME_AREA_WIDTH, GAME_AREA_HEIGHT, MAX_CHAIN_ROUNDS
+from engine import COMBO_TICKS, GameState, character_options
+from placement import ROTATION_OFFSETS
+
+# 状态向量各项的含义
+STATUS_FIELDS = ("x", "y", "rotation", "color1", "color2", "skill_energy", "skill_cooldown", "combo")
+
+# (column, rotation) -> 第二个方块也在棋盘内的落点；越界的列移到最近的合法列
+MOVE_INDEX = np.array([[MOVES.index((min(max(x, -dx), GAME_AREA_WIDTH - 1 - dx), rotation))
+                        for rotation, (dx, _) in enumerate(ROTATION_OFFSETS)]
+                       for x in range(GAME_AREA_WIDTH)])
+
+
+def board_view(cells):
+    """ListBoard 的一维格子缓冲区对应的只读 (H, W) 视图"""
+    view = np.frombuffer(cells, dtype=np.uint8).reshape(GAME_AREA_HEIGHT, GAME_AREA_WIDTH)
+    view.flags.writeable = False
+    return view
+
+
+class GameEnv:
+    """一局完整游戏的环境
+
+    observation 为字典：board/stones 是玩家棋盘的颜色编号和石头，
+    opponent_board/opponent_stones 是对手棋盘，status 是 STATUS_FIELDS 组成的整数向量
+    （原地更新）。落点从当前方块组出发走不到时（被堆高的列挡住），方块组在原位置直接硬降，
+    info["valid"] 为 False。max_steps 不为 None 时，超过该步数就截断（truncated）。
+    """
+
+    def __init__(self, character="胡桃", opponent_character="蓝砚", difficulty=DEFAULT_DIFFICULTY, max_steps=None):
+        self.state = GameState(character, opponent_character, backend="list", difficulty=difficulty)
+        self.max_steps = max_steps
+        self.steps = 0
+        self.status = np.zeros(len(STATUS_FIELDS), dtype=np.int64)
+        self.observation = None
+
+    def reset(self, seed=None):
+        """开始新的一局，返回 (observation, info)；seed 相同、动作相同的两局完全一样"""
+        state = self.state
+        state.reset(seed)
+        self.steps = 0
+        # 新的一局换了新的棋盘，视图要重新建立
+        self.observation = {
+            "board": board_view(state.board.cells),
+            "stones": board_view(state.board.stone_cells),
+            "opponent_board": board_view(state.opponent_board.cells),
+            "opponent_stones": board_view(state.opponent_board.stone_cells),
+            "status": self.status,
+        }
+        self._update_status()
+        return self.observation, self._info(True)
+
+    def step(self, action):
+        """执行动作 (column, rotation, use_skill)，返回 (observation, reward, terminated, truncated, info)"""
+        column, rotation, use_skill = action
+        state = self.state
+        score = state.score
+        if use_skill:
+            state.use_skill()
+
+        # 蓝砚的技能会把方块组直接硬降，这时通常只能原地落下
+        piece = state.piece
+        valid = True
+        if not state.game_over:
+            target = state.placements().get((int(column), int(rotation) % len(ROTATION_OFFSETS)))
+            if target is None:
+                valid = False
+            else:
+                piece.x = target.x
+                piece.rotation = target.rotation
+            state.drop_blocks()
+            # 推进时间直到方块组在下一次下落时落地
+            while state.piece is piece and not state.step():
+                pass
+        state.events.clear()
+
+        self.steps += 1
+        self._update_status()
+        terminated = state.game_over
+        truncated = not terminated and self.max_steps is not None and self.steps >= self.max_steps
+        return self.observation, state.score - score, terminated, truncated, self._info(valid)
+
+    def _update_status(self):
+        state = self.state
+        piece = state.piece
+        status = self.status
+        status[0] = piece.x
+        status[1] = piece.y
+        status[2] = piece.rotation
+        status[3] = piece.color1
+        status[4] = piece.color2
+        status[5] = state.skill_energy
+        status[6] = state.skill_cooldown
+        status[7] = state.combo_count
+
+    def _info(self, valid):
+        state = self.state
+        return {
+            "score": state.score,
+            "opponent_score": state.opponent_score,
+            "chain": state.last_chain,
+            "winner": state.winner,
+            "valid": valid,
+        }
+
+
+class VectorEnv:
+    """同时进行 count 局单人游戏的向量化环境
+
+    observation 为字典：board/stones 是 (count, H, W) 的颜色编号和石头数组，
+    pair 是 (count, 2) 的本步方块组颜色，均直接取自 BatchSimulator（不复制）。
+    actions 为 (count, 3) 的整数数组，每行一个 (column, rotation, use_skill)；
+    越界的列按 MOVE_INDEX 移到最近的合法列。方块组从顶部直接落到目标列
+    （与对手 AI 的落子相同），放不下或堆到顶行即结束。
+    结束的局在返回前自动重置，terminated 标出这些局，
+    info["final_score"] 是它们结束时的得分（其余局为 0）。
+    """
+
+    def __init__(self, count, roles=None, seed=None, max_steps=None):
+        if roles is None:
+            roles = [character_options[i % len(character_options)] for i in range(count)]
+        self.simulator = BatchSimulator(count, roles=roles, use_skills=False, seed=seed)
+        self.count = count
+        self.max_steps = max_steps
+        self.steps = np.zeros(count, dtype=np.int64)
+        # 连击：与 GameState 相同，距上次消除超过 COMBO_TICKS 步后清零
+        self.combo = np.zeros(count, dtype=np.int64)
+        self.last_clear_tick = np.zeros(count, dtype=np.int64)
+        self.score = np.zeros(count, dtype=np.int64)
+        self.pairs = np.zeros((count, 2), dtype=np.uint8)
+        self.observation = {"board": self.simulator.colors, "stones": self.simulator.stones, "pair": self.pairs}
+
+    def reset(self, seed=None):
+        """所有局重新开始，返回 (observation, info)"""
+        simulator = self.simulator
+        if seed is not None:
+            simulator.rng = np.random.default_rng(seed)
+        self._reset_games(np.arange(self.count))
+        self.pairs[:] = simulator.draw_pairs()
+        return self.observation, {}
+
+    def step(self, actions):
+        """所有局执行一步，返回 (observation, reward, terminated, truncated, info)，后四项均为长度 count 的数组"""
+        simulator = self.simulator
+        actions = np.asarray(actions)
+        moves = MOVE_INDEX[actions[:, 0], actions[:, 1] % len(ROTATION_OFFSETS)]
+        tick = simulator.tick
+        simulator.step(moves, skills=actions[:, 2].astype(bool), pairs=self.pairs)
+
+        reward = self._combo_scores(simulator.rounds, tick)
+        self.score += reward
+        self.steps += 1
+        terminated = ~simulator.alive
+        truncated = ~terminated & (self.steps >= self.max_steps if self.max_steps is not None else False)
+        done = np.flatnonzero(terminated | truncated)
+        final_score = np.where(terminated | truncated, self.score, 0)
+        if len(done):
+            self._reset_games(done)
+        self.pairs[:] = simulator.draw_pairs()
+        return self.observation, reward, terminated, truncated, {"final_score": final_score}
+
+    def _combo_scores(self, rounds, tick):
+        """按 GameState.resolve_chain 的连击规则计算每局本步的得分"""
+        self.combo[tick - self.last_clear_tick > COMBO_TICKS] = 0
+        reward = np.zeros(self.count, dtype=np.int64)
+        for index in range(MAX_CHAIN_ROUNDS):
+            cleared = rounds[:, index]
+            self.combo += cleared > 0
+            reward += cleared * (10 + 5 * (self.combo - 1))
+        self.last_clear_tick[rounds[:, 0] > 0] = tick
+        return reward
+
+    def _reset_games(self, games):
+        self.simulator.reset_games(games)
+        self.steps[games] = 0
+        self.combo[games] = 0
+        self.score[games] = 0
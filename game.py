@@ -1,18 +1,23 @@
-import random
+import argparse
+import gc
 import sys
 import time
 import os
-import pygame
+import struct
+from collections import OrderedDict
 
+import pygame
 
-# 资源路径处理函数
-def resource_path(relative_path):
-    """ 获取打包后资源的绝对路径 """
-    if getattr(sys, 'frozen', False):  # 判断是否在打包后的环境中
-        base_path = sys._MEIPASS
-    else:
-        base_path = os.path.abspath(".")
-    return os.path.join(base_path, relative_path)
+from assets import AssetManager
+from board import COLOR_NAMES, STONE_BIT
+from engine import (GAME_AREA_WIDTH, GAME_AREA_HEIGHT, INPUT_HARD_DROP, INPUT_LEFT, INPUT_RIGHT, INPUT_ROTATE,
+                    INPUT_SKILL, INPUT_SOFT_DROP, INPUT_SPEED_DOWN, INPUT_SPEED_UP, TICK_RATE, FixedStepClock,
+                    GameState, character_options, characters, skill_max_energy)
+from placement import ROTATION_OFFSETS
+from planner import BackgroundPlanner
+from profiler import HISTORY_FRAMES, PHASES, STATS_INTERVAL, FrameProfiler
+from replay import REPLAY_DIR, REPLAY_EXTENSION, ReplayRecorder
+from snapshot import SAVE_FILE, load_game, save_game
 
 
 # 初始化Pygame
@@ -28,12 +33,14 @@ except pygame.error:
 SCREEN_WIDTH = 1280
 SCREEN_HEIGHT = 720
 
+# 绘制帧率（逻辑以 engine.TICK_RATE 固定步长推进，与绘制帧率无关）
+RENDER_FPS = 60
+
 # 方块尺寸
 BLOCK_SIZE = 40
 
-# 游戏区域尺寸
-GAME_AREA_WIDTH = 6  # 方块列数
-GAME_AREA_HEIGHT = 15  # 方块行数
+# 角色头像尺寸
+PORTRAIT_SIZE = 100
 
 # 游戏区域位置 - 调整为图二的布局
 GAME_AREA_X = 350
@@ -58,24 +65,38 @@ RED = (255, 99, 71)
 screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
 pygame.display.set_caption("原神八奇乱斗复刻版")
 
+# 资源管理器（图片在加载时转换为屏幕像素格式并按尺寸缓存）
+assets = AssetManager()
+
 # 加载背景图片
-background = pygame.image.load(resource_path(os.path.join("images", "background_b.png")))
-background = pygame.transform.scale(background, (SCREEN_WIDTH, SCREEN_HEIGHT))
+background = assets.image(os.path.join("images", "background_b.png"), (SCREEN_WIDTH, SCREEN_HEIGHT))
 
 # 加载方块图片
-block_images = {
-    "blue": pygame.image.load(resource_path(os.path.join("images", "blue block.png"))),
-    "green": pygame.image.load(resource_path(os.path.join("images", "green block.png"))),
-    "purple": pygame.image.load(resource_path(os.path.join("images", "purple block.png"))),
-    "yellow": pygame.image.load(resource_path(os.path.join("images", "yellow block.png"))),
-    "stone": pygame.image.load(resource_path(os.path.join("images", "stone.png")))
+block_files = {
+    "blue": "blue block.png",
+    "green": "green block.png",
+    "purple": "purple block.png",
+    "yellow": "yellow block.png",
+    "stone": "stone.png"
 }
-
-# 调整方块图片大小
-for color in block_images:
-    block_images[color] = pygame.transform.scale(block_images[color], (BLOCK_SIZE, BLOCK_SIZE))
-
-# 加载八奇乱斗角色图片
+block_images = {color: assets.image(os.path.join("images", filename), (BLOCK_SIZE, BLOCK_SIZE))
+                for color, filename in block_files.items()}
+
+# 幽灵方块（方块组硬降落点的预览）使用半透明的方块图片
+GHOST_ALPHA = 80
+ghost_images = {}
+for color, image in block_images.items():
+    ghost_images[color] = image.copy()
+    ghost_images[color].set_alpha(GHOST_ALPHA)
+
+# 覆盖在棋盘格子上的图片，按 draw_board 中的覆盖编号（高四位）索引：
+# 0 为没有，1-4 为幽灵方块，5-8 为下落中方块（颜色编号 1-4 加 4）
+OVERLAY_GHOST = 0
+OVERLAY_FALLING = len(COLOR_NAMES) - 1
+overlay_images = ([None] + [ghost_images[color] for color in COLOR_NAMES[1:]]
+                  + [block_images[color] for color in COLOR_NAMES[1:]])
+
+# 八奇乱斗角色图片（第一次显示时才加载）
 character_images = {}
 character_files = {
     "胡桃": "hutao.gif",
@@ -85,42 +106,42 @@ character_files = {
     "藤人": "hutao.gif"  # 暂时使用胡桃的图片作为藤人的图片
 }
 
-# 加载角色图片
-for character, filename in character_files.items():
-    try:
-        # 尝试加载图片
-        image_path = os.path.join("images", "characters", filename)
-        char_img = pygame.image.load(resource_path(image_path))
-        # 调整大小为100x100像素
-        char_img = pygame.transform.scale(char_img, (100, 100))
-        character_images[character] = char_img
-        print(f"成功加载角色图片: {character}")
-    except Exception as e:
-        print(f"无法加载角色图片 {character}: {e}")
-        # 创建一个临时的角色图片作为备用
-        char_img = pygame.Surface((100, 100))
-        if character == "胡桃":
-            char_img.fill(RED)  # 红色
-        elif character == "蓝砚":
-            char_img.fill(CYAN)  # 蓝色
-        elif character == "魈":
-            char_img.fill((144, 238, 144))  # 绿色
-        elif character == "刻晴":
-            char_img.fill(PURPLE)  # 紫色
-        # 添加文字
-        font = pygame.font.SysFont(None, 24)
-        text = font.render(character, True, WHITE)
-        text_rect = text.get_rect(center=(50, 50))
-        char_img.blit(text, text_rect)
+# 图片加载失败时备用图片的颜色
+character_placeholder_colors = {
+    "胡桃": RED,  # 红色
+    "蓝砚": CYAN,  # 蓝色
+    "魈": (144, 238, 144),  # 绿色
+    "刻晴": PURPLE,  # 紫色
+}
+
+
+def get_character_image(character):
+    """获取角色图片，第一次调用时加载，失败时使用带名字的色块代替"""
+    char_img = character_images.get(character)
+    if char_img is None:
+        image_path = os.path.join("images", "characters", character_files[character])
+        char_img = assets.try_image(image_path, (PORTRAIT_SIZE, PORTRAIT_SIZE))
+        if char_img is None:
+            # 创建一个临时的角色图片作为备用
+            char_img = pygame.Surface((PORTRAIT_SIZE, PORTRAIT_SIZE)).convert()
+            char_img.fill(character_placeholder_colors.get(character, BLACK))
+            # 添加文字
+            font = pygame.font.SysFont(None, 24)
+            text = font.render(character, True, WHITE)
+            text_rect = text.get_rect(center=(PORTRAIT_SIZE // 2, PORTRAIT_SIZE // 2))
+            char_img.blit(text, text_rect)
         character_images[character] = char_img
+    return char_img
+
 
 # 加载背景音乐
+music_path = os.path.join("sounds", "z8g15-g2l2u.wav")
 if audio_available:
     try:
-        pygame.mixer.music.load(resource_path(os.path.join("sounds", "z8g15-g2l2u.wav")))
+        pygame.mixer.music.load(assets.source(music_path), os.path.basename(music_path))
         pygame.mixer.music.set_volume(0.5)
         pygame.mixer.music.play(-1)  # -1表示循环播放
-    except pygame.error:
+    except (pygame.error, OSError):
         print("警告: 无法加载背景音乐")
 
 # 加载音效
@@ -128,7 +149,7 @@ sound_effects = {}
 if audio_available:
     try:
         # 使用背景音乐作为所有音效的替代
-        background_sound = pygame.mixer.Sound(resource_path(os.path.join("sounds", "z8g15-g2l2u.wav")))
+        background_sound = pygame.mixer.Sound(assets.source(music_path))
         # 设置较低的音量，避免与背景音乐冲突
         background_sound.set_volume(0.2)
         # 为所有音效使用同一个音频文件
@@ -136,134 +157,162 @@ if audio_available:
         sound_effects["drop"] = background_sound
         sound_effects["rotate"] = background_sound
         sound_effects["game_over"] = background_sound
-        print("成功加载音效")
-    except pygame.error:
+    except (pygame.error, OSError):
         print("警告: 无法加载音效")
 
-# 字体
-font_path = resource_path(os.path.join("fonts", "simhei.ttf"))
-try:
-    game_font = pygame.font.Font(font_path, 36)
-    small_font = pygame.font.Font(font_path, 24)
-    large_font = pygame.font.Font(font_path, 48)
-    print("成功加载中文字体")
-except pygame.error:
-    print("警告: 无法加载中文字体，使用系统默认字体")
-    game_font = pygame.font.SysFont(None, 36)
-    small_font = pygame.font.SysFont(None, 24)
-    large_font = pygame.font.SysFont(None, 48)
+# 字体（加载失败时使用系统默认字体）
+font_path = os.path.join("fonts", "simhei.ttf")
+game_font = assets.font(font_path, 36)
+small_font = assets.font(font_path, 24)
+large_font = assets.font(font_path, 48)
+debug_font = assets.font(font_path, 16)
+
+assets.report()
 
 # 游戏状态
 MENU = 0
 CHARACTER_SELECT = 1
 GAME = 2
 GAME_OVER = 3
+PAUSED = 4
 
 current_state = MENU
 
 # 菜单选项
-menu_options = ["开始游戏", "角色选择", "退出"]
+menu_options = ["开始游戏", "读取存档", "角色选择", "退出"]
 selected_option = 0
 
+# 暂停菜单选项及最近一次存档、读档的提示
+pause_options = ["继续游戏", "保存游戏", "读取存档", "返回菜单"]
+selected_pause_option = 0
+pause_message = ""
+
 # 角色选择
-character_options = ["胡桃", "蓝砚", "魈", "刻晴", "藤人"]
 selected_character = 0
 current_character = "胡桃"  # 默认角色
 opponent_character = "蓝砚"  # 默认对手角色
 
-# 角色技能定义
-characters = {
-    "胡桃": {
-        "skill_name": "蝶引来生",
-        "skill_description": "将场上所有同色方块变为当前方块颜色",
-        "cooldown": 15
-    },
-    "蓝砚": {
-        "skill_name": "水月",
-        "skill_description": "将当前方块立即下落并消除下方一行方块",
-        "cooldown": 8
-    },
-    "魈": {
-        "skill_name": "靖妖傩舞",
-        "skill_description": "消除场上随机3个方块，并对对手施加2个干扰方块",
-        "cooldown": 10
-    },
-    "刻晴": {
-        "skill_name": "星斗归位",
-        "skill_description": "冻结对手场地3秒",
-        "cooldown": 12
-    },
-    "藤人": {
-        "skill_name": "草原核绽放",
-        "skill_description": "消除场上所有相邻的方块，并对对手施加3个干扰方块",
-        "cooldown": 12
-    }
-}
-
-# 游戏变量
-grid = [[None for _ in range(GAME_AREA_WIDTH)] for _ in range(GAME_AREA_HEIGHT)]
-stone_grid = [[None for _ in range(GAME_AREA_WIDTH)] for _ in range(GAME_AREA_HEIGHT)]
-opponent_grid = [[None for _ in range(GAME_AREA_WIDTH)] for _ in range(GAME_AREA_HEIGHT)]
-opponent_stone_grid = [[None for _ in range(GAME_AREA_WIDTH)] for _ in range(GAME_AREA_HEIGHT)]
-
-current_blocks = []  # 当前控制的方块组
-score = 0
-opponent_score = 0
-game_time = 0
-game_start_time = 0
-
-# 技能相关
-skill_energy = 0
-skill_max_energy = 100
-skill_cooldown = 0
-
-# 连击相关
-combo_count = 0
-combo_timer = 0
-COMBO_TIME = 2.0  # 连击时间窗口（秒）
-
-# 游戏速度
-speed_levels = [1, 2, 3, 4, 5]
-current_speed_level = 1
-game_speed = speed_levels[current_speed_level - 1]
-
-# 干扰方块队列
-interference_queue = []
+# 当前对局（规则与状态见 engine.GameState）
+state = GameState(current_character, opponent_character)
+sim_clock = FixedStepClock()  # 逻辑时钟（固定步长累加器）
 
 # UI颜色
 UI_BG_COLOR = (30, 30, 30, 200)  # 半透明黑色
 UI_BORDER_COLOR = GOLD
 UI_HIGHLIGHT_COLOR = (255, 255, 255, 50)  # 半透明白色
 
-
-def draw_text(text, font, color, x, y, center=False):
-    """绘制文本"""
-    text_surface = font.render(text, True, color)
+# 性能剖析（F3 显示或隐藏叠加层）
+PROFILE_KEY = pygame.K_F3
+PROFILE_RECT = pygame.Rect(10, GAME_AREA_Y, 320, 300)
+PROFILE_GRAPH_HEIGHT = 80
+PROFILE_GRAPH_SCALE = 2 / RENDER_FPS  # 图表顶端对应的帧耗时（秒）
+profiler = FrameProfiler()
+profile_table = None  # 百分位表格的 Surface，百分位更新时重新渲染
+profile_table_key = None
+
+# 渲染缓存：屏幕内容在帧之间保留，每帧只重绘有变化的区域
+current_scene = None  # 屏幕上当前画着的画面，变化时整屏重绘
+full_update = True  # 本帧是否需要整屏刷新
+dirty_rects = []  # 本帧需要刷新到显示器的区域
+game_layer = None  # 游戏界面的静态层：背景、边框、角色图片、技能名和操作提示
+player_cells = []  # 玩家棋盘上一帧每格画的内容编码（见 draw_board）
+opponent_cells = []  # 对手棋盘上一帧每格画的内容编码
+overlay_cells = bytearray(GAME_AREA_WIDTH * GAME_AREA_HEIGHT)  # 本帧每格的覆盖编号（绘制后清零，每帧复用）
+cell_rects = [pygame.Rect(x * BLOCK_SIZE, y * BLOCK_SIZE, BLOCK_SIZE, BLOCK_SIZE)
+              for y in range(GAME_AREA_HEIGHT) for x in range(GAME_AREA_WIDTH)]  # 每格相对棋盘左上角的区域
+hud_values = [None] * 4  # 上一帧状态栏显示的数值：秒数、能量、能量条宽度、速度等级
+hud_rects = []  # 上一帧状态栏占用的区域
+
+# 文本渲染缓存：(文本, 字体, 颜色) -> Surface，超出容量时淘汰最久未使用的
+TEXT_CACHE_SIZE = 128
+text_cache = OrderedDict()
+
+# 预先绘制好的半透明面板：(宽, 高, 填充色, 边框色) -> Surface
+panel_cache = {}
+
+
+def enter_scene(scene):
+    """切换到画面 scene，如果与屏幕上的画面不同返回 True，调用方需要整屏重绘"""
+    global current_scene, full_update
+    if scene == current_scene:
+        return False
+    current_scene = scene
+    full_update = True
+    return True
+
+
+def invalidate_screen():
+    """使屏幕内容失效（开始新游戏、窗口被遮挡后重新显示等），下一帧整屏重绘"""
+    global current_scene
+    current_scene = None
+
+
+def present():
+    """把本帧的变化刷新到显示器"""
+    global full_update
+    if full_update:
+        pygame.display.flip()
+        full_update = False
+    elif dirty_rects:
+        pygame.display.update(dirty_rects)
+    dirty_rects.clear()
+
+
+def render_text(text, font, color):
+    """渲染文本，相同的文本、字体和颜色直接复用缓存的 Surface"""
+    key = (text, font, color)
+    text_surface = text_cache.get(key)
+    if text_surface is None:
+        text_surface = font.render(text, True, color)
+        text_cache[key] = text_surface
+        if len(text_cache) > TEXT_CACHE_SIZE:
+            text_cache.popitem(last=False)
+    else:
+        text_cache.move_to_end(key)
+    return text_surface
+
+
+def get_panel(width, height, fill=UI_BG_COLOR, border=UI_BORDER_COLOR):
+    """返回预先绘制好的半透明面板，border 为 None 表示无边框"""
+    key = (width, height, fill, border)
+    panel = panel_cache.get(key)
+    if panel is None:
+        # 创建半透明表面
+        panel = pygame.Surface((width, height), pygame.SRCALPHA)
+        panel.fill(fill)
+        # 绘制边框
+        if border is not None:
+            pygame.draw.rect(panel, border, (0, 0, width, height), 2)
+        panel_cache[key] = panel
+    return panel
+
+
+def draw_text(text, font, color, x, y, center=False, surface=None):
+    """绘制文本，返回占用的区域"""
+    text_surface = render_text(text, font, color)
     if center:
         text_rect = text_surface.get_rect(center=(x, y))
     else:
         text_rect = text_surface.get_rect(topleft=(x, y))
-    screen.blit(text_surface, text_rect)
+    (surface or screen).blit(text_surface, text_rect)
+    return text_rect
 
 
-def draw_ui_panel(x, y, width, height):
-    """绘制UI面板"""
-    # 创建半透明表面
-    panel = pygame.Surface((width, height), pygame.SRCALPHA)
-    panel.fill(UI_BG_COLOR)
-    # 绘制边框
-    pygame.draw.rect(panel, UI_BORDER_COLOR, (0, 0, width, height), 2)
-    # 绘制到屏幕
-    screen.blit(panel, (x, y))
+def draw_ui_panel(x, y, width, height, surface=None):
+    """绘制UI面板，返回占用的区域"""
+    return (surface or screen).blit(get_panel(width, height), (x, y))
 
 
 def draw_menu():
-    """绘制菜单界面"""
+    """绘制菜单界面（选项不变时不重绘）"""
+    if not enter_scene(("menu", selected_option)):
+        return
+
     # 绘制背景
     screen.blit(background, (0, 0))
 
     # 绘制标题
-    title_text = large_font.render("原神八奇乱斗复刻版", True, GOLD)
+    title_text = render_text("原神八奇乱斗复刻版", large_font, GOLD)
     title_rect = title_text.get_rect(center=(SCREEN_WIDTH // 2, 150))
     screen.blit(title_text, title_rect)
 
@@ -271,24 +320,27 @@ def draw_menu():
     menu_y = 300
     for i, option in enumerate(menu_options):
         color = GOLD if i == selected_option else WHITE
-        option_text = game_font.render(option, True, color)
+        option_text = render_text(option, game_font, color)
         option_rect = option_text.get_rect(center=(SCREEN_WIDTH // 2, menu_y))
         screen.blit(option_text, option_rect)
         menu_y += 70
 
     # 绘制操作提示
-    instruction_text = small_font.render("使用上下键选择，回车确认", True, WHITE)
+    instruction_text = render_text("使用上下键选择，回车确认", small_font, WHITE)
     instruction_rect = instruction_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 100))
     screen.blit(instruction_text, instruction_rect)
 
 
 def draw_character_select():
-    """绘制角色选择界面"""
+    """绘制角色选择界面（选择不变时不重绘）"""
+    if not enter_scene(("character_select", selected_character)):
+        return
+
     # 绘制背景
     screen.blit(background, (0, 0))
 
     # 绘制标题
-    title_text = large_font.render("选择角色", True, GOLD)
+    title_text = render_text("选择角色", large_font, GOLD)
     title_rect = title_text.get_rect(center=(SCREEN_WIDTH // 2, 100))
     screen.blit(title_text, title_rect)
 
@@ -296,13 +348,13 @@ def draw_character_select():
     char_x = 200
     for i, character in enumerate(character_options):
         # 绘制角色图片
-        char_img = character_images[character]
+        char_img = get_character_image(character)
         char_rect = char_img.get_rect(center=(char_x, 300))
         screen.blit(char_img, char_rect)
 
         # 绘制角色名称
         color = GOLD if i == selected_character else WHITE
-        char_text = game_font.render(character, True, color)
+        char_text = render_text(character, game_font, color)
         char_text_rect = char_text.get_rect(center=(char_x, 400))
         screen.blit(char_text, char_text_rect)
 
@@ -321,425 +373,274 @@ def draw_character_select():
     draw_text(f"效果: {skill_desc}", small_font, WHITE, SCREEN_WIDTH // 2 - 150, 550)
 
     # 绘制操作提示
-    instruction_text = small_font.render("使用左右键选择，回车确认", True, WHITE)
+    instruction_text = render_text("使用左右键选择，回车确认", small_font, WHITE)
     instruction_rect = instruction_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 100))
     screen.blit(instruction_text, instruction_rect)
 
 
-def draw_game():
-    """绘制游戏界面"""
-    # 绘制背景
-    screen.blit(background, (0, 0))
+def build_game_layer():
+    """绘制游戏界面中不随时间变化的部分"""
+    layer = background.copy()
 
     # 绘制游戏区域边框
-    pygame.draw.rect(screen, GOLD, (GAME_AREA_X - 5, GAME_AREA_Y - 5,
-                                    GAME_AREA_WIDTH * BLOCK_SIZE + 10,
-                                    GAME_AREA_HEIGHT * BLOCK_SIZE + 10), 2)
+    pygame.draw.rect(layer, GOLD, (GAME_AREA_X - 5, GAME_AREA_Y - 5,
+                                   GAME_AREA_WIDTH * BLOCK_SIZE + 10,
+                                   GAME_AREA_HEIGHT * BLOCK_SIZE + 10), 2)
 
     # 绘制对手游戏区域边框
-    pygame.draw.rect(screen, GOLD, (OPPONENT_AREA_X - 5, OPPONENT_AREA_Y - 5,
-                                    GAME_AREA_WIDTH * BLOCK_SIZE + 10,
-                                    GAME_AREA_HEIGHT * BLOCK_SIZE + 10), 2)
+    pygame.draw.rect(layer, GOLD, (OPPONENT_AREA_X - 5, OPPONENT_AREA_Y - 5,
+                                   GAME_AREA_WIDTH * BLOCK_SIZE + 10,
+                                   GAME_AREA_HEIGHT * BLOCK_SIZE + 10), 2)
 
-    # 绘制玩家角色图片 - 调整位置以符合图二
-    player_char_img = character_images[current_character]
+    # 绘制玩家角色图片
+    player_char_img = get_character_image(current_character)
     player_char_rect = player_char_img.get_rect(
         center=(GAME_AREA_X + GAME_AREA_WIDTH * BLOCK_SIZE // 2, GAME_AREA_Y + GAME_AREA_HEIGHT * BLOCK_SIZE + 60))
-    screen.blit(player_char_img, player_char_rect)
+    layer.blit(player_char_img, player_char_rect)
 
-    # 绘制对手角色图片 - 调整位置以符合图二
-    opponent_char_img = character_images[opponent_character]
+    # 绘制对手角色图片
+    opponent_char_img = get_character_image(opponent_character)
     opponent_char_rect = opponent_char_img.get_rect(
         center=(OPPONENT_AREA_X + GAME_AREA_WIDTH * BLOCK_SIZE // 2, GAME_AREA_Y + GAME_AREA_HEIGHT * BLOCK_SIZE + 60))
-    screen.blit(opponent_char_img, opponent_char_rect)
+    layer.blit(opponent_char_img, opponent_char_rect)
+
+    # 绘制技能信息
+    skill_text = f"技能: {characters[current_character]['skill_name']}"
+    draw_text(skill_text, small_font, GOLD, GAME_AREA_X, GAME_AREA_Y - 30, surface=layer)
+
+    # 绘制操作提示
+    controls_text = "A D 移动    W 旋转    S 加速下落    Space 立即下落    E 技能"
+    draw_text(controls_text, small_font, WHITE, SCREEN_WIDTH // 2 - 200,
+              SCREEN_HEIGHT - 30, surface=layer)
+
+    return layer
+
+
+def reset_game_screen():
+    """重建静态层并整屏重绘游戏界面"""
+    global game_layer
+    game_layer = build_game_layer()
+    screen.blit(game_layer, (0, 0))
+    # -1 不是任何内容的编码，所有格子都会重绘
+    player_cells[:] = [-1] * (GAME_AREA_WIDTH * GAME_AREA_HEIGHT)
+    opponent_cells[:] = [-1] * (GAME_AREA_WIDTH * GAME_AREA_HEIGHT)
+    hud_values[0] = None
+    hud_rects.clear()
+
+
+def draw_hud():
+    """绘制时间、技能能量和速度，数值不变时不重绘（逐项比较，不为每帧创建新对象）"""
+    elapsed = state.tick // TICK_RATE
+    energy = int(state.skill_energy)
+    energy_bar_width = GAME_AREA_WIDTH * BLOCK_SIZE
+    energy_width = int(energy_bar_width * (state.skill_energy / skill_max_energy))
+    speed = state.current_speed_level
+    if (hud_values[0] == elapsed and hud_values[1] == energy and hud_values[2] == energy_width
+            and hud_values[3] == speed):
+        return
+    hud_values[0] = elapsed
+    hud_values[1] = energy
+    hud_values[2] = energy_width
+    hud_values[3] = speed
+    minutes, seconds = divmod(elapsed, 60)
+
+    # 擦除上一次的状态栏（时间面板与能量条有重叠，因此整体重绘）
+    for rect in hud_rects:
+        screen.blit(game_layer, rect, rect)
+    dirty_rects.extend(hud_rects)
+    hud_rects.clear()
 
     # 绘制时间面板
     time_panel_width = 200
     time_panel_height = 50
-    draw_ui_panel(SCREEN_WIDTH // 2 - time_panel_width // 2, GAME_AREA_Y - 60,
-                  time_panel_width, time_panel_height)
-    minutes = int(game_time) // 60
-    seconds = int(game_time) % 60
-    draw_text(f"时间: {minutes:02d}:{seconds:02d}", game_font, WHITE, SCREEN_WIDTH // 2, GAME_AREA_Y - 35, True)
-
-    # 绘制技能信息 - 调整位置以符合图二
-    skill_text = f"技能: {characters[current_character]['skill_name']}"
-    draw_text(skill_text, small_font, GOLD, GAME_AREA_X, GAME_AREA_Y - 30)
+    hud_rects.append(draw_ui_panel(SCREEN_WIDTH // 2 - time_panel_width // 2, GAME_AREA_Y - 60,
+                                   time_panel_width, time_panel_height))
+    hud_rects.append(draw_text(f"时间: {minutes:02d}:{seconds:02d}", game_font, WHITE,
+                               SCREEN_WIDTH // 2, GAME_AREA_Y - 35, True))
 
-    # 绘制技能能量条 - 调整位置以符合图二
-    energy_bar_width = GAME_AREA_WIDTH * BLOCK_SIZE
+    # 绘制技能能量条
     energy_bar_height = 20
     energy_bar_x = GAME_AREA_X
     energy_bar_y = GAME_AREA_Y - 60
-    pygame.draw.rect(screen, GRAY, (energy_bar_x, energy_bar_y, energy_bar_width, energy_bar_height))
-    energy_width = int(energy_bar_width * (skill_energy / skill_max_energy))
+    hud_rects.append(pygame.draw.rect(screen, GRAY, (energy_bar_x, energy_bar_y, energy_bar_width, energy_bar_height)))
     pygame.draw.rect(screen, GOLD, (energy_bar_x, energy_bar_y, energy_width, energy_bar_height))
-    draw_text(f"{int(skill_energy)}%", small_font, WHITE, energy_bar_x + energy_bar_width // 2, energy_bar_y + 10, True)
+    hud_rects.append(draw_text(f"{energy}%", small_font, WHITE,
+                               energy_bar_x + energy_bar_width // 2, energy_bar_y + 10, True))
 
-    # 绘制速度面板 - 调整位置以符合图二
+    # 绘制速度面板
     speed_panel_width = 200
     speed_panel_height = 50
-    draw_ui_panel(SCREEN_WIDTH // 2 - speed_panel_width // 2, GAME_AREA_Y + GAME_AREA_HEIGHT * BLOCK_SIZE + 100,
-                  speed_panel_width, speed_panel_height)
-    draw_text(f"速度: {current_speed_level}/5", game_font, WHITE, SCREEN_WIDTH // 2,
-              GAME_AREA_Y + GAME_AREA_HEIGHT * BLOCK_SIZE + 125, True)
+    hud_rects.append(draw_ui_panel(SCREEN_WIDTH // 2 - speed_panel_width // 2,
+                                   GAME_AREA_Y + GAME_AREA_HEIGHT * BLOCK_SIZE + 100,
+                                   speed_panel_width, speed_panel_height))
+    hud_rects.append(draw_text(f"速度: {speed}/5", game_font, WHITE, SCREEN_WIDTH // 2,
+                               GAME_AREA_Y + GAME_AREA_HEIGHT * BLOCK_SIZE + 125, True))
+
+    dirty_rects.extend(hud_rects)
+
+
+def mark_overlay(piece, offset):
+    """在 overlay_cells 中标出方块组 piece 的两格（覆盖编号为颜色编号加 offset，offset 为 None 时清零）"""
+    dx, dy = ROTATION_OFFSETS[piece.rotation]
+    x, y = piece.x, piece.y
+    if y >= 0:
+        overlay_cells[y * GAME_AREA_WIDTH + x] = 0 if offset is None else piece.color1 + offset
+    if y + dy >= 0:
+        overlay_cells[(y + dy) * GAME_AREA_WIDTH + x + dx] = 0 if offset is None else piece.color2 + offset
+
+
+def draw_board(board, area_x, area_y, drawn, falling=None, ghost=None):
+    """只重绘与上一帧不同的格子
+
+    每格的内容编码为一个小整数：低四位是棋盘快照中的字节（颜色编号和石头），
+    高四位是覆盖在上面的图片（见 overlay_images）。drawn 保存上一帧每格的编码，
+    逐格比较不需要为每帧创建新对象。falling 是当前控制的方块组，ghost 是它的落点预览
+    （画成半透明，与下落中方块重叠的格子只画下落中方块）。
+    """
+    if ghost is not None:
+        mark_overlay(ghost, OVERLAY_GHOST)
+    if falling is not None:
+        mark_overlay(falling, OVERLAY_FALLING)
+    stone_img = block_images["stone"]
+    for x, column in enumerate(board.snapshot().columns):
+        index = x
+        for value in column:
+            cell = value | overlay_cells[index] << 4
+            if cell != drawn[index]:
+                drawn[index] = cell
+                rect = cell_rects[index].move(area_x, area_y)
+                # 先恢复背景，再按方块、石头、下落中方块（或幽灵方块）的顺序绘制
+                screen.blit(game_layer, rect, rect)
+                if value & ~STONE_BIT:
+                    screen.blit(block_images[COLOR_NAMES[value & ~STONE_BIT]], rect)
+                if value & STONE_BIT:
+                    screen.blit(stone_img, rect)
+                if cell >> 4:
+                    screen.blit(overlay_images[cell >> 4], rect)
+                dirty_rects.append(rect)
+            index += GAME_AREA_WIDTH
+    if ghost is not None:
+        mark_overlay(ghost, None)
+    if falling is not None:
+        mark_overlay(falling, None)
+
+
+def draw_game_contents():
+    """绘制游戏界面中会变化的部分"""
+    draw_hud()
+    draw_board(state.board, GAME_AREA_X, GAME_AREA_Y, player_cells, state.piece, state.landing_piece())
+    draw_board(state.opponent_board, OPPONENT_AREA_X, OPPONENT_AREA_Y, opponent_cells)
 
-    # 绘制操作提示面板 - 调整位置以符合图二
-    controls_text = "A D 移动    W 旋转    S 加速下落    Space 立即下落"
-    draw_text(controls_text, small_font, WHITE, SCREEN_WIDTH // 2 - 200,
-              SCREEN_HEIGHT - 30)
-
-    # 绘制网格中的方块
-    for y in range(GAME_AREA_HEIGHT):
-        for x in range(GAME_AREA_WIDTH):
-            # 绘制玩家网格
-            if grid[y][x] is not None:
-                block_img = block_images[grid[y][x]]
-                screen.blit(block_img, (GAME_AREA_X + x * BLOCK_SIZE, GAME_AREA_Y + y * BLOCK_SIZE))
-            # 绘制玩家石头
-            if stone_grid[y][x] is not None:
-                stone_img = block_images["stone"]
-                screen.blit(stone_img, (GAME_AREA_X + x * BLOCK_SIZE, GAME_AREA_Y + y * BLOCK_SIZE))
-
-            # 绘制对手网格
-            if opponent_grid[y][x] is not None:
-                block_img = block_images[opponent_grid[y][x]]
-                screen.blit(block_img, (OPPONENT_AREA_X + x * BLOCK_SIZE, OPPONENT_AREA_Y + y * BLOCK_SIZE))
-            # 绘制对手石头
-            if opponent_stone_grid[y][x] is not None:
-                stone_img = block_images["stone"]
-                screen.blit(stone_img, (OPPONENT_AREA_X + x * BLOCK_SIZE, OPPONENT_AREA_Y + y * BLOCK_SIZE))
-
-    # 绘制当前控制的方块组
-    for block in current_blocks:
-        if block["y"] >= 0:  # 只绘制在游戏区域内的方块
-            block_img = block_images[block["color"]]
-            screen.blit(block_img, (GAME_AREA_X + block["x"] * BLOCK_SIZE, GAME_AREA_Y + block["y"] * BLOCK_SIZE))
+
+def draw_game():
+    """绘制游戏界面"""
+    # 换角色必然经过 start_game / resume_saved_game，它们会使屏幕失效
+    if enter_scene("game"):
+        reset_game_screen()
+    draw_game_contents()
 
 
 def draw_game_over():
-    """绘制游戏结束界面"""
+    """绘制游戏结束界面（只在进入时绘制一次）"""
+    if not enter_scene("game_over"):
+        return
+    reset_game_screen()
+    draw_game_contents()
+
     # 创建半透明覆盖层
-    overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-    overlay.fill((0, 0, 0, 150))  # 半透明黑色
+    overlay = get_panel(SCREEN_WIDTH, SCREEN_HEIGHT, (0, 0, 0, 150), None)  # 半透明黑色
     screen.blit(overlay, (0, 0))
 
     # 绘制游戏结束文本
-    game_over_text = large_font.render("游戏结束", True, GOLD)
+    game_over_text = render_text("游戏结束", large_font, GOLD)
     game_over_rect = game_over_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50))
     screen.blit(game_over_text, game_over_rect)
 
     # 绘制分数
-    score_text = game_font.render(f"最终分数: {score}", True, WHITE)
+    score_text = render_text(f"最终分数: {state.score}", game_font, WHITE)
     score_rect = score_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 20))
     screen.blit(score_text, score_rect)
 
     # 绘制操作提示
-    instruction_text = small_font.render("按回车键返回菜单", True, WHITE)
+    instruction_text = render_text("按回车键返回菜单", small_font, WHITE)
     instruction_rect = instruction_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 80))
     screen.blit(instruction_text, instruction_rect)
 
 
-def find_connected(x, y, color, visited, connected):
-    """递归查找连接的相同颜色方块"""
-    # 检查边界
-    if x < 0 or x >= GAME_AREA_WIDTH or y < 0 or y >= GAME_AREA_HEIGHT:
-        return
-
-    # 检查是否已访问或颜色不匹配
-    if visited[y][x] or grid[y][x] != color:
-        return
+def draw_profiler_overlay():
+    """在左侧绘制剖析叠加层：最近各帧耗时的折线图，以及各阶段耗时的 p50/p95/p99（毫秒）"""
+    global profile_table, profile_table_key
+    rect = PROFILE_RECT
+    pygame.draw.rect(screen, (20, 20, 20), rect)
+    pygame.draw.rect(screen, UI_BORDER_COLOR, rect, 1)
+
+    # 帧耗时折线图，虚线为一帧的时间预算
+    graph = pygame.Rect(rect.x + 5, rect.y + 5, rect.width - 10, PROFILE_GRAPH_HEIGHT)
+    budget_y = graph.bottom - int(graph.height / (PROFILE_GRAPH_SCALE * RENDER_FPS))
+    for x in range(graph.x, graph.right, 8):
+        pygame.draw.line(screen, GRAY, (x, budget_y), (x + 3, budget_y))
+    samples = profiler.history["total"]
+    if len(samples) > 1:
+        step = graph.width / (HISTORY_FRAMES - 1)
+        points = [(graph.x + int(i * step), graph.bottom - int(graph.height * min(seconds / PROFILE_GRAPH_SCALE, 1)))
+                  for i, seconds in enumerate(samples)]
+        pygame.draw.lines(screen, LIGHT_BLUE, False, points)
+
+    # 百分位表格每 STATS_INTERVAL 帧更新一次，其间复用渲染好的 Surface
+    key = profiler.frames // STATS_INTERVAL
+    if key != profile_table_key or profile_table is None:
+        profile_table_key = key
+        profile_table = pygame.Surface((rect.width - 10, rect.height - PROFILE_GRAPH_HEIGHT - 15))
+        profile_table.fill((20, 20, 20))
+        columns = (0, 185, 232, 278)
+        rows = [("phase (ms)", "p50", "p95", "p99")]
+        rows.extend((phase,) + tuple(f"{value * 1000:.2f}" for value in profiler.stats.get(phase, (0, 0, 0)))
+                    for phase in PHASES)
+        for row_index, row in enumerate(rows):
+            for column, text in zip(columns, row):
+                color = GOLD if row_index == 0 else WHITE
+                profile_table.blit(debug_font.render(text, True, color), (column, row_index * 20))
+    screen.blit(profile_table, (rect.x + 5, graph.bottom + 10))
+    dirty_rects.append(rect)
+
+
+def toggle_profiler():
+    """显示或隐藏剖析叠加层，并为当前对局的引擎阶段加上或去掉计时"""
+    profiler.enabled = not profiler.enabled
+    if profiler.enabled:
+        profiler.instrument(state)
+    else:
+        profiler.uninstrument(state)
+        # 叠加层盖住的区域需要重绘
+        invalidate_screen()
 
-    # 标记为已访问并添加到连接列表
-    visited[y][x] = True
-    connected.append((x, y))
-
-    # 递归检查四个方向
-    find_connected(x + 1, y, color, visited, connected)
-    find_connected(x - 1, y, color, visited, connected)
-    find_connected(x, y + 1, color, visited, connected)
-    find_connected(x, y - 1, color, visited, connected)
-
-
-def clear_isolated_stones():
-    """清除没有相邻彩色方块的石头"""
-    for y in range(GAME_AREA_HEIGHT):
-        for x in range(GAME_AREA_WIDTH):
-            if stone_grid[y][x] is not None:
-                # 检查四个方向是否有彩色方块
-                has_adjacent_color = False
-                for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-                    nx, ny = x + dx, y + dy
-                    if 0 <= nx < GAME_AREA_WIDTH and 0 <= ny < GAME_AREA_HEIGHT and grid[ny][nx] is not None:
-                        has_adjacent_color = True
-                        break
-                # 如果没有相邻的彩色方块，清除石头
-                if not has_adjacent_color:
-                    stone_grid[y][x] = None
-
-
-def create_block_group():
-    """创建新的方块组"""
-    colors = ["blue", "green", "purple", "yellow"]
-    color1 = random.choice(colors)
-    color2 = random.choice(colors)
-    x = GAME_AREA_WIDTH // 2 - 1
-    y = -1  # 修改：从-1开始，这样方块组最初只有一部分可见
-    return [{"color": color1, "x": x, "y": y}, {"color": color2, "x": x, "y": y + 1}]
-
-
-def create_stones(count):
-    """创建石头方块"""
-    stones = []
-    for _ in range(count):
-        x = random.randint(0, GAME_AREA_WIDTH - 1)
-        y = 0
-        stones.append({"color": "stone", "x": x, "y": y})
-    return stones
-
-
-def check_collision(blocks):
-    """检查方块组是否与现有方块或边界碰撞"""
-    for block in blocks:
-        x, y = block["x"], block["y"]
-        # 检查边界
-        if x < 0 or x >= GAME_AREA_WIDTH or y >= GAME_AREA_HEIGHT:
-            return True
-        # 检查与现有方块的碰撞（只检查在游戏区域内的方块）
-        if y >= 0 and (grid[y][x] is not None or stone_grid[y][x] is not None):
-            return True
-    return False
-
-
-def place_blocks(blocks):
-    """将方块组放置到网格中"""
-    for block in blocks:
-        x, y = block["x"], block["y"]
-        if 0 <= y < GAME_AREA_HEIGHT and 0 <= x < GAME_AREA_WIDTH:
-            grid[y][x] = block["color"]
-
-    # 检查并消除连接的方块
-    cleared = check_clear()
-    if cleared > 0:
-        # 播放消除音效
-        if audio_available and "clear" in sound_effects:
-            sound_effects["clear"].play()
-
-        # 更新分数
-        global score, combo_count, combo_timer, skill_energy
-        base_score = cleared * 10
-        combo_count += 1
-        combo_timer = time.time()
-        combo_bonus = combo_count - 1
-        total_score = base_score * (1 + combo_bonus * 0.5)
-        score += int(total_score)
-
-        # 增加技能能量
-        skill_energy = min(skill_max_energy, skill_energy + cleared * 5)
-
-        # 下落悬空的方块
-        drop_floating_blocks()
-
-
-def rotate_blocks():
-    """旋转方块组"""
-    if len(current_blocks) != 2:
-        return
 
-    # 获取旋转中心（第一个方块的位置）
-    center_x, center_y = current_blocks[0]["x"], current_blocks[0]["y"]
-
-    # 计算第二个方块相对于中心的位置
-    rel_x = current_blocks[1]["x"] - center_x
-    rel_y = current_blocks[1]["y"] - center_y
-
-    # 旋转90度（顺时针）
-    new_rel_x = -rel_y
-    new_rel_y = rel_x
-
-    # 计算旋转后的新位置
-    new_x = center_x + new_rel_x
-    new_y = center_y + new_rel_y
-
-    # 创建旋转后的方块组
-    new_blocks = [
-        {"color": current_blocks[0]["color"], "x": center_x, "y": center_y},
-        {"color": current_blocks[1]["color"], "x": new_x, "y": new_y}
-    ]
-
-    # 检查旋转后是否会碰撞
-    if not check_collision(new_blocks):
-        current_blocks[:] = new_blocks
-        # 播放旋转音效
-        if audio_available and "rotate" in sound_effects:
-            sound_effects["rotate"].play()
-
-
-def drop_floating_blocks():
-    """下落悬空的方块"""
-    for x in range(GAME_AREA_WIDTH):
-        for y in range(GAME_AREA_HEIGHT - 2, -1, -1):
-            if grid[y][x] is not None and grid[y + 1][x] is None and stone_grid[y + 1][x] is None:
-                # 找到最远可以下落的位置
-                new_y = y
-                while new_y + 1 < GAME_AREA_HEIGHT and grid[new_y + 1][x] is None and stone_grid[new_y + 1][x] is None:
-                    new_y += 1
-                # 移动方块
-                if new_y != y:
-                    grid[new_y][x] = grid[y][x]
-                    grid[y][x] = None
-
-    # 修复：同样处理石头方块的下落
-    for x in range(GAME_AREA_WIDTH):
-        for y in range(GAME_AREA_HEIGHT - 2, -1, -1):
-            if stone_grid[y][x] is not None and stone_grid[y + 1][x] is None and grid[y + 1][x] is None:
-                # 找到最远可以下落的位置
-                new_y = y
-                while new_y + 1 < GAME_AREA_HEIGHT and grid[new_y + 1][x] is None and stone_grid[new_y + 1][x] is None:
-                    new_y += 1
-                # 移动石头方块
-                if new_y != y:
-                    stone_grid[new_y][x] = stone_grid[y][x]
-                    stone_grid[y][x] = None
-
-
-def check_clear():
-    """检查并消除连接的相同颜色方块"""
-    # 创建访问标记数组
-    visited = [[False for _ in range(GAME_AREA_WIDTH)] for _ in range(GAME_AREA_HEIGHT)]
-    total_cleared = 0
-
-    # 遍历网格中的每个方块
-    for y in range(GAME_AREA_HEIGHT):
-        for x in range(GAME_AREA_WIDTH):
-            if grid[y][x] is not None and not visited[y][x]:
-                # 找到所有连接的相同颜色方块
-                color = grid[y][x]
-                connected = []
-                find_connected(x, y, color, visited, connected)
-
-                # 如果连接的方块数量达到4个或以上，消除它们
-                if len(connected) >= 4:
-                    for cx, cy in connected:
-                        grid[cy][cx] = None
-                        total_cleared += 1
-
-                    # 检查周围的石头，如果没有相邻的彩色方块，也消除它们
-                    clear_isolated_stones()
-
-    return total_cleared
-
-
-def move_blocks(dx):
-    """移动方块组"""
-    new_blocks = [{"color": block["color"], "x": block["x"] + dx, "y": block["y"]} for block in current_blocks]
-    if not check_collision(new_blocks):
-        current_blocks[:] = new_blocks
-
-
-def create_interference_blocks(count):
-    """创建干扰方块"""
-    global interference_queue
-    for _ in range(count):
-        interference_queue.append({"color": random.choice(["blue", "green", "purple", "yellow"])})
-
-
-def apply_interference_blocks():
-    """应用干扰方块"""
-    global interference_queue, opponent_grid
-    if not interference_queue:
+def draw_pause_menu():
+    """绘制暂停菜单（选项和提示不变时不重绘）"""
+    if not enter_scene(("paused", selected_pause_option, pause_message)):
         return
+    reset_game_screen()
+    draw_game_contents()
 
-    # 找到可以放置干扰方块的位置
-    for x in range(GAME_AREA_WIDTH):
-        if opponent_grid[0][x] is None and opponent_stone_grid[0][x] is None:
-            # 放置干扰方块
-            if interference_queue:
-                block = interference_queue.pop(0)
-                opponent_grid[0][x] = block["color"]
-
-
-def drop_blocks():
-    """加速方块组下落"""
-    while not check_collision([{"color": b["color"], "x": b["x"], "y": b["y"] + 1} for b in current_blocks]):
-        for block in current_blocks:
-            block["y"] += 1
-
+    overlay = get_panel(SCREEN_WIDTH, SCREEN_HEIGHT, (0, 0, 0, 150), None)  # 半透明黑色
+    screen.blit(overlay, (0, 0))
 
-def use_skill():
-    """使用角色技能"""
-    global skill_energy, skill_cooldown, current_blocks
+    pause_text = render_text("暂停", large_font, GOLD)
+    pause_rect = pause_text.get_rect(center=(SCREEN_WIDTH // 2, 200))
+    screen.blit(pause_text, pause_rect)
 
-    if skill_energy < skill_max_energy or skill_cooldown > 0:
-        return
+    option_y = 300
+    for i, option in enumerate(pause_options):
+        color = GOLD if i == selected_pause_option else WHITE
+        option_text = render_text(option, game_font, color)
+        option_rect = option_text.get_rect(center=(SCREEN_WIDTH // 2, option_y))
+        screen.blit(option_text, option_rect)
+        option_y += 70
 
-    # 重置技能能量和设置冷却
-    skill_energy = 0
-    skill_cooldown = characters[current_character]["cooldown"]
-
-    # 根据不同角色执行不同技能
-    if current_character == "雷电将军":
-        # 消除场上随机3个方块，并对对手施加2个干扰方块
-        clear_random_blocks(3)
-        create_interference_blocks(2)
-    elif current_character == "钟离":
-        # 将当前方块立即下落并消除下方一行方块
-        drop_blocks()
-        clear_bottom_row()
-    elif current_character == "甘雨":
-        # 冻结对手场地3秒（在实际游戏中需要更复杂的实现）
-        # 这里简化为增加自己的分数
-        global score
-        score += 50
-    elif current_character == "胡桃":
-        # 将场上所有同色方块变为当前方块颜色
-        if current_blocks:
-            target_color = current_blocks[0]["color"]
-            convert_all_to_color(target_color)
-
-
-def clear_random_blocks(count):
-    """消除场上随机的方块"""
-    # 收集所有非空方块的位置
-    non_empty = []
-    for y in range(GAME_AREA_HEIGHT):
-        for x in range(GAME_AREA_WIDTH):
-            if grid[y][x] is not None:
-                non_empty.append((x, y))
-
-    # 随机选择并消除
-    if non_empty:
-        to_clear = random.sample(non_empty, min(count, len(non_empty)))
-        for x, y in to_clear:
-            grid[y][x] = None
-
-
-def clear_bottom_row():
-    """消除最底部的一行方块"""
-    for x in range(GAME_AREA_WIDTH):
-        grid[GAME_AREA_HEIGHT - 1][x] = None
-
-
-def convert_all_to_color(target_color):
-    """将场上所有方块转换为目标颜色"""
-    for y in range(GAME_AREA_HEIGHT):
-        for x in range(GAME_AREA_WIDTH):
-            if grid[y][x] is not None and grid[y][x] != "stone":
-                grid[y][x] = target_color
-
-
-def check_game_over():
-    """检查游戏是否结束"""
-    # 检查是否有方块到达顶部
-    for x in range(GAME_AREA_WIDTH):
-        if grid[0][x] is not None:
-            return True
-
-    # 检查时间限制（可选）
-    # if time.time() - game_start_time > 180:  # 3分钟时间限制
-    #     return True
-
-    return False
+    if pause_message:
+        message_text = render_text(pause_message, small_font, WHITE)
+        message_rect = message_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 100))
+        screen.blit(message_text, message_rect)
 
 
 def handle_menu_input(event):
@@ -753,9 +654,12 @@ def handle_menu_input(event):
     elif event.key == pygame.K_RETURN:
         if selected_option == 0:  # 开始游戏
             start_game()
-        elif selected_option == 1:  # 角色选择
+        elif selected_option == 1:  # 读取存档
+            resume_saved_game()
+        elif selected_option == 2:  # 角色选择
             current_state = CHARACTER_SELECT
-        elif selected_option == 2:  # 退出
+        elif selected_option == 3:  # 退出
+            profiler.close()
             pygame.quit()
             sys.exit()
 
@@ -776,35 +680,57 @@ def handle_character_select_input(event):
 
 
 def handle_game_input(event):
-    """处理游戏输入"""
-    global current_speed_level, game_speed, current_blocks
-
+    """处理游戏输入（操作经 state.apply_input 执行，录像会记下每个操作）"""
     if event.key == pygame.K_LEFT or event.key == pygame.K_a:
-        move_blocks(-1)
+        state.apply_input(INPUT_LEFT)
     elif event.key == pygame.K_RIGHT or event.key == pygame.K_d:
-        move_blocks(1)
+        state.apply_input(INPUT_RIGHT)
     elif event.key == pygame.K_DOWN or event.key == pygame.K_s:
-        # 修复：确保current_blocks已初始化
-        if current_blocks:
-            # 加速下落
-            new_blocks = [{"color": block["color"], "x": block["x"], "y": block["y"] + 1} for block in current_blocks]
-            if not check_collision(new_blocks):
-                current_blocks = new_blocks
+        # 加速下落
+        state.apply_input(INPUT_SOFT_DROP)
     elif event.key == pygame.K_SPACE:
         # 立即下落
-        drop_blocks()
+        state.apply_input(INPUT_HARD_DROP)
     elif event.key == pygame.K_w:
-        rotate_blocks()
+        state.apply_input(INPUT_ROTATE)
+    elif event.key == pygame.K_e:
+        state.apply_input(INPUT_SKILL)
     elif event.key == pygame.K_PLUS or event.key == pygame.K_EQUALS:
         # 增加速度
-        current_speed_level = min(current_speed_level + 1, len(speed_levels))
-        game_speed = speed_levels[current_speed_level - 1]
+        state.apply_input(INPUT_SPEED_UP)
     elif event.key == pygame.K_MINUS:
         # 减少速度
-        current_speed_level = max(current_speed_level - 1, 1)
-        game_speed = speed_levels[current_speed_level - 1]
+        state.apply_input(INPUT_SPEED_DOWN)
     elif event.key == pygame.K_ESCAPE:
-        current_state = MENU
+        pause_game()
+
+
+def handle_pause_input(event):
+    """处理暂停菜单输入"""
+    global selected_pause_option, pause_message, current_state
+
+    if event.key == pygame.K_UP:
+        selected_pause_option = (selected_pause_option - 1) % len(pause_options)
+    elif event.key == pygame.K_DOWN:
+        selected_pause_option = (selected_pause_option + 1) % len(pause_options)
+    elif event.key == pygame.K_ESCAPE:
+        resume_game()
+    elif event.key == pygame.K_RETURN:
+        if selected_pause_option == 0:  # 继续游戏
+            resume_game()
+        elif selected_pause_option == 1:  # 保存游戏
+            try:
+                save_game(state, SAVE_FILE)
+                pause_message = "已保存"
+            except (OSError, ValueError) as e:
+                print(f"警告: 无法保存游戏: {e}")
+                pause_message = "保存失败"
+        elif selected_pause_option == 2:  # 读取存档
+            if not resume_saved_game():
+                pause_message = "没有可用的存档"
+        elif selected_pause_option == 3:  # 返回菜单
+            save_replay()
+            current_state = MENU
 
 
 def handle_game_over_input(event):
@@ -817,81 +743,121 @@ def handle_game_over_input(event):
 
 def start_game():
     """开始新游戏"""
-    global current_state, grid, stone_grid, opponent_grid, opponent_stone_grid
-    global current_blocks, score, opponent_score, game_time, game_start_time
-    global skill_energy, skill_cooldown, combo_count, combo_timer
+    global current_state, state
 
     # 重置游戏状态
     current_state = GAME
-    grid = [[None for _ in range(GAME_AREA_WIDTH)] for _ in range(GAME_AREA_HEIGHT)]
-    stone_grid = [[None for _ in range(GAME_AREA_WIDTH)] for _ in range(GAME_AREA_HEIGHT)]
-    opponent_grid = [[None for _ in range(GAME_AREA_WIDTH)] for _ in range(GAME_AREA_HEIGHT)]
-    opponent_stone_grid = [[None for _ in range(GAME_AREA_WIDTH)] for _ in range(GAME_AREA_HEIGHT)]
-
-    # 创建初始方块组
-    current_blocks = create_block_group()
-
-    # 重置分数和时间
-    score = 0
-    opponent_score = 0
-    game_time = 0
-    game_start_time = time.time()
-
-    # 重置技能相关
-    skill_energy = 0
-    skill_cooldown = 0
-    combo_count = 0
-    combo_timer = 0
-
-
-def update_opponent():
-    """更新对手状态（AI行为）"""
-    global opponent_score, opponent_grid, opponent_stone_grid
-
-    # 优化AI：降低得分概率和数值，使游戏更平衡
-    if random.random() < 0.01:  # 降低概率从5%到1%
-        opponent_score += random.randint(1, 5)  # 降低得分范围从1-10到1-5
-
-    # 修复：模拟对手方块下落和操作
-    # 随机生成对手方块
-    if random.random() < 0.05:  # 5%的概率生成新方块
-        colors = ["blue", "green", "purple", "yellow"]
-        x = random.randint(0, GAME_AREA_WIDTH - 1)
-        y = random.randint(0, GAME_AREA_HEIGHT // 2)  # 在上半部分生成
-
-        # 确保位置为空
-        if opponent_grid[y][x] is None and opponent_stone_grid[y][x] is None:
-            opponent_grid[y][x] = random.choice(colors)
-
-    # 模拟对手方块下落
-    for x in range(GAME_AREA_WIDTH):
-        for y in range(GAME_AREA_HEIGHT - 2, -1, -1):
-            if opponent_grid[y][x] is not None and opponent_grid[y + 1][x] is None and opponent_stone_grid[y + 1][
-                x] is None:
-                opponent_grid[y + 1][x] = opponent_grid[y][x]
-                opponent_grid[y][x] = None
-
-
-def main():
+    if state.opponent_planner is not None:
+        state.opponent_planner.close()
+    state = GameState(current_character, opponent_character)
+    state.attach_planner(BackgroundPlanner(state.difficulty))
+    state.attach_recorder(ReplayRecorder(state))
+    if profiler.enabled:
+        profiler.instrument(state)
+    sim_clock.reset(time.monotonic())
+    invalidate_screen()
+
+
+def pause_game():
+    """暂停对局，打开暂停菜单"""
+    global current_state, selected_pause_option, pause_message
+
+    current_state = PAUSED
+    selected_pause_option = 0
+    pause_message = ""
+
+
+def resume_game():
+    """关闭暂停菜单继续对局，暂停期间经过的时间不计入"""
+    global current_state
+
+    current_state = GAME
+    sim_clock.reset(time.monotonic())
+
+
+def resume_saved_game():
+    """读取存档并从存档时的那一步继续，返回是否成功
+
+    录像从种子开始记录，读档继续的对局不再录像；当前对局的录像照常保存。
+    """
+    global current_state, state, current_character, opponent_character
+
+    try:
+        loaded = load_game(SAVE_FILE)
+    except (OSError, ValueError, struct.error) as e:
+        print(f"警告: 无法读取存档: {e}")
+        return False
+    save_replay()
+    if state.opponent_planner is not None:
+        state.opponent_planner.close()
+    state = loaded
+    current_character = state.character
+    opponent_character = state.opponent_character
+    state.attach_planner(BackgroundPlanner(state.difficulty))
+    if profiler.enabled:
+        profiler.instrument(state)
+    current_state = GAME
+    sim_clock.reset(time.monotonic())
+    invalidate_screen()
+    return True
+
+
+def save_replay():
+    """把正在录制的对局保存到 REPLAY_DIR（对局结束或中途退出时调用）"""
+    recorder = state.recorder
+    if recorder is None:
+        return
+    state.recorder = None
+    os.makedirs(REPLAY_DIR, exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{state.seed:016x}{REPLAY_EXTENSION}"
+    try:
+        recorder.finish(state).save(os.path.join(REPLAY_DIR, name))
+    except OSError as e:
+        print(f"警告: 无法保存录像 {name}: {e}")
+
+
+def play_sound_events():
+    """播放引擎产生的音效事件"""
+    for name in state.events:
+        if audio_available and name in sound_effects:
+            sound_effects[name].play()
+    state.events.clear()
+
+
+def main(argv=None):
     """主游戏循环"""
-    global current_state, current_blocks, game_time, combo_count, combo_timer, skill_cooldown
+    global current_state
+
+    parser = argparse.ArgumentParser(description="原神八奇乱斗复刻版")
+    parser.add_argument("--profile", action="store_true", help="启动时显示性能剖析叠加层（游戏中按 F3 切换）")
+    parser.add_argument("--profile-log", metavar="FILE", help="把每帧各阶段的耗时写入 FILE（.csv 或 .jsonl）")
+    args = parser.parse_args(argv)
+    if args.profile_log:
+        profiler.open_log(args.profile_log)
+    if args.profile or args.profile_log:
+        toggle_profiler()
 
     # 初始化
     clock = pygame.time.Clock()
-    last_drop_time = time.time()
-    last_stone_time = time.time()
+    # 启动时加载的资源和模块对象不再参与垃圾回收扫描，对局中的回收只需检查新对象
+    gc.freeze()
 
     # 主循环
     running = True
     while running:
-        current_time = time.time()
+        profiler.begin_frame()
 
         # 处理事件
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type == pygame.VIDEOEXPOSE:
+                # 窗口重新显示后整屏重绘
+                invalidate_screen()
             elif event.type == pygame.KEYDOWN:
-                if current_state == MENU:
+                if event.key == PROFILE_KEY:
+                    toggle_profiler()
+                elif current_state == MENU:
                     handle_menu_input(event)
                 elif current_state == CHARACTER_SELECT:
                     handle_character_select_input(event)
@@ -899,61 +865,19 @@ def main():
                     handle_game_input(event)
                 elif current_state == GAME_OVER:
                     handle_game_over_input(event)
+                elif current_state == PAUSED:
+                    handle_pause_input(event)
+        profiler.mark("events")
 
-        # 更新游戏状态
+        # 按固定步长推进游戏状态。在处理完事件之后才读时钟：事件中开始、读档或
+        # 继续对局时会重置时钟，菜单中经过的时间不能算到新的对局上
+        ticks = sim_clock.advance(time.monotonic())
         if current_state == GAME:
-            # 更新游戏时间
-            game_time = current_time - game_start_time
-
-            # 更新连击计时
-            if combo_count > 0 and current_time - combo_timer > COMBO_TIME:
-                combo_count = 0
-
-            # 更新技能冷却
-            if skill_cooldown > 0:
-                skill_cooldown = max(0, skill_cooldown - (current_time - last_drop_time))
-
-            # 更新对手
-            update_opponent()
-
-            # 生成石头
-            if current_time - last_stone_time > 5:  # 每5秒生成一个石头
-                stones = create_stones(1)
-                for stone in stones:
-                    if not check_collision([stone]):
-                        stone_grid[stone["y"]][stone["x"]] = "stone"
-                last_stone_time = current_time
-
-            # 应用干扰方块
-            apply_interference_blocks()
-
-            # 方块下落
-            if current_time - last_drop_time > 1.0 / game_speed:
-                # 确保current_blocks已初始化
-                if current_blocks:
-                    new_blocks = [{"color": block["color"], "x": block["x"], "y": block["y"] + 1} for block in
-                                  current_blocks]
-                    if check_collision(new_blocks):
-                        place_blocks(current_blocks)
-                        current_blocks = create_block_group()
-                        # 修改：只有当新方块完全进入游戏区域后才检查碰撞
-                        all_blocks_visible = all(block["y"] >= 0 for block in current_blocks)
-                        if all_blocks_visible and check_collision(current_blocks):
-                            current_state = GAME_OVER
-                    else:
-                        current_blocks = new_blocks
-                else:
-                    # 如果current_blocks为空，创建新的方块组
-                    current_blocks = create_block_group()
-
-                last_drop_time = current_time
-
-                # 修复：处理石头方块的下落
-                drop_floating_blocks()
-
-            # 检查游戏是否结束
-            if check_game_over():
+            if state.advance(ticks):
+                save_replay()
                 current_state = GAME_OVER
+            play_sound_events()
+        profiler.mark("tick")
 
         # 绘制界面
         if current_state == MENU:
@@ -963,14 +887,24 @@ def main():
         elif current_state == GAME:
             draw_game()
         elif current_state == GAME_OVER:
-            draw_game()
             draw_game_over()
+        elif current_state == PAUSED:
+            draw_pause_menu()
+        if profiler.enabled:
+            draw_profiler_overlay()
+        profiler.mark("draw")
 
-        # 更新屏幕
-        pygame.display.flip()
+        # 只刷新有变化的区域
+        present()
+        profiler.mark("flip")
+        profiler.end_frame()
 
         # 控制帧率
-        clock.tick(60)
+        clock.tick(RENDER_FPS)
+
+    # 关闭窗口时保存进行中的对局
+    save_replay()
+    profiler.close()
 
 
 if __name__ == "__main__":
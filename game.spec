@@ -1,11 +1,19 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
+import shutil
+import sys
 
+sys.path.insert(0, SPECPATH)
+from build_assets import build_pack
+
+# 把图片、字体和音频打包成一个资源包
+build_pack(SPECPATH)
 
 a = Analysis(
     ['game.py'],
     pathex=[],
     binaries=[],
-    datas=[('images/*', 'images'), ('sounds/*', 'sounds')],
+    datas=[],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
@@ -36,3 +44,6 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
+
+# 资源包不放进可执行文件，而是放在它旁边，运行时直接映射，启动时不需要解压
+shutil.copyfile(os.path.join(SPECPATH, 'assets.pak'), os.path.join(DISTPATH, 'assets.pak'))
@@ -0,0 +1,134 @@
+"""
+同色连通块追踪
+
+用并查集维护棋盘上每个同色连通块及其大小。方块放入时只和四个邻格合并；
+方块被移除或移动时，只拆开受影响的连通块并把其中仍在场上的方块重新合并。
+达到消除阈值的连通块记录在 full 集合里，判断是否需要消除是 O(1) 的，
+每次放置的开销与棋盘大小无关，也不再依赖递归。
+"""
+
+
+class GroupTracker:
+    """基于并查集的同色连通块追踪器
+
+    cells 是棋盘按 y * width + x 编号的颜色编号序列（0 表示空），追踪器只读取它；
+    所有对 cells 的修改都必须配合 detach/attach 调用（见 ListBoard），否则连通块
+    信息会过期。neighbours[i] 是第 i 格的邻格序号列表。
+    """
+
+    def __init__(self, cells, width, neighbours, threshold):
+        self.cells = cells
+        self.width = width
+        self.threshold = threshold
+        count = len(neighbours)
+        self.neighbours = neighbours
+        self.parent = list(range(count))
+        self.size = [1] * count
+        # 只为多于一个方块的连通块保存成员列表，键为根
+        self.members = {}
+        # 大小达到阈值的连通块的根
+        self.full = set()
+
+    def copy(self, cells):
+        """复制追踪器，新副本读取 cells"""
+        tracker = GroupTracker.__new__(GroupTracker)
+        tracker.cells = cells
+        tracker.width = self.width
+        tracker.threshold = self.threshold
+        tracker.neighbours = self.neighbours
+        tracker.parent = self.parent[:]
+        tracker.size = self.size[:]
+        tracker.members = {root: group[:] for root, group in self.members.items()}
+        tracker.full = set(self.full)
+        return tracker
+
+    def find(self, index):
+        """查找根（路径减半，非递归）"""
+        parent = self.parent
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    def union(self, a, b):
+        """合并两个格子所在的连通块（按大小合并）"""
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return
+        size = self.size
+        if size[ra] < size[rb]:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        size[ra] += size[rb]
+        members = self.members
+        group = members.get(ra)
+        if group is None:
+            group = members[ra] = [ra]
+        group.extend(members.pop(rb, None) or (rb,))
+        self.full.discard(rb)
+        if size[ra] >= self.threshold:
+            self.full.add(ra)
+
+    def group_of(self, index):
+        """返回格子所在连通块的全部格子序号"""
+        root = self.find(index)
+        return self.members.get(root) or [root]
+
+    def group_size(self, index):
+        """返回格子所在连通块的大小"""
+        return self.size[self.find(index)]
+
+    def detach(self, indices):
+        """拆开 indices 所在的连通块，每个成员恢复为单独一格
+
+        返回被拆开的全部格子，调用方修改 cells 后应把其中仍有方块的格子
+        连同新放入的格子一起传给 attach。
+        """
+        parent = self.parent
+        size = self.size
+        affected = []
+        seen = set()
+        for index in indices:
+            if index in seen:
+                continue
+            root = self.find(index)
+            group = self.members.pop(root, None) or [root]
+            self.full.discard(root)
+            for member in group:
+                parent[member] = member
+                size[member] = 1
+            seen.update(group)
+            affected.extend(group)
+        return affected
+
+    def attach(self, indices):
+        """把 indices 中有方块的格子与同色邻格合并"""
+        cells = self.cells
+        neighbours = self.neighbours
+        for index in indices:
+            color = cells[index]
+            if not color:
+                continue
+            for other in neighbours[index]:
+                if cells[other] == color:
+                    self.union(index, other)
+
+    def pop_full_groups(self):
+        """取出所有达到阈值的连通块并将其拆开，返回各块的格子序号列表"""
+        groups = []
+        for root in self.full:
+            if self.parent[root] == root and self.size[root] >= self.threshold:
+                groups.append(self.members[root])
+        self.full.clear()
+        for group in groups:
+            self.detach(group[:1])
+        return groups
+
+    def rebuild(self):
+        """按当前 cells 从头重建全部连通块"""
+        count = len(self.neighbours)
+        self.parent = list(range(count))
+        self.size = [1] * count
+        self.members = {}
+        self.full = set()
+        self.attach(range(count))
@@ -0,0 +1,118 @@
+"""
+方块组的摆放与落点
+
+方块组由两个方块组成，第二个方块相对第一个方块的位置决定旋转方向。
+方块组用 Piece 表示：只保存第一个方块的位置、旋转方向和两个颜色编号
+（见 board.COLOR_IDS），移动、旋转和下落都直接修改这几个字段，不再为每次
+操作重新创建方块列表。
+这里的函数只读取棋盘，计算方块组能放到哪里、落下后停在哪里，
+玩家的操作（GameState）、幽灵方块预览和对手 AI 都使用它们。
+"""
+from board import GAME_AREA_WIDTH, GAME_AREA_HEIGHT
+
+# 旋转方向 -> 第二个方块相对第一个方块的位置（与 GameState.rotate_blocks 的顺时针顺序一致）
+ROTATION_OFFSETS = ((0, 1), (-1, 0), (0, -1), (1, 0))
+
+
+class Piece:
+    """一组方块：第一个方块在 (x, y)，第二个方块按 rotation 方向摆放，color1/color2 为颜色编号"""
+
+    __slots__ = ("x", "y", "rotation", "color1", "color2")
+
+    def __init__(self, x, y, rotation, color1, color2):
+        self.x = x
+        self.y = y
+        self.rotation = rotation
+        self.color1 = color1
+        self.color2 = color2
+
+    def cells(self):
+        """两个方块的位置 ((x1, y1), (x2, y2))"""
+        dx, dy = ROTATION_OFFSETS[self.rotation]
+        return (self.x, self.y), (self.x + dx, self.y + dy)
+
+    def blocks(self):
+        """两个方块的位置和颜色编号 ((x1, y1, color1), (x2, y2, color2))"""
+        dx, dy = ROTATION_OFFSETS[self.rotation]
+        return (self.x, self.y, self.color1), (self.x + dx, self.y + dy, self.color2)
+
+    def key(self):
+        """可比较、可哈希的状态元组"""
+        return self.x, self.y, self.rotation, self.color1, self.color2
+
+    def copy(self, y=None):
+        """复制方块组，y 不为 None 时放到第 y 行"""
+        return Piece(self.x, self.y if y is None else y, self.rotation, self.color1, self.color2)
+
+
+def piece_fits(board, x, y, rotation):
+    """第一个方块在 (x, y)、按 rotation 方向摆放的方块组是否不与边界和现有方块碰撞"""
+    dx, dy = ROTATION_OFFSETS[rotation]
+    return not board.blocked(x, y) and not board.blocked(x + dx, y + dy)
+
+
+def landing_piece(board, piece):
+    """方块组硬降后停下的位置（新的方块组）"""
+    return piece.copy(piece.y + board.drop_distance(piece.cells()))
+
+
+def drop_pair(board, colors, x, rotation):
+    """颜色编号为 colors 的方块组从顶部按 (x, rotation) 落下后的位置，放不进去时返回 None"""
+    if not piece_fits(board, x, -1, rotation):
+        return None
+    piece = Piece(x, -1, rotation, colors[0], colors[1])
+    piece.y += board.drop_distance(piece.cells())
+    return piece
+
+
+def placements(board, colors):
+    """枚举方块组从顶部能放入的全部落点，依次返回 ((x, rotation), 落下后的方块组)"""
+    for rotation in range(len(ROTATION_OFFSETS)):
+        for x in range(GAME_AREA_WIDTH):
+            piece = drop_pair(board, colors, x, rotation)
+            if piece is not None:
+                yield (x, rotation), piece
+
+
+def reachable_placements(board, piece):
+    """方块组从当前位置只靠左右移动和旋转能到达的全部落点
+
+    返回 {(x, rotation): 落下后的方块组}。各列的列顶只读取一次：方块组在列顶之上时
+    必然不会碰撞、落下的距离也由列顶直接算出，只有方块组卡在悬空方块下面的空隙里时
+    才退回逐格检查。
+    """
+    tops = board.tops()
+    y = piece.y
+
+    def fits(x, rotation):
+        dx, dy = ROTATION_OFFSETS[rotation]
+        for bx, by in ((x, y), (x + dx, y + dy)):
+            if bx < 0 or bx >= GAME_AREA_WIDTH or by >= GAME_AREA_HEIGHT:
+                return False
+            if by >= tops[bx]:
+                return piece_fits(board, x, y, rotation)
+        return True
+
+    def landing(x, rotation):
+        candidate = Piece(x, y, rotation, piece.color1, piece.color2)
+        distance = GAME_AREA_HEIGHT
+        for bx, by in candidate.cells():
+            if by >= tops[bx]:
+                return landing_piece(board, candidate)
+            distance = min(distance, tops[bx] - 1 - by)
+        candidate.y += distance
+        return candidate
+
+    start = (piece.x, piece.rotation)
+    result = {}
+    pending = [start]
+    seen = {start}
+    while pending:
+        x, rotation = pending.pop()
+        result[(x, rotation)] = landing(x, rotation)
+        for state in ((x - 1, rotation), (x + 1, rotation), (x, (rotation + 1) % len(ROTATION_OFFSETS))):
+            if state not in seen:
+                seen.add(state)
+                if fits(*state):
+                    pending.append(state)
+    return result
@@ -0,0 +1,86 @@
+"""
+后台规划对手落点
+
+对手 AI 的搜索放在一个后台线程里进行：每当对手落下一组方块，主循环把
+对手棋盘的快照和接下来的方块组交给后台线程，后台在下一次落子之前算好
+整条落点序列。到了落子的时候主循环只取用已经完成的结果；后台还没算完时，
+沿用上一份计划里为这组方块准备的下一步，不等待。后台搜索出错时
+只报告一次，没有计划的这一步由 GameState 在主循环中同步选择。
+
+后台只有一个线程。过时的搜索（来不及取用、被新的提交取代或规划器关闭）
+通过取消标志在展开下一个落点之前停止，不会占住线程让下一次提交排队。
+
+使用线程而不是进程：游戏主模块在导入时就会创建窗口，子进程重新导入它会
+多开一个窗口。搜索每步只占几毫秒，线程切换（sys.getswitchinterval）
+保证主循环不会被它长时间阻塞。
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ai import DEFAULT_DIFFICULTY, OpponentAI, to_bitboard
+
+# 规划的截止时间占落子间隔的比例，留出余量给主循环取结果
+DEADLINE_FRACTION = 0.8
+
+
+class BackgroundPlanner:
+    """在后台线程中为对手规划落点（供 GameState.attach_planner 使用）"""
+
+    def __init__(self, difficulty=DEFAULT_DIFFICULTY):
+        # 后台线程使用自己的 AI 实例，置换表只在该线程中访问。
+        # 后台有整个落子间隔可用，只受 submit 给出的截止时间限制
+        self.ai = OpponentAI(difficulty, time_budget=0)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="opponent-ai")
+        self.pending = None
+        # 当前搜索的取消标志
+        self.stop = None
+        # 最近一次完成的计划中还没有用到的落点
+        self.plan = []
+        # 统计：按时完成、超时和出错的次数
+        self.on_time = 0
+        self.late = 0
+        self.failed = 0
+
+    def submit(self, board, pairs, seconds):
+        """提交对手棋盘快照和接下来的方块组，要求在 seconds 秒内给出计划"""
+        deadline = time.perf_counter() + seconds * DEADLINE_FRACTION
+        self.cancel()
+        self.stop = threading.Event()
+        self.pending = self.executor.submit(self.ai.plan, to_bitboard(board), list(pairs), deadline, self.stop.is_set)
+
+    def cancel(self):
+        """放弃正在进行或排队中的搜索：还没开始的不再开始，已经开始的尽快停止"""
+        if self.pending is not None:
+            self.stop.set()
+            self.pending.cancel()
+            self.pending = None
+
+    def next_move(self):
+        """取出当前方块组的落点，没有可用的计划时返回 None（不等待后台）"""
+        pending = self.pending
+        if pending is not None:
+            if pending.done():
+                self.pending = None
+                try:
+                    self.plan = pending.result()
+                except Exception as e:
+                    # 后台搜索出错不能让游戏崩溃：只报告第一次，这组方块交给调用方同步选择
+                    self.failed += 1
+                    if self.failed == 1:
+                        print(f"警告: 对手 AI 后台搜索出错: {e!r}")
+                    self.plan = []
+                else:
+                    self.on_time += 1
+            else:
+                # 后台来不及，停止这次搜索并丢弃结果，沿用上一份计划
+                self.late += 1
+                self.cancel()
+        if self.plan:
+            return self.plan.pop(0)
+        return None
+
+    def close(self):
+        """停止后台线程（正在进行的搜索会尽快停止）"""
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,163 @@
+"""
+逐帧性能剖析
+
+FrameProfiler 记录主循环每一帧各阶段的耗时：事件处理、对手落子、生成石头、
+放置与消除、下落悬空方块、绘制和刷新到显示器，保留最近 HISTORY_FRAMES 帧，
+给出每个阶段的 p50 / p95 / p99，并可以把每一帧写入 CSV 或 JSONL 文件，
+用来定位玩家在旧机器上遇到的卡顿出在哪个阶段。
+
+主循环中的阶段用 mark() 分隔，"total" 是一帧的总耗时（不含等待下一帧的时间）。
+引擎内部的阶段由 instrument() 在 GameState 实例上包一层计时（不修改类），
+取消剖析时 uninstrument() 恢复原样，不剖析时引擎没有额外开销。
+引擎阶段发生在 "tick"（state.advance）之内，玩家操作触发的放置和下落也会计入 "events"。
+"""
+import csv
+import json
+import time
+from collections import deque
+
+# 主循环中依次经过的阶段
+LOOP_PHASES = ("events", "tick", "draw", "flip")
+
+# 引擎中单独计时的阶段：阶段名 -> GameState 方法名
+ENGINE_PHASES = {
+    "update_opponent": "update_opponent",
+    "spawn_stones": "spawn_stones",
+    "place_blocks": "place_blocks",
+    "drop_floating_blocks": "drop_floating_blocks",
+}
+
+PHASES = ("total",) + LOOP_PHASES + tuple(ENGINE_PHASES)
+
+# 保留的帧数（约 4 秒）和统计的百分位
+HISTORY_FRAMES = 240
+PERCENTILES = (50, 95, 99)
+
+# 每隔多少帧重新计算一次百分位
+STATS_INTERVAL = 30
+
+
+def percentile(values, p):
+    """已排序的 values 的第 p 百分位（最近秩法）"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+class FrameProfiler:
+    """记录每帧各阶段的耗时（秒）
+
+    每帧先调用 begin_frame()，主循环的每个阶段结束时调用 mark(阶段名)，
+    最后调用 end_frame()。log_path 以 .csv 或 .jsonl 结尾时把每帧写入该文件。
+    """
+
+    def __init__(self, log_path=None, clock=time.perf_counter):
+        self.clock = clock
+        self.enabled = False
+        self.history = {phase: deque(maxlen=HISTORY_FRAMES) for phase in PHASES}
+        self.current = dict.fromkeys(PHASES, 0.0)
+        self.stats = {}
+        self.frames = 0
+        self.frame_start = self.last_mark = 0.0
+        self.log_file = None
+        self.log_writer = None
+        if log_path is not None:
+            self.open_log(log_path)
+
+    # ------------------------------------------------------------------
+    # 记录
+    # ------------------------------------------------------------------
+
+    def begin_frame(self):
+        """开始新的一帧"""
+        current = self.current
+        for phase in current:
+            current[phase] = 0.0
+        self.frame_start = self.last_mark = self.clock()
+
+    def mark(self, phase):
+        """主循环的阶段 phase 到此结束"""
+        now = self.clock()
+        self.current[phase] += now - self.last_mark
+        self.last_mark = now
+
+    def end_frame(self):
+        """结束本帧：保存各阶段耗时，按需更新百分位并写入日志"""
+        current = self.current
+        current["total"] = self.clock() - self.frame_start
+        for phase, seconds in current.items():
+            self.history[phase].append(seconds)
+        self.frames += 1
+        if self.frames % STATS_INTERVAL == 0 or not self.stats:
+            self.update_stats()
+        if self.log_writer is not None:
+            self.log_writer(self.frames, current)
+
+    def update_stats(self):
+        """重新计算各阶段在最近 HISTORY_FRAMES 帧中的百分位 {阶段: (p50, p95, p99)}"""
+        self.stats = {}
+        for phase, samples in self.history.items():
+            values = sorted(samples)
+            self.stats[phase] = tuple(percentile(values, p) for p in PERCENTILES)
+
+    # ------------------------------------------------------------------
+    # 引擎阶段
+    # ------------------------------------------------------------------
+
+    def timed(self, phase, method):
+        """计时包装：调用 method 并把耗时计入阶段 phase"""
+        clock = self.clock
+        current = self.current
+
+        def wrapper(*args):
+            start = clock()
+            try:
+                return method(*args)
+            finally:
+                current[phase] += clock() - start
+        return wrapper
+
+    def instrument(self, state):
+        """在 state 实例上为引擎阶段加上计时（对手落子经由定时器表调用，一并替换）"""
+        for phase, name in ENGINE_PHASES.items():
+            setattr(state, name, self.timed(phase, getattr(state, name)))
+        handlers = dict(type(state).timer_handlers)
+        handlers["opponent"] = lambda self: self.update_opponent()
+        state.timer_handlers = handlers
+
+    @staticmethod
+    def uninstrument(state):
+        """去掉 instrument() 加上的计时"""
+        for name in list(ENGINE_PHASES.values()) + ["timer_handlers"]:
+            state.__dict__.pop(name, None)
+
+    # ------------------------------------------------------------------
+    # 日志
+    # ------------------------------------------------------------------
+
+    def open_log(self, path):
+        """把之后每一帧的耗时（毫秒）写入 path（.csv 或 .jsonl）"""
+        if path.endswith(".csv"):
+            self.log_file = open(path, "w", newline="", encoding="utf-8")
+            writer = csv.writer(self.log_file)
+            writer.writerow(("frame", "time") + PHASES)
+
+            def write(frame, current):
+                writer.writerow([frame, f"{time.time():.3f}"] + [f"{current[phase] * 1000:.3f}" for phase in PHASES])
+        elif path.endswith(".jsonl"):
+            self.log_file = open(path, "w", encoding="utf-8")
+
+            def write(frame, current):
+                record = {"frame": frame, "time": round(time.time(), 3)}
+                record.update((phase, round(current[phase] * 1000, 3)) for phase in PHASES)
+                self.log_file.write(json.dumps(record) + "\n")
+        else:
+            raise ValueError(f"剖析日志须为 .csv 或 .jsonl 文件: {path}")
+        self.log_writer = write
+
+    def close(self):
+        """关闭日志文件"""
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
+            self.log_writer = None
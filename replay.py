@@ -0,0 +1,368 @@
+"""
+对局录像
+
+录像只保存重新模拟一局所需的最少信息：种子和对局设置、玩家的每个操作
+（发生的步数和 engine.INPUT_* 编号）、对手每次的落点（界面中对手在后台线程
+按截止时间规划，落点取决于机器快慢，因此直接记下），以及最后的结果。
+此外每隔 keyframe_interval 步保存一个关键帧（snapshot 编码的完整状态），
+跳到任意一步时从最近的关键帧恢复，最多只需模拟一个间隔。
+
+文件格式：固定长度的文件头（魔数、版本、种子、角色、对手角色、难度、棋盘实现、
+关键帧间隔），之后是 zlib 压缩的正文，正文中的整数都用变长编码：
+操作序列（与上一个操作相差的步数左移三位再加上操作编号）、对手落点（每个一字节）、
+关键帧（步数、此前的操作数、此前的对手落点数、快照）、结果（步数、双方得分、胜者）。
+
+命令行:
+
+用法: python replay.py verify [录像文件或目录 ...]
+      python replay.py info 录像文件
+      python replay.py seek 录像文件 步数
+"""
+import argparse
+import bisect
+import os
+import struct
+import sys
+import time
+import zlib
+
+from board import BOARD_BACKENDS
+from engine import TICK_RATE, GameState, character_options
+from snapshot import DIFFICULTIES, WINNERS, encode_state, restore_state
+
+MAGIC = b"BQRP"
+VERSION = 3
+
+# 魔数、版本、种子、角色、对手角色、难度、棋盘实现、关键帧间隔
+HEADER = struct.Struct("<4sBQBBBBH")
+
+# 默认关键帧间隔（步）
+KEYFRAME_INTERVAL = 10 * TICK_RATE
+
+# 录像保存目录和扩展名
+REPLAY_DIR = "replays"
+REPLAY_EXTENSION = ".rpl"
+
+# 对手没有落点（放不下）时的编码
+NO_MOVE = 255
+
+
+def write_varint(out, value):
+    """把非负整数按每字节 7 位追加到 bytearray out"""
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, offset):
+    """从 offset 读取一个变长整数，返回 (值, 新的 offset)"""
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+class Replay:
+    """一局的录像
+
+    inputs 为 [(步数, 操作编号), ...]，opponent_moves 为对手依次的落点 (x, rotation)
+    或 None，keyframes 为 [(步数, 此前的操作数, 此前的落点数, 快照), ...]，
+    result 为 (步数, 得分, 对手得分, 胜者)，录制中为 None。
+    """
+
+    def __init__(self, seed, character, opponent_character, difficulty, backend,
+                 keyframe_interval=KEYFRAME_INTERVAL):
+        self.seed = seed
+        self.character = character
+        self.opponent_character = opponent_character
+        self.difficulty = difficulty
+        self.backend = backend
+        self.keyframe_interval = keyframe_interval
+        self.inputs = []
+        self.opponent_moves = []
+        self.keyframes = []
+        self.result = None
+
+    def new_state(self):
+        """与录像设置相同、尚未开始的对局"""
+        return GameState(self.character, self.opponent_character, backend=self.backend,
+                         difficulty=self.difficulty, seed=self.seed)
+
+    def player(self, tick=0):
+        """从第 tick 步开始回放的 ReplayPlayer"""
+        player = ReplayPlayer(self)
+        player.seek(tick)
+        return player
+
+    # ------------------------------------------------------------------
+    # 编码
+    # ------------------------------------------------------------------
+
+    def to_bytes(self):
+        """录像文件的内容"""
+        header = HEADER.pack(MAGIC, VERSION, self.seed, character_options.index(self.character),
+                             character_options.index(self.opponent_character),
+                             DIFFICULTIES.index(self.difficulty), BOARD_BACKENDS.index(self.backend),
+                             self.keyframe_interval)
+        body = bytearray()
+        write_varint(body, len(self.inputs))
+        previous = 0
+        for tick, code in self.inputs:
+            write_varint(body, (tick - previous) << 3 | code)
+            previous = tick
+        write_varint(body, len(self.opponent_moves))
+        body.extend(NO_MOVE if move is None else move[0] * 4 + move[1] for move in self.opponent_moves)
+        write_varint(body, len(self.keyframes))
+        for tick, input_index, move_index, snapshot in self.keyframes:
+            for value in (tick, input_index, move_index, len(snapshot)):
+                write_varint(body, value)
+            body.extend(snapshot)
+        ticks, score, opponent_score, winner = self.result or (0, 0, 0, None)
+        for value in (ticks, score, opponent_score, WINNERS.index(winner)):
+            write_varint(body, value)
+        return header + zlib.compress(bytes(body), 9)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """从录像文件的内容解码，数据截断或损坏时报 ValueError"""
+        try:
+            return cls._decode(data)
+        except (struct.error, zlib.error, IndexError) as e:
+            raise ValueError("录像文件已损坏") from e
+
+    @classmethod
+    def _decode(cls, data):
+        """from_bytes 的实现，数据截断时可能报 struct.error、zlib.error 或 IndexError"""
+        magic, version, seed, character, opponent, difficulty, backend, interval = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("不是可识别的录像文件")
+        replay = cls(seed, character_options[character], character_options[opponent], DIFFICULTIES[difficulty],
+                     BOARD_BACKENDS[backend], interval)
+        body = zlib.decompress(data[HEADER.size:])
+        count, offset = read_varint(body, 0)
+        tick = 0
+        for _ in range(count):
+            value, offset = read_varint(body, offset)
+            tick += value >> 3
+            replay.inputs.append((tick, value & 7))
+        count, offset = read_varint(body, offset)
+        replay.opponent_moves = [None if byte == NO_MOVE else divmod(byte, 4) for byte in body[offset:offset + count]]
+        offset += count
+        count, offset = read_varint(body, offset)
+        for _ in range(count):
+            tick, offset = read_varint(body, offset)
+            input_index, offset = read_varint(body, offset)
+            move_index, offset = read_varint(body, offset)
+            size, offset = read_varint(body, offset)
+            replay.keyframes.append((tick, input_index, move_index, body[offset:offset + size]))
+            offset += size
+        result = []
+        for _ in range(4):
+            value, offset = read_varint(body, offset)
+            result.append(value)
+        if offset != len(body):
+            raise ValueError("录像文件已损坏")
+        result[3] = WINNERS[result[3]]
+        replay.result = tuple(result)
+        return replay
+
+    def save(self, path):
+        """写入录像文件"""
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        """读取录像文件"""
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+class ReplayRecorder:
+    """记录一局的录像（GameState.attach_recorder 的参数），须在对局开始前接上"""
+
+    def __init__(self, state, keyframe_interval=KEYFRAME_INTERVAL):
+        self.replay = Replay(state.seed, state.character, state.opponent_character, state.difficulty,
+                             state.backend, keyframe_interval)
+
+    def record_input(self, tick, code):
+        """玩家在第 tick 步之后执行了操作 code"""
+        self.replay.inputs.append((tick, code))
+
+    def record_opponent(self, move):
+        """对手落下一组方块，move 为 (x, rotation) 或 None"""
+        self.replay.opponent_moves.append(move)
+
+    def tick_done(self, state):
+        """state 推进完一步，到了关键帧间隔时保存关键帧"""
+        replay = self.replay
+        if state.tick % replay.keyframe_interval == 0 and not state.game_over:
+            replay.keyframes.append((state.tick, len(replay.inputs), len(replay.opponent_moves), encode_state(state)))
+
+    def finish(self, state):
+        """记下结果（对局结束或中途退出时调用），返回录像"""
+        replay = self.replay
+        replay.result = (state.tick, state.score, state.opponent_score, state.winner)
+        return replay
+
+
+class ReplayPlanner:
+    """按录像依次给出对手落点（与 planner.BackgroundPlanner 的接口相同）"""
+
+    def __init__(self, moves, index=0):
+        self.moves = moves
+        self.index = index
+
+    def submit(self, board, pairs, seconds):
+        """落点已经录好，不需要规划"""
+
+    def next_move(self):
+        move = self.moves[self.index]
+        self.index += 1
+        return move
+
+    def close(self):
+        """没有需要停止的后台任务"""
+
+
+class ReplayPlayer:
+    """按录像推进对局：每一步先执行录像中这一步的玩家操作，再推进状态"""
+
+    def __init__(self, replay):
+        self.replay = replay
+        self.keyframe_ticks = [keyframe[0] for keyframe in replay.keyframes]
+        self.state = replay.new_state()
+        self.input_index = 0
+        self.planner = ReplayPlanner(replay.opponent_moves)
+        self.state.attach_planner(self.planner)
+
+    @property
+    def finished(self):
+        """是否已经回放到录像的最后一步"""
+        return self.state.game_over or self.state.tick >= self.replay.result[0]
+
+    def step(self):
+        """回放一步，返回是否已经结束"""
+        state = self.state
+        inputs = self.replay.inputs
+        tick = state.tick
+        while self.input_index < len(inputs) and inputs[self.input_index][0] == tick:
+            state.apply_input(inputs[self.input_index][1])
+            self.input_index += 1
+        state.step()
+        return self.finished
+
+    def advance_to(self, tick):
+        """回放到第 tick 步（或录像结束），两次操作之间没有定时器到期的步直接跳过"""
+        state = self.state
+        inputs = self.replay.inputs
+        end = min(tick, self.replay.result[0])
+        while state.tick < end and not state.game_over:
+            self.step()
+            stop = inputs[self.input_index][0] if self.input_index < len(inputs) else end
+            state.skip_idle(min(stop, end))
+        return state
+
+    def seek(self, tick):
+        """跳到第 tick 步：向后跳或跨过关键帧时先从最近的关键帧恢复，再推进到 tick"""
+        index = bisect.bisect_right(self.keyframe_ticks, tick) - 1
+        if index >= 0 and (tick < self.state.tick or self.keyframe_ticks[index] > self.state.tick):
+            keyframe_tick, input_index, move_index, snapshot = self.replay.keyframes[index]
+            restore_state(self.state, snapshot)
+            self.input_index = input_index
+            self.planner.index = move_index
+        elif tick < self.state.tick:
+            self.state.reset(self.replay.seed)
+            self.input_index = 0
+            self.planner.index = 0
+        return self.advance_to(tick)
+
+
+def verify(replay):
+    """从头重新模拟录像，逐个核对关键帧和最终结果，一致时返回 None，否则返回说明"""
+    player = ReplayPlayer(replay)
+    state = player.state
+    try:
+        for tick, _, _, snapshot in replay.keyframes:
+            player.advance_to(tick)
+            if state.tick != tick or encode_state(state) != snapshot:
+                return f"第 {tick} 步的关键帧不一致"
+        player.advance_to(replay.result[0])
+    except IndexError:
+        return f"第 {state.tick} 步对手落点不足"
+    except (ValueError, struct.error, zlib.error) as e:
+        return f"第 {state.tick} 步无法重新模拟: {e}"
+    result = (state.tick, state.score, state.opponent_score, state.winner)
+    if result != replay.result:
+        return f"结果不一致: 录像 {replay.result}，重新模拟 {result}"
+    return None
+
+
+def replay_files(paths):
+    """展开参数中的文件和目录，返回全部录像文件"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                if name.endswith(REPLAY_EXTENSION)))
+        else:
+            files.append(path)
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对局录像")
+    commands = parser.add_subparsers(dest="command", required=True)
+    verify_parser = commands.add_parser("verify", help="重新模拟录像并核对结果")
+    verify_parser.add_argument("paths", nargs="*", default=[REPLAY_DIR], help="录像文件或目录")
+    info_parser = commands.add_parser("info", help="显示录像信息")
+    info_parser.add_argument("path")
+    seek_parser = commands.add_parser("seek", help="跳到录像中的某一步")
+    seek_parser.add_argument("path")
+    seek_parser.add_argument("tick", type=int)
+    args = parser.parse_args()
+
+    if args.command == "info":
+        replay = Replay.load(args.path)
+        ticks, score, opponent_score, winner = replay.result
+        print(f"{replay.character} vs {replay.opponent_character}  难度 {replay.difficulty}  种子 {replay.seed}")
+        print(f"{ticks / TICK_RATE:.1f} 秒, {len(replay.inputs)} 个操作, {len(replay.opponent_moves)} 次对手落子, "
+              f"{len(replay.keyframes)} 个关键帧, {os.path.getsize(args.path)} 字节")
+        print(f"得分 {score} : {opponent_score}, 胜者 {winner or '未结束'}")
+    elif args.command == "seek":
+        replay = Replay.load(args.path)
+        start = time.perf_counter()
+        state = replay.player(args.tick).state
+        elapsed = time.perf_counter() - start
+        print(f"第 {state.tick} 步: 得分 {state.score} : {state.opponent_score}（用时 {elapsed * 1000:.1f} ms）")
+    else:
+        files = replay_files(args.paths)
+        failed = 0
+        ticks = 0
+        start = time.perf_counter()
+        for path in files:
+            try:
+                replay = Replay.load(path)
+            except (OSError, ValueError) as e:
+                problem = f"无法读取: {e}"
+            else:
+                problem = verify(replay)
+                ticks += replay.result[0]
+            if problem is not None:
+                failed += 1
+                print(f"{path}: {problem}")
+        elapsed = time.perf_counter() - start
+        print(f"{len(files) - failed}/{len(files)} 个录像一致, "
+              f"{len(files) / elapsed:.1f} replays/s, {ticks / elapsed:,.0f} ticks/s")
+        if failed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
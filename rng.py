@@ -0,0 +1,98 @@
+"""
+可重现的随机数流
+
+一局游戏的随机性分成几条互相独立的流（方块组、石头、对手、技能），
+每条流是一个由局种子和流名称确定的 random.Random。各流互不影响：
+比如技能多消除了一个随机方块，不会改变之后出现的方块组和石头。
+同样的种子和同样的操作得到完全相同的一局，回放和回归基准都依赖这一点。
+
+方块组颜色由 PieceQueue 成批预先生成，按顺序取出。
+每条流记录自己已经消耗的随机字数，保存和恢复对局（见 snapshot）时只需记下这个数。
+"""
+import random
+
+from board import BLOCK_COLORS, COLOR_IDS
+
+# 一局中的随机数流
+STREAMS = ("pieces", "stones", "opponent", "skills")
+
+# 方块组随机选取的颜色编号（与 BLOCK_COLORS 顺序一致）
+COLOR_CHOICES = [COLOR_IDS[color] for color in BLOCK_COLORS]
+
+# PieceQueue 每批生成的方块组数量
+PIECE_BATCH = 256
+
+
+def new_seed():
+    """没有指定种子时为新的一局随机一个种子"""
+    return random.getrandbits(64)
+
+
+class Stream(random.Random):
+    """记录已消耗的 32 位随机字数的 random.Random
+
+    梅森旋转算法的输出是一串 32 位字：random() 消耗两个字，getrandbits(k) 消耗
+    ceil(k / 32) 个字，其余方法都建立在这两者之上。因此只要知道消耗了多少个字，
+    就能从同一个种子出发用 skip() 恢复到完全相同的位置。
+    """
+
+    def __init__(self, seed):
+        self.words = 0
+        super().__init__(seed)
+
+    def random(self):
+        self.words += 2
+        return super().random()
+
+    def getrandbits(self, k):
+        self.words += (k + 31) // 32
+        return super().getrandbits(k)
+
+    def skip(self, words):
+        """丢弃 words 个随机字"""
+        for _ in range(words):
+            self.getrandbits(32)
+
+
+def make_streams(seed):
+    """种子 seed 对应的各条随机数流 {流名称: Stream}"""
+    # 字符串种子经过 SHA-512 展开，与进程和 PYTHONHASHSEED 无关
+    return {name: Stream(f"{seed}/{name}") for name in STREAMS}
+
+
+class PieceQueue:
+    """方块组颜色序列：每次用 rng 成批生成 batch 组，按顺序取出"""
+
+    def __init__(self, rng, batch=PIECE_BATCH):
+        self.rng = rng
+        self.batch = batch
+        self.pairs = []
+        self.index = 0
+        # 已经取出的组数；序列与何时成批生成无关，取出同样多的组就回到同样的位置
+        self.drawn = 0
+
+    def _refill(self):
+        """丢掉已经取出的部分，再追加一批"""
+        colors = self.rng.choices(COLOR_CHOICES, k=2 * self.batch)
+        self.pairs = self.pairs[self.index:] + list(zip(colors[0::2], colors[1::2]))
+        self.index = 0
+
+    def peek(self, count):
+        """接下来的 count 组方块颜色（不取出）"""
+        while self.index + count > len(self.pairs):
+            self._refill()
+        return self.pairs[self.index:self.index + count]
+
+    def pop(self):
+        """取出下一组方块颜色 (color1, color2)"""
+        if self.index >= len(self.pairs):
+            self._refill()
+        pair = self.pairs[self.index]
+        self.index += 1
+        self.drawn += 1
+        return pair
+
+    def skip(self, count):
+        """丢弃接下来的 count 组"""
+        for _ in range(count):
+            self.pop()
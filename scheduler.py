@@ -0,0 +1,116 @@
+"""
+按逻辑步计时的定时器轮
+
+定时器按到期步数放进 WHEEL_SIZE 个槽中的一个（到期步数对槽数取模）。
+每推进一步只查看当前步对应的槽，其中到期的定时器被触发，未到期的
+（要再转若干圈才到期的）留在槽里，取消的定时器在经过时顺便丢弃。
+每步的开销只与该槽中的定时器数量有关，而不是逐个检查所有计时条件。
+
+定时器只记录一个种类字符串，到期时返回给调用方（GameState）分派处理，
+因此定时器本身不引用任何函数，可以直接复制。
+槽在原地整理、到期列表和刚触发的定时器对象都重复使用，稳定运行时推进一步不创建新的列表。
+"""
+
+# 槽数，超过一圈的定时器会在槽里多停留几圈
+WHEEL_SIZE = 256
+
+
+class Timer:
+    """一个定时器：到期步数、种类、重复间隔（None 表示只触发一次）"""
+
+    __slots__ = ("due", "kind", "interval", "active")
+
+    def __init__(self, due, kind, interval=None):
+        self.due = due
+        self.kind = kind
+        self.interval = interval
+        self.active = True
+
+
+class TimerWheel:
+    """以逻辑步为单位的定时器轮"""
+
+    def __init__(self, size=WHEEL_SIZE):
+        self.size = size
+        self.slots = [[] for _ in range(size)]
+        self.tick = 0
+        # advance 返回的到期列表及整理槽时暂存重复定时器的列表（每步复用）
+        self.fired = []
+        self.repeating = []
+
+    def schedule(self, delay, kind, interval=None):
+        """delay 步后触发 kind，interval 不为 None 时之后每 interval 步重复一次"""
+        if delay < 1 or (interval is not None and interval < 1):
+            raise ValueError("定时器间隔至少为 1 步")
+        timer = Timer(self.tick + delay, kind, interval)
+        self.slots[timer.due % self.size].append(timer)
+        return timer
+
+    def restart(self, timer, delay):
+        """让刚刚触发过的一次性定时器 timer 在 delay 步后再次触发（复用同一个对象）"""
+        if delay < 1:
+            raise ValueError("定时器间隔至少为 1 步")
+        timer.due = self.tick + delay
+        timer.active = True
+        self.slots[timer.due % self.size].append(timer)
+        return timer
+
+    def cancel(self, timer):
+        """取消定时器（None 表示没有定时器，忽略）"""
+        if timer is not None:
+            timer.active = False
+
+    def remaining(self, timer):
+        """定时器还要多少步到期，没有定时器或已失效时为 0"""
+        if timer is None or not timer.active:
+            return 0
+        return timer.due - self.tick
+
+    def next_due(self):
+        """最近一个定时器到期的步数，没有定时器时返回 None"""
+        tick = self.tick
+        size = self.size
+        slots = self.slots
+        # 先按槽的顺序向前看一圈，通常很快就遇到到期的定时器
+        for due in range(tick + 1, tick + size + 1):
+            for timer in slots[due % size]:
+                if timer.active and timer.due == due:
+                    return due
+        dues = [timer.due for slot in slots for timer in slot if timer.active]
+        return min(dues) if dues else None
+
+    def skip(self, ticks):
+        """直接前进 ticks 步（调用方保证这期间没有定时器到期）"""
+        self.tick += ticks
+
+    def advance(self):
+        """前进一步，按加入顺序返回本步到期的定时器种类列表（该列表在下一步复用）"""
+        self.tick += 1
+        tick = self.tick
+        fired = self.fired
+        fired.clear()
+        slot = self.slots[tick % self.size]
+        if not slot:
+            return fired
+
+        # 未到期的定时器按原来的顺序前移，槽的列表对象保持不变
+        repeating = self.repeating
+        kept = 0
+        for timer in slot:
+            if not timer.active:
+                continue
+            if timer.due != tick:
+                slot[kept] = timer
+                kept += 1
+                continue
+            fired.append(timer.kind)
+            if timer.interval is None:
+                timer.active = False
+            else:
+                timer.due += timer.interval
+                repeating.append(timer)
+        del slot[kept:]
+        for timer in repeating:
+            self.slots[timer.due % self.size].append(timer)
+        repeating.clear()
+        return fired
@@ -0,0 +1,243 @@
+"""
+对局状态快照与存档
+
+StateSnapshot 是 GameState 在两步之间全部状态的不可变快照，可以恢复到
+一个同样设置（角色、难度、棋盘实现、种子）的 GameState 上继续推进，
+之后的结果与没有中断时完全相同。撤销、存档和录像的关键帧（见 replay）都使用它。
+
+两块棋盘保存为 board.BoardSnapshot：棋盘只重新编码上次快照以来变化过的列，
+其余列与之前的快照共享，连续保存多个快照时每个只占变化的部分。
+其他内容编码成一个字节串：计分、连击、技能等数值，当前方块组，
+干扰方块队列，对手接下来的方块组，定时器轮中的全部定时器（按槽内顺序，
+同一步到期的定时器按原来的先后触发），以及各随机数流的位置
+（只记录已消耗的数量，见 rng.Stream）。
+角色、难度等设置和种子不在快照中；存档文件（save_game / load_game）把它们写在文件头里。
+存档文件带 CRC32 校验和，读取时检查长度、魔数、校验和及各编号的范围，
+截断或损坏的文件一律报 ValueError（不会按损坏的随机数流位置去长时间跳过随机数）。
+"""
+import struct
+import zlib
+
+from ai import DIFFICULTY_LEVELS
+from board import BOARD_BACKENDS, CELL_COUNT, COLOR_IDS, COLOR_NAMES, STONE_BIT, BoardSnapshot
+from engine import TICK_RATE, GameState, character_options, speed_levels
+from placement import ROTATION_OFFSETS, Piece
+from scheduler import TimerWheel
+
+# 固定长度部分：步数、得分、对手得分、技能能量、连击数、最近连锁、最大连锁、速度等级、
+# 上次自动下落的步数、是否结束、胜者、方块组 (x, y, rotation, color1, color2)、
+# 玩家方块组序列位置、对手方块组序列位置、石头流位置、技能流位置
+HEADER = struct.Struct("<IqqHHBBBIBBbbBBBIIII")
+
+# 定时器：到期步数、种类、重复间隔（0 表示只触发一次）
+TIMER = struct.Struct("<IBI")
+
+# 干扰方块、对手方块组、定时器的数量（干扰方块队列没有上限，因此不用单字节）
+COUNT = struct.Struct("<H")
+MAX_COUNT = 0xFFFF
+
+# 方块的颜色编号（不含表示空的 0）
+BLOCK_COLOR_IDS = frozenset(range(1, len(COLOR_NAMES)))
+
+# 棋盘快照中合法的格子编码：颜色编号，可以带石头标记
+VALID_CELLS = frozenset(color | stone for color in range(len(COLOR_NAMES)) for stone in (0, STONE_BIT))
+
+WINNERS = (None, "player", "opponent")
+
+DIFFICULTIES = tuple(DIFFICULTY_LEVELS)
+
+# 定时器种类（顺序即编号）及引用该定时器的 GameState 属性
+TIMER_KINDS = tuple(GameState.timer_handlers)
+TIMER_ATTRIBUTES = {"drop": "drop_timer", "combo": "combo_timer", "skill_ready": "skill_timer", "thaw": "freeze_timer"}
+
+# 存档文件：魔数、版本、种子、角色、对手角色、难度、棋盘实现、校验和，之后是快照。
+# 校验和是校验和字段之前的文件头与快照拼接后的 CRC32
+SAVE_MAGIC = b"BQSV"
+SAVE_VERSION = 2
+SAVE_HEADER = struct.Struct("<4sBQBBBBI")
+SAVE_CHECKSUM = struct.Struct("<I")
+
+# 默认的存档文件
+SAVE_FILE = "savegame.sav"
+
+
+class StateSnapshot:
+    """GameState 的不可变快照：header 为固定长度的数值，board / opponent_board 为
+    BoardSnapshot，rest 为干扰方块队列、对手方块组和定时器的编码"""
+
+    __slots__ = ("header", "board", "opponent_board", "rest")
+
+    def __init__(self, header, board, opponent_board, rest):
+        self.header = header
+        self.board = board
+        self.opponent_board = opponent_board
+        self.rest = rest
+
+    def __eq__(self, other):
+        return (isinstance(other, StateSnapshot) and self.header == other.header and self.board == other.board
+                and self.opponent_board == other.opponent_board and self.rest == other.rest)
+
+    def __hash__(self):
+        return hash((self.header, self.board, self.opponent_board, self.rest))
+
+    @property
+    def tick(self):
+        """快照时的步数"""
+        return HEADER.unpack_from(self.header)[0]
+
+    def to_bytes(self):
+        """快照的字节串"""
+        return b"".join((self.header, self.board.to_bytes(), self.opponent_board.to_bytes(), self.rest))
+
+    @classmethod
+    def from_bytes(cls, data):
+        """从 to_bytes 的结果解码（长度不足或棋盘格子编码不合法时报 ValueError）"""
+        data = bytes(data)
+        offset = HEADER.size
+        if len(data) < offset + 2 * CELL_COUNT:
+            raise ValueError("快照数据不完整")
+        if not set(data[offset:offset + 2 * CELL_COUNT]) <= VALID_CELLS:
+            raise ValueError("快照中的棋盘数据不合法")
+        board = BoardSnapshot.from_bytes(data[offset:offset + CELL_COUNT])
+        offset += CELL_COUNT
+        opponent_board = BoardSnapshot.from_bytes(data[offset:offset + CELL_COUNT])
+        offset += CELL_COUNT
+        return cls(data[:HEADER.size], board, opponent_board, data[offset:])
+
+
+def take_snapshot(state):
+    """GameState 当前的 StateSnapshot"""
+    piece = state.piece
+    header = HEADER.pack(
+        state.tick, state.score, state.opponent_score, state.skill_energy, state.combo_count,
+        state.last_chain, state.max_chain, state.current_speed_level, state.last_drop_tick,
+        state.game_over, WINNERS.index(state.winner),
+        piece.x, piece.y, piece.rotation, piece.color1, piece.color2,
+        state.pieces.drawn, state.opponent_pieces.drawn, state.stone_rng.words, state.skill_rng.words)
+
+    queue = state.interference_queue
+    pairs = state.opponent_pairs
+    timers = [timer for slot in state.timers.slots for timer in slot if timer.active]
+    if max(len(queue), len(pairs), len(timers)) > MAX_COUNT:
+        raise ValueError(f"快照最多保存 {MAX_COUNT} 个干扰方块、方块组或定时器")
+    parts = [COUNT.pack(len(queue)) + bytes(COLOR_IDS[block["color"]] for block in queue)]
+    parts.append(COUNT.pack(len(pairs)) + bytes(color for pair in pairs for color in pair))
+    parts.append(COUNT.pack(len(timers)))
+    for timer in timers:
+        parts.append(TIMER.pack(timer.due, TIMER_KINDS.index(timer.kind), timer.interval or 0))
+    return StateSnapshot(header, state.board.snapshot(), state.opponent_board.snapshot(), b"".join(parts))
+
+
+def encode_state(state):
+    """GameState 的快照字节串"""
+    return take_snapshot(state).to_bytes()
+
+
+def restore_state(state, snapshot):
+    """把快照（StateSnapshot 或其字节串）恢复到 state 上（state 的角色、难度、棋盘实现和种子须与快照时相同）
+
+    棋盘从快照恢复后所有列标记为脏，之后的第一次下落会确认各列都已落稳，结果与原棋盘相同。
+    快照数据截断或损坏时报 ValueError，这时 state 可能已被部分修改，应当丢弃。
+    """
+    try:
+        return _restore_state(state, snapshot)
+    except (struct.error, IndexError) as e:
+        raise ValueError("快照数据已损坏") from e
+
+
+def _restore_state(state, snapshot):
+    """restore_state 的实现，数据截断时可能报 struct.error 或 IndexError"""
+    if not isinstance(snapshot, StateSnapshot):
+        snapshot = StateSnapshot.from_bytes(snapshot)
+    (tick, score, opponent_score, skill_energy, combo_count, last_chain, max_chain, speed_level,
+     last_drop_tick, game_over, winner, x, y, rotation, color1, color2,
+     pieces_drawn, opponent_drawn, stone_words, skill_words) = HEADER.unpack(snapshot.header)
+    if (winner >= len(WINNERS) or not 1 <= speed_level <= len(speed_levels) or rotation >= len(ROTATION_OFFSETS)
+            or not {color1, color2} <= BLOCK_COLOR_IDS):
+        raise ValueError("快照中的数值不合法")
+    state.reset(state.seed)
+    state.pieces.skip(pieces_drawn - state.pieces.drawn)
+    state.opponent_pieces.skip(opponent_drawn - state.opponent_pieces.drawn)
+    state.stone_rng.skip(stone_words - state.stone_rng.words)
+    state.skill_rng.skip(skill_words - state.skill_rng.words)
+
+    state.tick = tick
+    state.game_time = tick / TICK_RATE
+    state.score = score
+    state.opponent_score = opponent_score
+    state.skill_energy = skill_energy
+    state.combo_count = combo_count
+    state.last_chain = last_chain
+    state.max_chain = max_chain
+    state.current_speed_level = speed_level
+    state.game_speed = speed_levels[speed_level - 1]
+    state.last_drop_tick = last_drop_tick
+    state.game_over = bool(game_over)
+    state.winner = WINNERS[winner]
+    state.piece = Piece(x, y, rotation, color1, color2)
+    state.board.restore(snapshot.board)
+    state.opponent_board.restore(snapshot.opponent_board)
+
+    data = snapshot.rest
+    count, = COUNT.unpack_from(data, 0)
+    offset = COUNT.size
+    queue = data[offset:offset + count]
+    if len(queue) != count or not set(queue) <= BLOCK_COLOR_IDS:
+        raise ValueError("快照中的干扰方块不合法")
+    state.interference_queue = [{"color": COLOR_NAMES[color]} for color in queue]
+    offset += count
+    count, = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    colors = data[offset:offset + 2 * count]
+    if len(colors) != 2 * count or not set(colors) <= BLOCK_COLOR_IDS:
+        raise ValueError("快照中的对手方块组不合法")
+    state.opponent_pairs = [(colors[i], colors[i + 1]) for i in range(0, len(colors), 2)]
+    offset += 2 * count
+
+    timers = TimerWheel()
+    timers.tick = tick
+    for attribute in TIMER_ATTRIBUTES.values():
+        setattr(state, attribute, None)
+    count, = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    for _ in range(count):
+        due, kind, interval = TIMER.unpack_from(data, offset)
+        offset += TIMER.size
+        kind = TIMER_KINDS[kind]
+        timer = timers.schedule(due - tick, kind, interval or None)
+        if kind in TIMER_ATTRIBUTES:
+            setattr(state, TIMER_ATTRIBUTES[kind], timer)
+    if offset != len(data):
+        raise ValueError("快照末尾有多余的数据")
+    state.timers = timers
+    return state
+
+
+def save_game(state, path=SAVE_FILE):
+    """把进行中的对局写入存档文件"""
+    header = SAVE_HEADER.pack(SAVE_MAGIC, SAVE_VERSION, state.seed, character_options.index(state.character),
+                              character_options.index(state.opponent_character),
+                              DIFFICULTIES.index(state.difficulty), BOARD_BACKENDS.index(state.backend), 0)
+    header = header[:-SAVE_CHECKSUM.size]
+    body = encode_state(state)
+    with open(path, "wb") as f:
+        f.write(header + SAVE_CHECKSUM.pack(zlib.crc32(header + body)) + body)
+
+
+def load_game(path=SAVE_FILE):
+    """读取存档文件，返回恢复到存档时的新 GameState（文件截断、损坏或版本不同时报 ValueError）"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < SAVE_HEADER.size or not data.startswith(SAVE_MAGIC):
+        raise ValueError("不是可识别的存档文件")
+    magic, version, seed, character, opponent, difficulty, backend, checksum = SAVE_HEADER.unpack_from(data)
+    if version != SAVE_VERSION:
+        raise ValueError(f"存档版本 {version} 与当前版本 {SAVE_VERSION} 不同")
+    if zlib.crc32(data[:SAVE_HEADER.size - SAVE_CHECKSUM.size] + data[SAVE_HEADER.size:]) != checksum:
+        raise ValueError("存档文件已损坏（校验和不符）")
+    if (max(character, opponent) >= len(character_options) or difficulty >= len(DIFFICULTIES)
+            or backend >= len(BOARD_BACKENDS)):
+        raise ValueError("存档文件已损坏")
+    state = GameState(character_options[character], character_options[opponent], backend=BOARD_BACKENDS[backend],
+                      difficulty=DIFFICULTIES[difficulty], seed=seed)
+    return restore_state(state, data[SAVE_HEADER.size:])
@@ -0,0 +1,29 @@
+"""逐步、逐帧内存分配预算（benchmarks/bench_tick_alloc.py 的缩短版，预算相同）"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import bench_tick_alloc  # noqa: E402
+
+# 比脚本默认的一局短，使测试保持较快
+TICKS = 60 * 60
+WARMUP = 10 * 60
+
+
+@pytest.mark.parametrize("render", [False, True], ids=["logic", "render"])
+def test_allocations_stay_within_budget(render):
+    if render:
+        pytest.importorskip("pygame")
+    cwd = os.getcwd()
+    try:
+        replay = bench_tick_alloc.record_game(1234, TICKS)
+        result = bench_tick_alloc.run(replay, WARMUP, render)
+    finally:
+        os.chdir(cwd)
+    ticks, frames, retained, measured, collections = result
+    assert measured > TICKS // 2
+    assert "idle" in ticks and (frames or not render)
+    assert bench_tick_alloc.check(*result) == []
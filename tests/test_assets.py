@@ -0,0 +1,46 @@
+"""资源管理器：资源包与单独文件读到同样的图片，延迟加载的失败也会报告"""
+import os
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+pygame = pytest.importorskip("pygame")
+
+from assets import AssetManager  # noqa: E402
+from build_assets import build_pack  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMAGE = os.path.join("images", "stone.png")
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    """在仓库根目录下创建的 AssetManager（不使用资源包）"""
+    pygame.display.init()
+    if pygame.display.get_surface() is None:
+        pygame.display.set_mode((1, 1))
+    monkeypatch.chdir(ROOT)
+    return AssetManager(pack_path="no-such.pak")
+
+
+def test_pack_and_files_give_the_same_image(manager, tmp_path):
+    pack = tmp_path / "assets.pak"
+    build_pack(ROOT, str(pack))
+    packed = AssetManager(pack_path=str(pack))
+    assert packed.pack is not None and manager.pack is None
+    size = (16, 16)
+    assert (pygame.image.tobytes(packed.image(IMAGE, size), "RGBA")
+            == pygame.image.tobytes(manager.image(IMAGE, size), "RGBA"))
+    assert packed.image(IMAGE, size) is packed.image(IMAGE, size)
+
+
+def test_failures_after_the_report_are_printed_immediately(manager, capsys):
+    assert manager.try_image("missing-at-startup.png") is None
+    manager.report()
+    out = capsys.readouterr().out
+    assert "警告: 无法加载 missing-at-startup.png" in out
+
+    assert manager.try_image(os.path.join("images", "no-such-portrait.gif")) is None
+    out = capsys.readouterr().out
+    assert "警告: 无法加载" in out and "no-such-portrait.gif" in out
+    assert len(manager.failures) == 2
@@ -0,0 +1,69 @@
+"""ListBoard 与 BitBoard 的等价性：同样的操作序列在两种实现上得到同样的棋盘和返回值"""
+import random
+
+import pytest
+
+from board import BLOCK_COLORS, BOARD_BACKENDS, GAME_AREA_HEIGHT, GAME_AREA_WIDTH, clear_chain, make_board
+
+
+def grid(board):
+    """棋盘内容 [(颜色, 是否石头), ...]，按行排列"""
+    return [(board.color_at(x, y), board.stone_at(x, y))
+            for y in range(GAME_AREA_HEIGHT) for x in range(GAME_AREA_WIDTH)]
+
+
+def random_operation(rng):
+    """随机一个棋盘操作，返回 (名称, 对棋盘执行并返回结果的函数)"""
+    x = rng.randrange(GAME_AREA_WIDTH)
+    y = rng.randrange(GAME_AREA_HEIGHT)
+    color = rng.choice(BLOCK_COLORS)
+    operations = [
+        ("set_color", lambda board: board.set_color(x, y, color)),
+        ("set_color", lambda board: board.set_color(x, y, color)),
+        ("clear_cell", lambda board: board.set_color(x, y, None)),
+        ("set_stone", lambda board: board.set_stone(x, y) if board.color_at(x, y) is None else None),
+        ("check_clear", lambda board: board.check_clear()),
+        ("drop_floating_blocks", lambda board: board.drop_floating_blocks()),
+        ("clear_isolated_stones", lambda board: board.clear_isolated_stones()),
+        ("clear_chain", lambda board: clear_chain(board)),
+        ("clear_row", lambda board: board.clear_row(y)),
+        ("convert_all_to_color", lambda board: board.convert_all_to_color(color)),
+        ("has_top_block", lambda board: board.has_top_block()),
+        ("check_collision", lambda board: board.check_collision([(x, y - 1), (x, y)])),
+        ("colored_cells", lambda board: sorted(board.colored_cells())),
+        ("tops", lambda board: list(board.tops())),
+    ]
+    return rng.choice(operations)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_backends_agree_on_random_operations(seed):
+    rng = random.Random(seed)
+    boards = [make_board(backend) for backend in BOARD_BACKENDS]
+    for step in range(400):
+        name, operation = random_operation(rng)
+        results = [operation(board) for board in boards]
+        assert all(result == results[0] for result in results), f"第 {step} 步 {name} 的返回值不同"
+        grids = [grid(board) for board in boards]
+        assert all(other == grids[0] for other in grids), f"第 {step} 步 {name} 之后棋盘不同"
+
+
+@pytest.mark.parametrize("backend", BOARD_BACKENDS)
+def test_copy_is_independent(backend):
+    board = make_board(backend)
+    board.set_color(0, GAME_AREA_HEIGHT - 1, "blue")
+    copy = board.copy()
+    copy.set_color(1, GAME_AREA_HEIGHT - 1, "green")
+    assert board.color_at(1, GAME_AREA_HEIGHT - 1) is None
+    assert copy.color_at(0, GAME_AREA_HEIGHT - 1) == "blue"
+
+
+@pytest.mark.parametrize("backend", BOARD_BACKENDS)
+def test_four_connected_blocks_clear(backend):
+    board = make_board(backend)
+    bottom = GAME_AREA_HEIGHT - 1
+    for x in range(4):
+        board.set_color(x, bottom, "purple")
+    board.set_stone(4, bottom)
+    assert board.check_clear()
+    assert board.colored_cells() == []
@@ -0,0 +1,82 @@
+"""GroupTracker：增量维护的连通块与从头洪水填充的结果一致"""
+import random
+
+import pytest
+
+from board import CELL_COUNT, CLEAR_THRESHOLD, GAME_AREA_WIDTH, NEIGHBOURS
+from groups import GroupTracker
+
+COLORS = 4
+
+
+def flood_groups(cells):
+    """洪水填充求出的全部同色连通块 {格子: 所在连通块的格子集合}"""
+    result = {}
+    for start in range(CELL_COUNT):
+        if not cells[start] or start in result:
+            continue
+        group = {start}
+        stack = [start]
+        while stack:
+            index = stack.pop()
+            for other in NEIGHBOURS[index]:
+                if other not in group and cells[other] == cells[start]:
+                    group.add(other)
+                    stack.append(other)
+        for index in group:
+            result[index] = group
+    return result
+
+
+def assert_matches(tracker, cells):
+    expected = flood_groups(cells)
+    for index, group in expected.items():
+        assert set(tracker.group_of(index)) == group
+        assert tracker.group_size(index) == len(group)
+
+
+def change(tracker, cells, updates):
+    """按 ListBoard 的方式修改格子：先 detach，修改 cells，再 attach"""
+    indices = [index for index, _ in updates]
+    affected = tracker.detach(indices)
+    for index, color in updates:
+        cells[index] = color
+    tracker.attach(affected + indices)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_incremental_groups_match_flood_fill(seed):
+    rng = random.Random(seed)
+    cells = bytearray(CELL_COUNT)
+    tracker = GroupTracker(cells, GAME_AREA_WIDTH, NEIGHBOURS, CLEAR_THRESHOLD)
+    for _ in range(500):
+        count = rng.choice((1, 1, 1, 2, 6))
+        updates = [(rng.randrange(CELL_COUNT), rng.choice((0, 0) + tuple(range(1, COLORS + 1))))
+                   for _ in range(count)]
+        change(tracker, cells, dict(updates).items())
+        assert_matches(tracker, cells)
+
+
+def test_pop_full_groups_returns_groups_at_threshold():
+    cells = bytearray(CELL_COUNT)
+    tracker = GroupTracker(cells, GAME_AREA_WIDTH, NEIGHBOURS, CLEAR_THRESHOLD)
+    bottom = CELL_COUNT - GAME_AREA_WIDTH
+    change(tracker, cells, [(bottom + x, 1) for x in range(CLEAR_THRESHOLD - 1)])
+    assert tracker.pop_full_groups() == []
+    change(tracker, cells, [(bottom + CLEAR_THRESHOLD - 1, 1), (bottom + CLEAR_THRESHOLD, 2)])
+    groups = tracker.pop_full_groups()
+    assert [sorted(group) for group in groups] == [[bottom + x for x in range(CLEAR_THRESHOLD)]]
+
+
+def test_copy_and_rebuild():
+    rng = random.Random(1)
+    cells = bytearray(rng.randrange(COLORS + 1) for _ in range(CELL_COUNT))
+    tracker = GroupTracker(cells, GAME_AREA_WIDTH, NEIGHBOURS, CLEAR_THRESHOLD)
+    tracker.rebuild()
+    assert_matches(tracker, cells)
+
+    copied_cells = bytearray(cells)
+    copy = tracker.copy(copied_cells)
+    change(copy, copied_cells, [(index, 0) for index in range(0, CELL_COUNT, 3)])
+    assert_matches(copy, copied_cells)
+    assert_matches(tracker, cells)
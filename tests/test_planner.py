@@ -0,0 +1,45 @@
+"""后台规划器：按时取用计划，后台出错时不影响主循环"""
+from engine import GameState
+from planner import BackgroundPlanner
+
+
+def wait(planner):
+    """等后台完成当前的搜索"""
+    planner.pending.exception()
+
+
+def test_next_move_returns_the_finished_plan():
+    state = GameState("胡桃", seed=4)
+    planner = BackgroundPlanner()
+    try:
+        planner.submit(state.opponent_board, state.opponent_pairs, 10)
+        wait(planner)
+        assert planner.next_move() is not None
+        assert (planner.on_time, planner.late, planner.failed) == (1, 0, 0)
+    finally:
+        planner.close()
+
+
+def test_search_error_is_reported_once_and_falls_back(capsys):
+    state = GameState("胡桃", seed=4)
+    planner = BackgroundPlanner()
+
+    def broken(*args):
+        raise RuntimeError("boom")
+
+    planner.ai.plan = broken
+    try:
+        for _ in range(2):
+            planner.submit(state.opponent_board, state.opponent_pairs, 10)
+            wait(planner)
+            assert planner.next_move() is None
+        assert planner.failed == 2
+        assert capsys.readouterr().out.count("boom") == 1
+
+        # 引擎在没有计划时同步选择落点，游戏照常进行
+        state.attach_planner(planner)
+        for _ in range(600):
+            state.step()
+        assert state.opponent_board.snapshot() != GameState("胡桃", seed=4).opponent_board.snapshot()
+    finally:
+        planner.close()
@@ -0,0 +1,72 @@
+"""种子确定的随机数流：同一种子得到同样的一局，流的位置可以由消耗的字数恢复"""
+import random
+
+import pytest
+
+from engine import INPUTS, GameState, skill_max_energy
+from rng import PieceQueue, Stream, make_streams
+from snapshot import encode_state
+
+
+def draw(stream):
+    """用各种方法从 stream 取一些随机数"""
+    return [stream.random(), stream.randint(0, 5), stream.choice("abcd"), stream.sample(range(90), 3),
+            stream.choices((1, 2, 3, 4), k=5), stream.getrandbits(70)]
+
+
+def test_streams_are_reproducible_and_independent():
+    first, second = make_streams(42), make_streams(42)
+    for name in first:
+        assert draw(first[name]) == draw(second[name])
+    values = [draw(stream) for stream in make_streams(42).values()]
+    assert len({repr(value) for value in values}) == len(values)
+    assert draw(make_streams(43)["pieces"]) != draw(make_streams(42)["pieces"])
+
+
+def test_skip_restores_position_from_word_count():
+    stream = Stream("7/skills")
+    for _ in range(5):
+        draw(stream)
+    restored = Stream("7/skills")
+    restored.skip(stream.words)
+    assert draw(restored) == draw(stream)
+
+
+def test_piece_sequence_does_not_depend_on_batch_size():
+    small = PieceQueue(Stream("1/pieces"), batch=3)
+    large = PieceQueue(Stream("1/pieces"))
+    assert small.peek(5) == large.peek(5)
+    assert [small.pop() for _ in range(20)] == [large.pop() for _ in range(20)]
+    skipped = PieceQueue(Stream("1/pieces"))
+    skipped.skip(20)
+    assert skipped.drawn == large.drawn == 20
+    assert skipped.pop() == large.pop()
+
+
+def play(seed, character, inputs_seed, ticks=1500):
+    """用脚本化操作进行 ticks 步，返回快照"""
+    rng = random.Random(inputs_seed)
+    state = GameState(character, seed=seed)
+    for _ in range(ticks):
+        if rng.random() < 0.05:
+            state.apply_input(rng.randrange(len(INPUTS)))
+        state.step()
+    return encode_state(state)
+
+
+@pytest.mark.parametrize("character", ["胡桃", "魈", "藤人"])
+def test_same_seed_and_inputs_give_the_same_game(character):
+    assert play(5, character, 1) == play(5, character, 1)
+    assert play(5, character, 1) != play(6, character, 1)
+
+
+def test_skills_do_not_shift_the_piece_sequence():
+    plain = GameState("胡桃", seed=11)
+    skilled = GameState("胡桃", seed=11)
+    skilled.skill_energy = skill_max_energy
+    skilled.use_skill()
+    # 技能效果中的随机（干扰方块的颜色）取自技能流
+    skilled.create_interference_blocks(2)
+    assert skilled.skill_rng.words > 0
+    assert [plain.pieces.pop() for _ in range(10)] == [skilled.pieces.pop() for _ in range(10)]
+    assert plain.stone_rng.random() == skilled.stone_rng.random()
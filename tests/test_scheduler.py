@@ -0,0 +1,89 @@
+"""TimerWheel：与逐个检查到期时间的简单实现结果一致"""
+import random
+
+import pytest
+
+from scheduler import TimerWheel
+
+
+class ReferenceTimers:
+    """逐步检查每个定时器的简单实现：[(到期步数, 加入序号, 种类, 间隔, 编号), ...]"""
+
+    def __init__(self):
+        self.tick = 0
+        self.timers = {}
+        self.order = 0
+
+    def schedule(self, ident, delay, kind, interval):
+        self.order += 1
+        self.timers[ident] = [self.tick + delay, self.order, kind, interval]
+
+    def cancel(self, ident):
+        self.timers.pop(ident, None)
+
+    def advance(self):
+        self.tick += 1
+        due = sorted((order, ident) for ident, (tick, order, _, _) in self.timers.items() if tick == self.tick)
+        fired = []
+        for _, ident in due:
+            timer = self.timers[ident]
+            fired.append(timer[2])
+            if timer[3] is None:
+                del self.timers[ident]
+            else:
+                self.order += 1
+                timer[0] += timer[3]
+                timer[1] = self.order
+        return fired
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_wheel_matches_reference(seed):
+    rng = random.Random(seed)
+    # 槽数取小一些，让定时器经常要多转几圈
+    wheel = TimerWheel(size=16)
+    reference = ReferenceTimers()
+    handles = {}
+    for step in range(3000):
+        roll = rng.random()
+        if roll < 0.1:
+            ident = len(handles)
+            delay = rng.randint(1, 60)
+            interval = rng.choice((None, None, rng.randint(1, 40)))
+            handles[ident] = wheel.schedule(delay, f"t{ident}", interval)
+            reference.schedule(ident, delay, f"t{ident}", interval)
+        elif roll < 0.15 and handles:
+            ident = rng.choice(list(handles))
+            wheel.cancel(handles[ident])
+            reference.cancel(ident)
+        assert list(wheel.advance()) == reference.advance(), f"第 {step} 步到期的定时器不同"
+        expected_next = min((timer[0] for timer in reference.timers.values()), default=None)
+        assert wheel.next_due() == expected_next
+
+
+def test_same_tick_fires_in_insertion_order():
+    wheel = TimerWheel()
+    for kind in ("a", "b", "c"):
+        wheel.schedule(3, kind)
+    assert [list(wheel.advance()) for _ in range(3)] == [[], [], ["a", "b", "c"]]
+
+
+def test_restart_reuses_timer_and_remaining_counts_down():
+    wheel = TimerWheel()
+    timer = wheel.schedule(2, "drop")
+    wheel.advance()
+    assert wheel.remaining(timer) == 1
+    assert list(wheel.advance()) == ["drop"]
+    assert wheel.remaining(timer) == 0
+    assert wheel.restart(timer, 3) is timer
+    assert wheel.remaining(timer) == 3
+    wheel.skip(2)
+    assert list(wheel.advance()) == ["drop"]
+
+
+def test_invalid_delay_is_rejected():
+    wheel = TimerWheel()
+    with pytest.raises(ValueError):
+        wheel.schedule(0, "drop")
+    with pytest.raises(ValueError):
+        wheel.schedule(1, "stone", 0)
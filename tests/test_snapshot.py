@@ -0,0 +1,78 @@
+"""快照与存档：恢复后继续推进与不中断的结果相同，损坏的存档报 ValueError"""
+import random
+
+import pytest
+
+from board import BOARD_BACKENDS, GAME_AREA_HEIGHT
+from engine import INPUTS, GameState
+from snapshot import encode_state, load_game, restore_state, save_game, take_snapshot
+
+
+def scripted(seed):
+    """脚本化操作：每步以一定概率返回一个操作编号，否则返回 None"""
+    rng = random.Random(seed)
+    return [rng.randrange(len(INPUTS)) if rng.random() < 0.05 else None for _ in range(3000)]
+
+
+def run(state, inputs, start, end):
+    for tick in range(start, end):
+        if inputs[tick] is not None:
+            state.apply_input(inputs[tick])
+        state.step()
+
+
+@pytest.mark.parametrize("backend", BOARD_BACKENDS)
+@pytest.mark.parametrize("character", ["魈", "刻晴", "藤人"])
+def test_restored_state_continues_identically(backend, character):
+    inputs = scripted(3)
+    original = GameState(character, backend=backend, seed=21)
+    run(original, inputs, 0, 1200)
+    snapshot = take_snapshot(original)
+
+    restored = GameState(character, backend=backend, seed=21)
+    restore_state(restored, snapshot)
+    assert encode_state(restored) == snapshot.to_bytes()
+
+    run(original, inputs, 1200, 3000)
+    run(restored, inputs, 1200, 3000)
+    assert encode_state(restored) == encode_state(original)
+
+
+def test_unchanged_columns_are_shared():
+    state = GameState(seed=1)
+    first = state.board.snapshot()
+    assert state.board.snapshot() is first
+    state.board.set_color(2, GAME_AREA_HEIGHT - 1, "blue")
+    second = state.board.snapshot()
+    assert second.columns[2] != first.columns[2]
+    assert all(second.columns[x] is first.columns[x] for x in range(len(first.columns)) if x != 2)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    state = GameState("魈", seed=8)
+    run(state, scripted(4), 0, 900)
+    # 干扰方块队列没有上限，数量超过一个字节也能保存
+    state.interference_queue = [{"color": "green"}] * 300
+    path = str(tmp_path / "game.sav")
+    save_game(state, path)
+    loaded = load_game(path)
+    assert (loaded.character, loaded.seed) == ("魈", 8)
+    assert encode_state(loaded) == encode_state(state)
+
+
+def test_corrupt_save_raises_value_error(tmp_path):
+    state = GameState(seed=2)
+    run(state, scripted(5), 0, 600)
+    path = tmp_path / "game.sav"
+    save_game(state, str(path))
+    data = path.read_bytes()
+    rng = random.Random(0)
+    corrupted = [data[:length] for length in range(0, len(data), 7)] + [data + b"\0"]
+    for _ in range(50):
+        damaged = bytearray(data)
+        damaged[rng.randrange(len(damaged))] ^= 1 << rng.randrange(8)
+        corrupted.append(bytes(damaged))
+    for content in corrupted:
+        path.write_bytes(content)
+        with pytest.raises(ValueError):
+            load_game(str(path))
@@ -0,0 +1,32 @@
+"""循环赛对战：双方 AI 按难度向前看多组方块，不同难度下的对局不同"""
+from ai import DIFFICULTY_LEVELS
+from tournament import MatchState, play_match
+
+
+def match(difficulty, seed=3, max_time=30):
+    return {"id": 0, "players": ["魈", "胡桃"], "seed": seed, "difficulty": difficulty, "max_time": max_time}
+
+
+def test_player_ai_looks_ahead_to_its_depth():
+    for difficulty, (depth, *_) in DIFFICULTY_LEVELS.items():
+        side = MatchState("魈", "胡桃", difficulty, seed=3)
+        side.opponent_board = MatchState("胡桃", "魈", difficulty, seed=3).board
+        seen = []
+        choose = side.player_ai.choose
+        side.player_ai.choose = lambda board, pairs: seen.append(list(pairs)) or choose(board, pairs)
+        piece = side.piece
+        queued = side.pieces.peek(depth - 1)
+        side.think()
+        assert seen == [[(piece.color1, piece.color2)] + queued]
+        assert side.player_ai.last_depth == depth
+
+
+def test_difficulties_play_differently():
+    results = [play_match(match(difficulty)) for difficulty in DIFFICULTY_LEVELS]
+    outcomes = {(result["winner"], result["ticks"], tuple(side["score"] for side in result["sides"]))
+                for result in results}
+    assert len(outcomes) == len(results)
+
+
+def test_match_is_reproducible():
+    assert play_match(match("普通"))["sides"] == play_match(match("普通"))["sides"]
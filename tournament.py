@@ -0,0 +1,230 @@
+"""
+角色平衡性循环赛
+
+character_options 中的每两个角色之间进行若干局 AI 对 AI 的无界面对战，
+对战分配到进程池中并行进行。每局的种子由对局编号算出（--seed + 编号），
+双方使用同一个种子，因此得到同样的方块组序列和石头位置。
+结果逐局追加写入 JSONL 结果文件；中断后用同样的参数重新运行，
+已经写入结果的对局会被跳过，只进行剩下的对局。最后按角色汇总
+胜率、平均得分、平均连锁层数，并报告本次运行每秒完成的局数。
+
+对战双方各是一个 MatchState：两个 GameState 的 opponent_board 互相指向对方的棋盘，
+干扰方块落到对方场地，刻晴的冻结让对方的时间停止；内置的对手 AI 不再落子，
+双方的方块组都由 OpponentAI（不限时间，结果可重现）选择落点，技能可用时立即使用。
+一方顶出即分出胜负；到达时间上限时得分高的一方获胜，得分相同为平局。
+
+用法: python tournament.py [--games N] [--workers N] [--seed S] [--output results.jsonl]
+                          [--difficulty 简单|普通|困难] [--max-time SECONDS]
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import time
+
+from ai import DEFAULT_DIFFICULTY, DIFFICULTY_LEVELS, OpponentAI
+from engine import TICK_RATE, GameState, character_options
+
+# 每局默认最长的游戏时间（秒），到时还没有一方顶出则比较得分
+MAX_MATCH_TIME = 300
+
+# 默认的结果文件
+RESULTS_FILE = "tournament.jsonl"
+
+
+class MatchState(GameState):
+    """对战中的一方：玩家的方块组由 AI 操作，对手是另一个 MatchState"""
+
+    def __init__(self, character, opponent_character, difficulty=DEFAULT_DIFFICULTY, seed=None):
+        self.player_ai = OpponentAI(difficulty, time_budget=0)
+        super().__init__(character, opponent_character, difficulty=difficulty, seed=seed)
+
+    def reset(self, seed=None):
+        super().reset(seed)
+        # 已经选好落点的方块组
+        self.planned_piece = None
+        # 有消除的放置次数及其连锁层数之和
+        self.chains = 0
+        self.chain_rounds = 0
+        self.skills_used = 0
+
+    def update_opponent(self):
+        """对方由另一个 MatchState 操作，这里不替对方落子"""
+
+    timer_handlers = dict(GameState.timer_handlers, opponent=update_opponent)
+
+    def place_blocks(self, piece):
+        super().place_blocks(piece)
+        if self.last_chain:
+            self.chains += 1
+            self.chain_rounds += self.last_chain
+
+    def think(self):
+        """新的方块组出现时选择落点、使用技能并硬降"""
+        piece = self.piece
+        if piece is self.planned_piece or self.game_over:
+            return
+        self.planned_piece = piece
+        # 与内置对手一样向前看 depth 组：当前这一组加上队列中接下来的几组
+        pairs = [(piece.color1, piece.color2)] + self.pieces.peek(self.player_ai.depth - 1)
+        move = self.player_ai.choose(self.board, pairs)
+        target = self.placements().get(move) if move is not None else None
+        if target is not None:
+            piece.x = target.x
+            piece.rotation = target.rotation
+        energy = self.skill_energy
+        self.use_skill()
+        if self.skill_energy < energy:
+            self.skills_used += 1
+        self.drop_blocks()
+
+
+def play_match(match):
+    """进行一局对战，match 为 {"id", "players", "seed", "difficulty", "max_time"}，返回结果字典"""
+    start = time.perf_counter()
+    first, second = match["players"]
+    sides = (MatchState(first, second, match["difficulty"], match["seed"]),
+             MatchState(second, first, match["difficulty"], match["seed"]))
+    sides[0].opponent_board = sides[1].board
+    sides[1].opponent_board = sides[0].board
+
+    winner = None
+    tick = -1
+    for tick in range(match["max_time"] * TICK_RATE):
+        for side, other in ((sides[0], sides[1]), (sides[1], sides[0])):
+            # 被对方冻结时，这一方的时间停止
+            if other.opponent_frozen:
+                continue
+            side.think()
+            if side.step():
+                winner = side.character if side.winner == "player" else other.character
+                break
+        if winner is not None:
+            break
+    timeout = winner is None
+    if timeout and sides[0].score != sides[1].score:
+        winner = max(sides, key=lambda side: side.score).character
+
+    result = dict(match, winner=winner, timeout=timeout, ticks=tick + 1,
+                  seconds=round(time.perf_counter() - start, 3))
+    result["sides"] = [{
+        "character": side.character,
+        "score": side.score,
+        "max_chain": side.max_chain,
+        "chains": side.chains,
+        "chain_rounds": side.chain_rounds,
+        "skills": side.skills_used,
+    } for side in sides]
+    return result
+
+
+def schedule(games, seed, difficulty, max_time=MAX_MATCH_TIME):
+    """全部对局：每两个角色之间 games 局，交替先后手"""
+    matches = []
+    for first, second in itertools.combinations(character_options, 2):
+        for game in range(games):
+            players = [first, second] if game % 2 == 0 else [second, first]
+            index = len(matches)
+            matches.append({"id": index, "players": players, "seed": seed + index,
+                            "difficulty": difficulty, "max_time": max_time})
+    return matches
+
+
+def load_results(path):
+    """读取结果文件中已完成的对局 {id: 结果}
+
+    中断时可能留下写了一半的最后一行，把它从文件中截掉，之后的结果从新的一行开始追加。
+    """
+    results = {}
+    if not os.path.exists(path):
+        return results
+    complete = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            result = json.loads(line)
+            results[result["id"]] = result
+            complete += len(line)
+    if complete < os.path.getsize(path):
+        with open(path, "r+b") as f:
+            f.truncate(complete)
+    return results
+
+
+def summarize(results):
+    """按角色汇总 {角色: {局数, 胜场, 胜率, 平均得分, 平均连锁层数}}"""
+    stats = {name: {"games": 0, "wins": 0, "score": 0, "chains": 0, "chain_rounds": 0}
+             for name in character_options}
+    for result in results:
+        for side in result["sides"]:
+            entry = stats[side["character"]]
+            entry["games"] += 1
+            entry["wins"] += result["winner"] == side["character"]
+            entry["score"] += side["score"]
+            entry["chains"] += side["chains"]
+            entry["chain_rounds"] += side["chain_rounds"]
+    summary = {}
+    for name, entry in stats.items():
+        games = entry["games"]
+        if not games:
+            continue
+        summary[name] = {
+            "games": games,
+            "wins": entry["wins"],
+            "win_rate": entry["wins"] / games,
+            "score": entry["score"] / games,
+            "chain": entry["chain_rounds"] / entry["chains"] if entry["chains"] else 0.0,
+        }
+    return summary
+
+
+def run(matches, path, workers):
+    """在 workers 个进程中进行 matches 中尚未完成的对局，结果追加到 path，返回 (全部结果, 本次局数, 耗时)"""
+    done = load_results(path)
+    for match in matches:
+        old = done.get(match["id"])
+        if old is not None and any(old.get(key) != value for key, value in match.items()):
+            raise ValueError(f"{path} 中第 {match['id']} 局的设置与本次不同，请换一个结果文件")
+    pending = [match for match in matches if match["id"] not in done]
+
+    start = time.perf_counter()
+    if pending:
+        with open(path, "a", encoding="utf-8") as f, multiprocessing.Pool(workers) as pool:
+            for result in pool.imap_unordered(play_match, pending):
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+                f.flush()
+                done[result["id"]] = result
+                print(f"[{len(done)}/{len(matches)}] {result['players'][0]} vs {result['players'][1]}: "
+                      f"{result['winner'] or '平局'}")
+    elapsed = time.perf_counter() - start
+    return [done[match["id"]] for match in matches], len(pending), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="角色平衡性循环赛")
+    parser.add_argument("--games", type=int, default=10, help="每两个角色之间的局数")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="进程数（默认 CPU 核数）")
+    parser.add_argument("--seed", type=int, default=0, help="第一局的种子，之后每局加一")
+    parser.add_argument("--output", default=RESULTS_FILE, help=f"结果文件（默认 {RESULTS_FILE}）")
+    parser.add_argument("--difficulty", choices=list(DIFFICULTY_LEVELS), default=DEFAULT_DIFFICULTY,
+                        help="双方 AI 的搜索难度")
+    parser.add_argument("--max-time", type=int, default=MAX_MATCH_TIME, help="每局最长的游戏时间（秒）")
+    args = parser.parse_args()
+    if args.max_time <= 0:
+        parser.error("--max-time 必须大于 0")
+
+    matches = schedule(args.games, args.seed, args.difficulty, args.max_time)
+    results, played, elapsed = run(matches, args.output, args.workers)
+
+    print(f"{'character':<8}{'games':>8}{'wins':>8}{'win rate':>10}{'score':>10}{'chain':>8}")
+    for name, entry in summarize(results).items():
+        print(f"{name:<8}{entry['games']:>8}{entry['wins']:>8}{entry['win_rate']:>10.1%}"
+              f"{entry['score']:>10.1f}{entry['chain']:>8.2f}")
+    if played:
+        print(f"本次进行 {played} 局, {played / elapsed:.2f} games/s ({args.workers} 进程)")
+
+
+if __name__ == "__main__":
+    main()